@@ -7,7 +7,11 @@ from homeassistant.helpers.typing import ConfigType
 from homeassistant.components.http import StaticPathConfig
 from homeassistant.components.frontend import async_register_built_in_panel, async_remove_panel
 
-from .backend.api import register_websocket_commands
+from .backend.api import (
+    async_unload_websocket_commands,
+    async_update_websocket_config,
+    register_websocket_commands,
+)
 from .const import (
     DASHBOARD_NAME,
     DASHBOARD_URL,
@@ -49,7 +53,8 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     hass.data.setdefault(DOMAIN, {})
     
     # Register WebSocket commands
-    await register_websocket_commands(hass)
+    await register_websocket_commands(hass, dict(entry.options))
+    entry.async_on_unload(entry.add_update_listener(async_options_updated))
     _LOGGER.info("Registered WebSocket commands")
     
     # Register the static path for serving the frontend build
@@ -84,6 +89,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def async_options_updated(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options without dropping dashboard connections."""
+    await async_update_websocket_config(hass, dict(entry.options))
+    _LOGGER.info("Applied Dashview V2 options")
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     _LOGGER.info("Unloading Dashview V2")
@@ -91,6 +102,9 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Remove the panel
     async_remove_panel(hass, "dashview-v2")
     
+    # Release entity subscriptions and their state trackers
+    await async_unload_websocket_commands(hass)
+    
     # Clear data
     hass.data[DOMAIN].clear()
     
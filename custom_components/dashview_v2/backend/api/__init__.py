@@ -1,6 +1,15 @@
 """WebSocket API module for Dashview V2."""
 
 from .commands import WEBSOCKET_COMMANDS
-from .handlers import register_websocket_commands
+from .handlers import (
+    async_unload_websocket_commands,
+    async_update_websocket_config,
+    register_websocket_commands,
+)
 
-__all__ = ["WEBSOCKET_COMMANDS", "register_websocket_commands"]
\ No newline at end of file
+__all__ = [
+    "WEBSOCKET_COMMANDS",
+    "async_unload_websocket_commands",
+    "async_update_websocket_config",
+    "register_websocket_commands",
+]
\ No newline at end of file
@@ -0,0 +1,98 @@
+"""Paged streaming of the area breakdown, most important areas first."""
+
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional
+
+from ..intelligence.engine import UNASSIGNED_AREA, LoopYielder
+from .lanes import INTERACTIVE_PRIORITY
+
+# Areas sent per page unless the client asks otherwise
+DEFAULT_AREA_PAGE_SIZE = 5
+MAX_AREA_PAGE_SIZE = 100
+
+# Separates the offset from the registry version in a cursor
+CURSOR_SEPARATOR = "@"
+
+
+def area_order(
+    areas: Mapping[str, Dict[str, Any]],
+    entity_priority: Callable[[str], int],
+) -> List[str]:
+    """
+    Order areas by how much a user is likely to act on them.
+
+    Areas holding more critical and interactive entities (locks, lights,
+    switches, covers) come first, ties by name. Unassigned entities come
+    last. Runs in the executor; scoring touches every entity.
+
+    Args:
+        areas: Area breakdown of the home analysis
+        entity_priority: Priority score (0-10) of an entity
+
+    Returns:
+        Area IDs in the order they should be sent
+    """
+    yield_to_loop = LoopYielder()
+    scores = {}
+    for area_id, area in areas.items():
+        yield_to_loop()
+        scores[area_id] = sum(
+            1 for entity_id in area["entities"] if entity_priority(entity_id) >= INTERACTIVE_PRIORITY
+        )
+    order = sorted(
+        (area_id for area_id in areas if area_id != UNASSIGNED_AREA),
+        key=lambda area_id: (-scores[area_id], areas[area_id]["name"], area_id),
+    )
+    if UNASSIGNED_AREA in areas:
+        order.append(UNASSIGNED_AREA)
+    return order
+
+
+def make_cursor(version: str, offset: int) -> str:
+    """Return the cursor resuming a stream at offset of the given version."""
+    return f"{offset}{CURSOR_SEPARATOR}{version}"
+
+
+def parse_cursor(cursor: Optional[str], version: str) -> Optional[int]:
+    """
+    Return the offset a cursor resumes at.
+
+    Args:
+        cursor: Cursor from an earlier page, if any
+        version: Current registry version
+
+    Returns:
+        The offset, 0 without a cursor, or None if the cursor is malformed
+        or from another registry version, in which case the stream starts over
+    """
+    if cursor is None:
+        return 0
+    offset, _, cursor_version = cursor.partition(CURSOR_SEPARATOR)
+    if cursor_version != version or not offset.isdigit():
+        return None
+    return int(offset)
+
+
+def iter_area_pages(
+    areas: Mapping[str, Dict[str, Any]],
+    order: List[str],
+    version: str,
+    offset: int,
+    page_size: int,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Yield the pages of a stream from offset on.
+
+    Every page carries the cursor of the next one; the last page has none.
+    An empty home still yields one empty, final page.
+    """
+    while True:
+        page = order[offset:offset + page_size]
+        offset += len(page)
+        more = offset < len(order)
+        yield {
+            "version": version,
+            "areas": {area_id: areas[area_id] for area_id in page},
+            "cursor": make_cursor(version, offset) if more else None,
+        }
+        if not more:
+            return
@@ -0,0 +1,54 @@
+"""Single-flight coalescing of identical concurrent requests."""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Runs one computation per key at a time; concurrent callers share its result."""
+
+    def __init__(self):
+        """Initialize with nothing in flight."""
+        self._inflight: Dict[Hashable, asyncio.Future] = {}  # key -> running computation
+        self.started = 0
+        self.joined = 0
+
+    async def run(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the result of compute, joining a computation already running for key.
+
+        Every caller gets the same result object, or the same exception.
+        A caller that is cancelled does not cancel the computation the
+        others are waiting for.
+
+        Args:
+            key: Identifies requests that would compute the same result
+            compute: Starts the computation when none is running for key
+
+        Returns:
+            The shared result
+        """
+        future = self._inflight.get(key)
+        if future is None:
+            future = self._inflight[key] = asyncio.ensure_future(compute())
+            future.add_done_callback(lambda done: self._forget(key, done))
+            self.started += 1
+        else:
+            self.joined += 1
+        return await asyncio.shield(future)
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        """Let the next request for key start a fresh computation."""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Retrieved by the waiters; keeps asyncio quiet if they all left
+            future.exception()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return how many computations ran and how many requests joined one."""
+        return {
+            "in_flight": len(self._inflight),
+            "started": self.started,
+            "joined": self.joined,
+        }
@@ -4,12 +4,61 @@ import voluptuous as vol
 from homeassistant.components import websocket_api
 from homeassistant.core import HomeAssistant
 
+from ..config import MAX_FLUSH_INTERVAL_MS
+from .area_stream import DEFAULT_AREA_PAGE_SIZE, MAX_AREA_PAGE_SIZE
+from .outbox import WIRE_MODES
+from .selectors import SELECTOR_AREA, SELECTOR_CATEGORY, SELECTOR_DOMAIN
+from .throttle import POLICY_DEADBAND, POLICY_DEADBAND_PERCENT, POLICY_MIN_INTERVAL_MS, TIERS
+
 DOMAIN = "dashview_v2"
 
+# Optional per-connection coalescing window for pushed state changes
+FLUSH_INTERVAL_MS = vol.All(int, vol.Range(min=0, max=MAX_FLUSH_INTERVAL_MS))
+
+# Per-category overrides of the rate limit and numeric deadband of pushed changes
+UPDATE_POLICIES = {
+    str: {
+        vol.Optional(POLICY_MIN_INTERVAL_MS): vol.All(int, vol.Range(min=0)),
+        vol.Optional(POLICY_DEADBAND): vol.All(vol.Coerce(float), vol.Range(min=0)),
+        vol.Optional(POLICY_DEADBAND_PERCENT): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+}
+
+# Optional attribute projection of states inlined in subscription results
+INCLUDE_STATES = {
+    vol.Optional("include_states"): bool,
+    vol.Optional("attributes"): [str],
+}
+
+# Area, domain and/or category an entity must match, at least one required
+SELECTOR = vol.All(
+    {
+        vol.Optional(SELECTOR_AREA): str,
+        vol.Optional(SELECTOR_DOMAIN): str,
+        vol.Optional(SELECTOR_CATEGORY): str,
+    },
+    vol.Length(min=1),
+)
+
 # Command schemas
 GET_HOME_INFO_SCHEMA = websocket_api.websocket_command(
     {
         vol.Required("type"): f"{DOMAIN}/get_home_info",
+        # Version of the client's cached copy; answered with not_modified if current
+        vol.Optional("if_version"): str,
+    }
+)
+
+GET_AREA_VERSIONS_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/get_area_versions",
+    }
+)
+
+GET_AREAS_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/get_areas",
+        vol.Required("area_ids"): [str],
     }
 )
 
@@ -17,6 +66,11 @@ SUBSCRIBE_VISIBLE_ENTITIES_SCHEMA = websocket_api.websocket_command(
     {
         vol.Required("type"): f"{DOMAIN}/subscribe_visible_entities",
         vol.Required("entities"): [str],
+        vol.Optional("tier"): vol.In(TIERS),
+        vol.Optional("flush_interval_ms"): FLUSH_INTERVAL_MS,
+        vol.Optional("wire_mode"): vol.In(WIRE_MODES),
+        vol.Optional("update_policies"): UPDATE_POLICIES,
+        **INCLUDE_STATES,
     }
 )
 
@@ -34,10 +88,80 @@ GET_AREA_ENTITIES_SCHEMA = websocket_api.websocket_command(
     }
 )
 
+SUBSCRIBE_AREA_ENTITIES_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_area_entities",
+        vol.Optional("page_size", default=DEFAULT_AREA_PAGE_SIZE): vol.All(
+            int, vol.Range(min=1, max=MAX_AREA_PAGE_SIZE)
+        ),
+        # Cursor of the last page received, to resume an interrupted stream
+        vol.Optional("cursor"): str,
+    }
+)
+
 UPDATE_SUBSCRIPTIONS_SCHEMA = websocket_api.websocket_command(
     {
         vol.Required("type"): f"{DOMAIN}/update_subscriptions",
         vol.Required("entities"): [str],
+        vol.Optional("nearby"): [str],
+        vol.Optional("flush_interval_ms"): FLUSH_INTERVAL_MS,
+        vol.Optional("wire_mode"): vol.In(WIRE_MODES),
+        vol.Optional("update_policies"): UPDATE_POLICIES,
+        **INCLUDE_STATES,
+    }
+)
+
+RESYNC_ENTITIES_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/resync_entities",
+        vol.Optional("entities"): [str],
+        vol.Inclusive("since", "resync_point"): vol.All(int, vol.Range(min=0)),
+        vol.Inclusive("epoch", "resync_point"): str,
+    }
+)
+
+SET_SUBSCRIPTION_TIER_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/set_subscription_tier",
+        vol.Required("entities"): [str],
+        vol.Required("tier"): vol.In(TIERS),
+    }
+)
+
+SUBSCRIBE_VIEW_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_view",
+        vol.Required("entities"): [str],
+    }
+)
+
+UNSUBSCRIBE_VIEW_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/unsubscribe_view",
+    }
+)
+
+SUBSCRIBE_SELECTOR_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe_selector",
+        vol.Required("selector"): SELECTOR,
+        vol.Optional("flush_interval_ms"): FLUSH_INTERVAL_MS,
+        vol.Optional("wire_mode"): vol.In(WIRE_MODES),
+        vol.Optional("update_policies"): UPDATE_POLICIES,
+    }
+)
+
+UNSUBSCRIBE_SELECTOR_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/unsubscribe_selector",
+        vol.Required("selector"): SELECTOR,
+    }
+)
+
+GET_SUBSCRIPTION_STATS_SCHEMA = websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/get_subscription_stats",
+        vol.Optional("details", default=False): bool,
     }
 )
 
@@ -48,6 +172,16 @@ WEBSOCKET_COMMANDS = [
         "handler": "handle_get_home_info",
         "schema": GET_HOME_INFO_SCHEMA,
     },
+    {
+        "command": f"{DOMAIN}/get_area_versions",
+        "handler": "handle_get_area_versions",
+        "schema": GET_AREA_VERSIONS_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/get_areas",
+        "handler": "handle_get_areas",
+        "schema": GET_AREAS_SCHEMA,
+    },
     {
         "command": f"{DOMAIN}/subscribe_visible_entities",
         "handler": "handle_subscribe_visible_entities",
@@ -63,9 +197,49 @@ WEBSOCKET_COMMANDS = [
         "handler": "handle_get_area_entities",
         "schema": GET_AREA_ENTITIES_SCHEMA,
     },
+    {
+        "command": f"{DOMAIN}/subscribe_area_entities",
+        "handler": "handle_subscribe_area_entities",
+        "schema": SUBSCRIBE_AREA_ENTITIES_SCHEMA,
+    },
     {
         "command": f"{DOMAIN}/update_subscriptions",
         "handler": "handle_update_subscriptions",
         "schema": UPDATE_SUBSCRIPTIONS_SCHEMA,
     },
+    {
+        "command": f"{DOMAIN}/resync_entities",
+        "handler": "handle_resync_entities",
+        "schema": RESYNC_ENTITIES_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/set_subscription_tier",
+        "handler": "handle_set_subscription_tier",
+        "schema": SET_SUBSCRIPTION_TIER_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/subscribe_view",
+        "handler": "handle_subscribe_view",
+        "schema": SUBSCRIBE_VIEW_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/unsubscribe_view",
+        "handler": "handle_unsubscribe_view",
+        "schema": UNSUBSCRIBE_VIEW_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/subscribe_selector",
+        "handler": "handle_subscribe_selector",
+        "schema": SUBSCRIBE_SELECTOR_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/unsubscribe_selector",
+        "handler": "handle_unsubscribe_selector",
+        "schema": UNSUBSCRIBE_SELECTOR_SCHEMA,
+    },
+    {
+        "command": f"{DOMAIN}/get_subscription_stats",
+        "handler": "handle_get_subscription_stats",
+        "schema": GET_SUBSCRIPTION_STATS_SCHEMA,
+    },
 ]
\ No newline at end of file
@@ -0,0 +1,93 @@
+"""Shared subscription groups for clients showing the same view."""
+
+import hashlib
+import logging
+from typing import Any, Callable, Dict, FrozenSet, Iterable
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.json import json_bytes, json_fragment
+
+from .outbox import ConnectionOutbox, StateDeltaCache
+from .stats import SubscriptionStats
+
+_LOGGER = logging.getLogger(__name__)
+
+# Prefix telling view groups apart from connections among entity listeners
+VIEW_GROUP_PREFIX = "view:"
+
+
+def view_hash(entity_ids: Iterable[str]) -> str:
+    """Return the hash identifying a view by its set of entities."""
+    digest = hashlib.sha256(",".join(sorted(set(entity_ids))).encode())
+    return digest.hexdigest()[:16]
+
+
+class ViewGroupOutbox(ConnectionOutbox):
+    """Outbox handing its events to the group, which sends them per member."""
+
+    # Every member has its own subscription; the group itself needs none
+    stream_open = True
+
+    def send_event(self, event: Any) -> None:
+        """Hand an event to the group for broadcasting."""
+        self.send_message(event)
+
+
+class ViewGroup:
+    """One coalesced outbox broadcasting the same view to many connections."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        view: str,
+        entity_ids: FrozenSet[str],
+        flush_interval_ms: int,
+        delta_cache: StateDeltaCache,
+        max_pending: int,
+        stats: SubscriptionStats
+    ):
+        """
+        Initialize the view group.
+
+        Args:
+            hass: Home Assistant instance
+            view: Hash of the view's entity set
+            entity_ids: Entities shown by the view
+            flush_interval_ms: Coalescing window shared by all members
+            delta_cache: Delta cache shared with the other outboxes
+            max_pending: Maximum number of entities buffered between flushes
+            stats: Statistics shared with the connection outboxes
+        """
+        self.view = view
+        self.group_id = f"{VIEW_GROUP_PREFIX}{view}"
+        self.entity_ids = entity_ids
+        self.members: Dict[str, Callable[[Any], None]] = {}  # connection_id -> send_event
+        # Full wire mode only: a member that joins late has no delta baseline
+        self.outbox = ViewGroupOutbox(
+            hass, self._broadcast, flush_interval_ms, delta_cache, max_pending, stats
+        )
+        self.payloads_encoded = 0
+        self.messages_broadcast = 0
+
+    def _broadcast(self, event: Dict[str, Any]) -> None:
+        """Encode an event once and send it on every member's own subscription."""
+        payload = json_fragment(json_bytes(event))
+        self.payloads_encoded += 1
+        for connection_id, send_event in list(self.members.items()):
+            try:
+                send_event(payload)
+                self.messages_broadcast += 1
+            except Exception as err:
+                # A broken member must not hold back the others
+                _LOGGER.warning(f"Dropping {connection_id} from view {self.view}: {err}")
+                self.members.pop(connection_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return group statistics for monitoring."""
+        return {
+            "members": len(self.members),
+            "entities": len(self.entity_ids),
+            "payloads_encoded": self.payloads_encoded,
+            "messages_broadcast": self.messages_broadcast,
+            **self.outbox.get_stats()
+        }
@@ -1,15 +1,30 @@
 """WebSocket command handlers for Dashview V2."""
 
+import asyncio
 import logging
-from typing import Any, Dict, Optional
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
 
 from homeassistant.components import websocket_api
 from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import area_registry, entity_registry
+from homeassistant.helpers.json import json_bytes, json_fragment
 
+from ..config import (
+    CONF_FLUSH_INTERVAL_MS,
+    CONF_MAX_CONNECTIONS_PER_USER,
+    CONF_MAX_ENTITIES_PER_CONNECTION,
+    CONF_MAX_PENDING_UPDATES,
+    CONF_MAX_SUBSCRIBE_RATE,
+    CONF_SUBSCRIBE_BURST,
+    DashviewConfigSchema,
+)
 from ..intelligence.analyzer import HomeComplexityAnalyzer
 from ..intelligence.entity_mapper import EntityMapper
-from .commands import WEBSOCKET_COMMANDS
+from ..intelligence.registry_index import RegistryIndex
+from .area_stream import area_order, iter_area_pages, parse_cursor
+from .coalesce import SingleFlight
+from .commands import DOMAIN, WEBSOCKET_COMMANDS
+from .quotas import QuotaExceeded, SubscriptionQuotas
 from .subscriptions import SubscriptionManager
 
 _LOGGER = logging.getLogger(__name__)
@@ -17,13 +32,75 @@ _LOGGER = logging.getLogger(__name__)
 # Global subscription manager instance
 subscription_manager: Optional[SubscriptionManager] = None
 
+# Registry index and analyzer shared by the analysis commands for the integration's lifetime
+registry_index: Optional[RegistryIndex] = None
+home_analyzer: Optional[HomeComplexityAnalyzer] = None
+entity_mapper: Optional[EntityMapper] = None
 
-async def register_websocket_commands(hass: HomeAssistant) -> None:
+# Identical concurrent analysis requests share one computation
+request_coalescer = SingleFlight()
+
+# Last encoded analysis result per command: command -> (registry version, payload)
+_encoded_results: Dict[str, Tuple[str, json_fragment]] = {}
+
+# Priority order of the areas streamed by subscribe_area_entities: (registry version, area IDs)
+_area_order: Optional[Tuple[str, List[str]]] = None
+
+# Key of the close hook stored in ActiveConnection.subscriptions
+CONNECTION_CLEANUP_KEY = "dashview_v2_connection"
+
+
+class ConnectionCleanup:
+    """Close hook that unregisters a connection from the subscription manager."""
+    
+    def __init__(self, hass: HomeAssistant, connection_id: str):
+        """Initialize the hook for a connection."""
+        self.hass = hass
+        self.connection_id = connection_id
+    
+    @callback
+    def __call__(self) -> None:
+        """Handle the connection closing."""
+        websocket_connection_closed(self.hass, self.connection_id)
+
+
+async def register_websocket_commands(
+    hass: HomeAssistant,
+    config: Optional[Dict[str, Any]] = None,
+) -> None:
     """Register all WebSocket commands."""
-    global subscription_manager
+    global subscription_manager, registry_index, home_analyzer, entity_mapper
+    
+    config = DashviewConfigSchema(config or {})
+    
+    # Replace the manager and index left behind by a previous setup
+    if subscription_manager:
+        await subscription_manager.async_shutdown()
+    if home_analyzer:
+        home_analyzer.async_stop()
+    if registry_index:
+        registry_index.async_stop()
+    
+    registry_index = RegistryIndex(hass)
+    registry_index.async_start()
     
-    # Initialize subscription manager
-    subscription_manager = SubscriptionManager(hass)
+    # Initialize subscription manager; selectors share the registry index
+    subscription_manager = SubscriptionManager(
+        hass,
+        flush_interval_ms=config[CONF_FLUSH_INTERVAL_MS],
+        max_pending_updates=config[CONF_MAX_PENDING_UPDATES],
+        quotas=SubscriptionQuotas(
+            config[CONF_MAX_ENTITIES_PER_CONNECTION],
+            config[CONF_MAX_CONNECTIONS_PER_USER],
+            config[CONF_MAX_SUBSCRIBE_RATE],
+            config[CONF_SUBSCRIBE_BURST],
+        ),
+        registry_index=registry_index,
+    )
+    subscription_manager.async_start()
+    
+    home_analyzer = HomeComplexityAnalyzer(hass, registry_index)
+    entity_mapper = EntityMapper(hass)
     
     for command_def in WEBSOCKET_COMMANDS:
         handler = globals()[command_def["handler"]]
@@ -31,6 +108,192 @@ async def register_websocket_commands(hass: HomeAssistant) -> None:
         _LOGGER.info(f"Registered websocket command: {command_def['command']}")
 
 
+async def async_update_websocket_config(
+    hass: HomeAssistant,
+    config: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Apply changed options to the running subscription manager."""
+    config = DashviewConfigSchema(config or {})
+    
+    if subscription_manager:
+        subscription_manager.async_update_config(
+            config[CONF_FLUSH_INTERVAL_MS],
+            config[CONF_MAX_PENDING_UPDATES],
+            config[CONF_MAX_ENTITIES_PER_CONNECTION],
+            config[CONF_MAX_CONNECTIONS_PER_USER],
+            config[CONF_MAX_SUBSCRIBE_RATE],
+            config[CONF_SUBSCRIBE_BURST],
+        )
+
+
+async def async_unload_websocket_commands(hass: HomeAssistant) -> None:
+    """Release all subscriptions held by the WebSocket commands."""
+    global subscription_manager, registry_index, home_analyzer, entity_mapper, _area_order
+    
+    if subscription_manager:
+        await subscription_manager.async_shutdown()
+        subscription_manager = None
+    if home_analyzer:
+        home_analyzer.async_stop()
+        home_analyzer = None
+    if registry_index:
+        registry_index.async_stop()
+        registry_index = None
+    entity_mapper = None
+    _encoded_results.clear()
+    _area_order = None
+
+
+@callback
+def async_get_connection_id(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+) -> str:
+    """
+    Return the stable ID of a connection.
+    
+    The first call allocates an ID that is never reused and stores a close
+    hook in the connection's subscriptions, which Home Assistant calls when
+    the connection goes away.
+    """
+    cleanup = connection.subscriptions.get(CONNECTION_CLEANUP_KEY)
+    if not isinstance(cleanup, ConnectionCleanup):
+        cleanup = ConnectionCleanup(hass, subscription_manager.new_connection_id())
+        connection.subscriptions[CONNECTION_CLEANUP_KEY] = cleanup
+    return cleanup.connection_id
+
+
+async def _async_register_connection(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+    subscribe: bool = False,
+) -> str:
+    """
+    Register a connection with the subscription manager and return its ID.
+    
+    Every call counts against the connection's subscribe rate, so this raises
+    QuotaExceeded when the connection or its user is over a quota. With
+    subscribe set, the message is a subscription the client listens on:
+    pushes are sent as its events and unsubscribing from it ends them.
+    """
+    connection_id = async_get_connection_id(hass, connection)
+    cleanup = connection.subscriptions[CONNECTION_CLEANUP_KEY]
+    
+    # A rejected call must not create or refresh any connection state
+    subscription_manager.quotas.check_subscribe_rate(connection_id)
+    await subscription_manager.register_connection(
+        connection_id,
+        lambda message: connection.send_message(message),
+        msg.get("flush_interval_ms"),
+        msg.get("wire_mode"),
+        # Home Assistant clears subscriptions when the connection closes
+        lambda: connection.subscriptions.get(CONNECTION_CLEANUP_KEY) is cleanup,
+        msg.get("update_policies"),
+        connection.user.id if connection.user else None,
+        msg["id"] if subscribe else None,
+    )
+    
+    if subscribe:
+        manager = subscription_manager
+        connection.subscriptions[msg["id"]] = callback(
+            lambda: manager.async_close_subscription(connection_id, msg["id"])
+        )
+    return connection_id
+
+
+@callback
+def _async_abort_subscription(
+    connection: websocket_api.ActiveConnection,
+    msg_id: int,
+) -> None:
+    """Close a subscribe message that was answered with an error."""
+    close = connection.subscriptions.pop(msg_id, None)
+    if close is not None:
+        close()
+
+
+@callback
+def _async_send_rejection(
+    connection: websocket_api.ActiveConnection,
+    msg_id: int,
+    err: QuotaExceeded,
+) -> None:
+    """Send a quota rejection with its limit and retry hint."""
+    _LOGGER.info(f"Rejected request {msg_id}: {err}")
+    connection.send_error(
+        msg_id,
+        err.code,
+        str(err),
+        translation_key=err.code,
+        translation_domain=DOMAIN,
+        # Placeholders are strings; a missing hint has nothing to fill in
+        translation_placeholders={
+            key: str(value) for key, value in err.hints.items() if value is not None
+        },
+    )
+
+
+async def _async_encoded_result(
+    hass: HomeAssistant,
+    command: str,
+    build: Callable[[], Awaitable[Dict[str, Any]]],
+) -> json_fragment:
+    """
+    Return an analysis result encoded once per registry version.
+    
+    Concurrent requests for the same command and version share one
+    computation and receive the same encoded payload. Large homes make
+    for payloads of megabytes, so encoding runs in the executor.
+    """
+    version = home_analyzer.version
+    cached = _encoded_results.get(command)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    async def _async_build() -> json_fragment:
+        result = await build()
+        payload = json_fragment(await hass.async_add_executor_job(json_bytes, result))
+        _encoded_results[command] = (version, payload)
+        return payload
+    
+    return await request_coalescer.run((command, version), _async_build)
+
+
+async def _async_area_order(hass: HomeAssistant, complexity: Dict[str, Any]) -> List[str]:
+    """
+    Return the priority order of the areas, computed once per registry version.
+    
+    Scoring touches every entity, so it runs in the executor.
+    """
+    version = complexity["version"]
+    if _area_order is not None and _area_order[0] == version:
+        return _area_order[1]
+    
+    async def _async_build() -> List[str]:
+        global _area_order
+        order = await hass.async_add_executor_job(
+            area_order, complexity["areas"], entity_mapper.calculate_entity_priority
+        )
+        _area_order = (version, order)
+        return order
+    
+    return await request_coalescer.run(("area_order", version), _async_build)
+
+
+async def _async_stream_area_pages(
+    connection: websocket_api.ActiveConnection,
+    msg_id: int,
+    pages: Iterator[Dict[str, Any]],
+) -> None:
+    """Send the pages of an area stream, letting other work run in between."""
+    for page in pages:
+        connection.send_message(websocket_api.event_message(msg_id, page))
+        # The first rooms go out before the rest of the house is serialized
+        await asyncio.sleep(0)
+    connection.subscriptions.pop(msg_id, None)
+
+
 @websocket_api.async_response
 async def handle_get_home_info(
     hass: HomeAssistant,
@@ -39,12 +302,19 @@ async def handle_get_home_info(
 ) -> None:
     """Handle get_home_info command with area breakdown."""
     try:
-        # Calculate comprehensive home complexity
-        analyzer = HomeComplexityAnalyzer(hass)
-        home_complexity = await analyzer.get_home_complexity()
+        # The client's copy is current: skip the analysis and the payload
+        if_version = msg.get("if_version")
+        if if_version is not None and if_version == home_analyzer.version:
+            connection.send_result(msg["id"], {"not_modified": True, "version": if_version})
+            return
+        
+        # Memoized, encoded once and shared by concurrent requests
+        payload = await _async_encoded_result(
+            hass, "get_home_info", home_analyzer.get_home_complexity
+        )
         
-        connection.send_result(msg["id"], home_complexity)
-        _LOGGER.debug(f"Sent home info with {len(home_complexity['areas'])} areas")
+        connection.send_result(msg["id"], payload)
+        _LOGGER.debug(f"Sent home info at version {home_analyzer.version}")
         
     except Exception as err:
         _LOGGER.error(f"Error getting home info: {err}")
@@ -55,6 +325,65 @@ async def handle_get_home_info(
         )
 
 
+@websocket_api.async_response
+async def handle_get_area_versions(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle get_area_versions command with the content hash of every area."""
+    try:
+        # Clients diff these against their copies and fetch changed areas only
+        async def _async_build() -> Dict[str, Any]:
+            complexity = await home_analyzer.get_home_complexity()
+            return {
+                "version": complexity["version"],
+                "areas": {
+                    area_id: area["hash"] for area_id, area in complexity["areas"].items()
+                }
+            }
+        
+        payload = await _async_encoded_result(hass, "get_area_versions", _async_build)
+        connection.send_result(msg["id"], payload)
+        
+    except Exception as err:
+        _LOGGER.error(f"Error getting area versions: {err}")
+        connection.send_error(
+            msg["id"],
+            "error",
+            f"Failed to get area versions: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_get_areas(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle get_areas command with the breakdown of the requested areas only."""
+    try:
+        complexity = await home_analyzer.get_home_complexity()
+        areas = complexity["areas"]
+        
+        connection.send_result(msg["id"], {
+            "version": complexity["version"],
+            "areas": {
+                area_id: areas[area_id] for area_id in msg["area_ids"] if area_id in areas
+            },
+            # Removed since the client's copy; it should drop them
+            "missing": [area_id for area_id in msg["area_ids"] if area_id not in areas]
+        })
+        
+    except Exception as err:
+        _LOGGER.error(f"Error getting areas: {err}")
+        connection.send_error(
+            msg["id"],
+            "error",
+            f"Failed to get areas: {str(err)}",
+        )
+
+
 @websocket_api.async_response
 async def handle_subscribe_visible_entities(
     hass: HomeAssistant,
@@ -64,29 +393,45 @@ async def handle_subscribe_visible_entities(
     """Handle subscribing to visible entities."""
     try:
         entities = msg["entities"]
-        connection_id = id(connection)
         
         # Register connection if not already registered
-        await subscription_manager.register_connection(
-            str(connection_id),
-            lambda message: connection.send_message(message)
-        )
+        connection_id = await _async_register_connection(hass, connection, msg, subscribe=True)
+        active = await subscription_manager.get_active_subscriptions(connection_id)
+        already_subscribed = set(active[connection_id])
         
         # Subscribe to entities
         results = await subscription_manager.subscribe_to_entities(
-            str(connection_id),
+            connection_id,
             entities
         )
         
-        connection.send_result(msg["id"], {
+        subscribed = [e for e, success in results.items() if success]
+        if "tier" in msg:
+            await subscription_manager.set_entity_tier(connection_id, subscribed, msg["tier"])
+        response = {
             "success": True,
-            "subscribed": [e for e, success in results.items() if success],
-            "failed": [e for e, success in results.items() if not success]
-        })
+            "subscribed": subscribed,
+            "failed": [e for e, success in results.items() if not success],
+            "seq": subscription_manager.seq,
+            "epoch": subscription_manager.epoch
+        }
+        if msg.get("include_states"):
+            # Only newly subscribed entities; the client has the rest already
+            response["states"] = subscription_manager.get_initial_states(
+                connection_id,
+                [e for e in subscribed if e not in already_subscribed],
+                msg.get("attributes")
+            )
+        
+        connection.send_result(msg["id"], response)
         
         _LOGGER.debug(f"Connection {connection_id} subscribed to {sum(results.values())} entities")
         
+    except QuotaExceeded as err:
+        _async_abort_subscription(connection, msg["id"])
+        _async_send_rejection(connection, msg["id"], err)
     except Exception as err:
+        _async_abort_subscription(connection, msg["id"])
         _LOGGER.error(f"Error subscribing to entities: {err}")
         connection.send_error(
             msg["id"],
@@ -104,7 +449,7 @@ async def handle_unsubscribe_hidden_entities(
     """Handle unsubscribing from hidden entities."""
     try:
         entities = msg["entities"]
-        connection_id = str(id(connection))
+        connection_id = async_get_connection_id(hass, connection)
         
         # Unsubscribe from entities
         results = await subscription_manager.unsubscribe_from_entities(
@@ -137,13 +482,11 @@ async def handle_get_area_entities(
 ) -> None:
     """Handle getting entities grouped by area."""
     try:
-        analyzer = HomeComplexityAnalyzer(hass)
         area_id = msg.get("area_id")
         
         if area_id:
             # Get entities for specific area
-            entity_groups = await analyzer.group_entities_by_area()
-            entities = entity_groups.get(area_id, [])
+            entities = registry_index.area_entities(area_id)
             
             connection.send_result(msg["id"], {
                 "area_id": area_id,
@@ -151,18 +494,21 @@ async def handle_get_area_entities(
             })
         else:
             # Get all entities grouped by area
-            areas = await analyzer.analyze_areas()
-            result = {}
-            
-            for area_id, area_info in areas.items():
-                result[area_id] = {
-                    "name": area_info.name,
-                    "entities": area_info.entities,
-                    "entity_count": len(area_info.entities),
-                    "device_count": area_info.device_count
+            # Same breakdown as the home analysis, which runs off the loop
+            async def _async_build() -> Dict[str, Any]:
+                complexity = await home_analyzer.get_home_complexity()
+                return {
+                    area_id: {
+                        "name": area["name"],
+                        "entities": area["entities"],
+                        "entity_count": area["entity_count"],
+                        "device_count": area["device_count"]
+                    }
+                    for area_id, area in complexity["areas"].items()
                 }
             
-            connection.send_result(msg["id"], result)
+            payload = await _async_encoded_result(hass, "get_area_entities", _async_build)
+            connection.send_result(msg["id"], payload)
         
         _LOGGER.debug(f"Sent area entities")
         
@@ -175,6 +521,47 @@ async def handle_get_area_entities(
         )
 
 
+@websocket_api.async_response
+async def handle_subscribe_area_entities(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle streaming entities grouped by area, a page of areas at a time."""
+    try:
+        complexity = await home_analyzer.get_home_complexity()
+        order = await _async_area_order(hass, complexity)
+        version = complexity["version"]
+        
+        # A cursor from another registry version cannot be resumed; start over
+        offset = parse_cursor(msg.get("cursor"), version)
+        pages = iter_area_pages(
+            complexity["areas"], order, version, offset or 0, msg["page_size"]
+        )
+        
+        connection.send_result(msg["id"], {
+            "version": version,
+            "total_areas": len(order),
+            "resumed": "cursor" in msg and offset is not None
+        })
+        
+        # Tasks may start eagerly, so the first page can go out right here:
+        # only after the result, which the client waits for before pages
+        task = hass.async_create_task(_async_stream_area_pages(connection, msg["id"], pages))
+        if not task.done():
+            connection.subscriptions[msg["id"]] = task.cancel
+        
+        _LOGGER.debug(f"Streaming {len(order)} areas at version {version}")
+        
+    except Exception as err:
+        _LOGGER.error(f"Error streaming area entities: {err}")
+        connection.send_error(
+            msg["id"],
+            "error",
+            f"Failed to stream area entities: {str(err)}",
+        )
+
+
 @websocket_api.async_response
 async def handle_update_subscriptions(
     hass: HomeAssistant,
@@ -184,27 +571,37 @@ async def handle_update_subscriptions(
     """Handle updating subscriptions to match new entity list."""
     try:
         entities = msg["entities"]
-        connection_id = str(id(connection))
         
         # Register connection if not already registered
-        await subscription_manager.register_connection(
-            connection_id,
-            lambda message: connection.send_message(message)
-        )
+        connection_id = await _async_register_connection(hass, connection, msg)
         
         # Update subscriptions
         results = await subscription_manager.update_subscriptions(
             connection_id,
-            entities
+            entities,
+            msg.get("nearby")
         )
         
-        connection.send_result(msg["id"], results)
+        response = {
+            **results,
+            "seq": subscription_manager.seq,
+            "epoch": subscription_manager.epoch
+        }
+        if msg.get("include_states"):
+            # Only newly visible entities; the client has the rest already
+            response["states"] = subscription_manager.get_initial_states(
+                connection_id, results["subscribed"], msg.get("attributes")
+            )
+        
+        connection.send_result(msg["id"], response)
         
         _LOGGER.debug(
             f"Updated subscriptions for {connection_id}: "
             f"{len(results['subscribed'])} added, {len(results['unsubscribed'])} removed"
         )
         
+    except QuotaExceeded as err:
+        _async_send_rejection(connection, msg["id"], err)
     except Exception as err:
         _LOGGER.error(f"Error updating subscriptions: {err}")
         connection.send_error(
@@ -214,14 +611,224 @@ async def handle_update_subscriptions(
         )
 
 
+@websocket_api.async_response
+async def handle_resync_entities(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle resending subscribed entities in full."""
+    try:
+        connection_id = async_get_connection_id(hass, connection)
+        
+        results = await subscription_manager.resync_entities(
+            connection_id,
+            msg.get("entities"),
+            msg.get("since"),
+            msg.get("epoch")
+        )
+        
+        connection.send_result(msg["id"], {"success": True, **results})
+        
+        _LOGGER.debug(f"Resynced {len(results['resynced'])} entities for {connection_id}")
+        
+    except Exception as err:
+        _LOGGER.error(f"Error resyncing entities: {err}")
+        connection.send_error(
+            msg["id"],
+            "resync_error",
+            f"Failed to resync entities: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_set_subscription_tier(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle moving subscribed entities between visible and near-visible."""
+    try:
+        connection_id = async_get_connection_id(hass, connection)
+        
+        changed = await subscription_manager.set_entity_tier(
+            connection_id,
+            msg["entities"],
+            msg["tier"]
+        )
+        
+        connection.send_result(msg["id"], {"success": True, "entities": changed})
+        
+    except Exception as err:
+        _LOGGER.error(f"Error setting subscription tier: {err}")
+        connection.send_error(
+            msg["id"],
+            "tier_error",
+            f"Failed to set subscription tier: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_subscribe_view(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle joining the shared subscription group of a view."""
+    try:
+        connection_id = await _async_register_connection(hass, connection, msg, subscribe=True)
+        
+        results = await subscription_manager.join_view(
+            connection_id,
+            msg["entities"]
+        )
+        
+        # Members joining late start from the current states
+        connection.send_result(msg["id"], {
+            "success": True,
+            **results,
+            "states": subscription_manager.get_initial_states(
+                connection_id, results["entities"]
+            ),
+            "seq": subscription_manager.seq,
+            "epoch": subscription_manager.epoch
+        })
+        
+        _LOGGER.debug(
+            f"Connection {connection_id} joined view {results['view']} "
+            f"({results['members']} members)"
+        )
+        
+    except QuotaExceeded as err:
+        _async_abort_subscription(connection, msg["id"])
+        _async_send_rejection(connection, msg["id"], err)
+    except Exception as err:
+        _async_abort_subscription(connection, msg["id"])
+        _LOGGER.error(f"Error subscribing to view: {err}")
+        connection.send_error(
+            msg["id"],
+            "subscription_error",
+            f"Failed to subscribe to view: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_unsubscribe_view(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle leaving the shared subscription group of a view."""
+    try:
+        connection_id = async_get_connection_id(hass, connection)
+        
+        success = await subscription_manager.leave_view(connection_id)
+        
+        connection.send_result(msg["id"], {"success": success})
+        
+    except Exception as err:
+        _LOGGER.error(f"Error unsubscribing from view: {err}")
+        connection.send_error(
+            msg["id"],
+            "unsubscription_error",
+            f"Failed to unsubscribe from view: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_subscribe_selector(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle subscribing to every entity matching a selector."""
+    try:
+        connection_id = await _async_register_connection(hass, connection, msg, subscribe=True)
+        
+        results = await subscription_manager.subscribe_to_selector(
+            connection_id,
+            msg["selector"]
+        )
+        
+        connection.send_result(msg["id"], {
+            "success": True,
+            **results,
+            "seq": subscription_manager.seq,
+            "epoch": subscription_manager.epoch
+        })
+        
+        _LOGGER.debug(f"Connection {connection_id} subscribed to selector {results['selector']}")
+        
+    except QuotaExceeded as err:
+        _async_abort_subscription(connection, msg["id"])
+        _async_send_rejection(connection, msg["id"], err)
+    except Exception as err:
+        _async_abort_subscription(connection, msg["id"])
+        _LOGGER.error(f"Error subscribing to selector: {err}")
+        connection.send_error(
+            msg["id"],
+            "subscription_error",
+            f"Failed to subscribe to selector: {str(err)}",
+        )
+
+
+@websocket_api.async_response
+async def handle_unsubscribe_selector(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle unsubscribing from a selector."""
+    try:
+        connection_id = async_get_connection_id(hass, connection)
+        
+        success = await subscription_manager.unsubscribe_from_selector(
+            connection_id,
+            msg["selector"]
+        )
+        
+        connection.send_result(msg["id"], {"success": success})
+        
+    except Exception as err:
+        _LOGGER.error(f"Error unsubscribing from selector: {err}")
+        connection.send_error(
+            msg["id"],
+            "unsubscription_error",
+            f"Failed to unsubscribe from selector: {str(err)}",
+        )
+
+
+@websocket_api.require_admin
+@websocket_api.async_response
+async def handle_get_subscription_stats(
+    hass: HomeAssistant,
+    connection: websocket_api.ActiveConnection,
+    msg: Dict[str, Any],
+) -> None:
+    """Handle an admin request for subscription statistics."""
+    try:
+        result = subscription_manager.get_subscription_stats()
+        if msg["details"]:
+            result["details"] = subscription_manager.get_subscription_details()
+        
+        connection.send_result(msg["id"], result)
+        
+    except Exception as err:
+        _LOGGER.error(f"Error getting subscription stats: {err}")
+        connection.send_error(
+            msg["id"],
+            "stats_error",
+            f"Failed to get subscription stats: {str(err)}",
+        )
+
+
 @callback
 def websocket_connection_closed(
     hass: HomeAssistant,
-    connection: websocket_api.ActiveConnection,
+    connection_id: str,
 ) -> None:
     """Handle WebSocket connection closed."""
     if subscription_manager:
-        connection_id = str(id(connection))
         hass.async_create_task(
             subscription_manager.unregister_connection(connection_id)
         )
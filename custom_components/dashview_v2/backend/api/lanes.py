@@ -0,0 +1,72 @@
+"""Priority lanes deciding how long a pushed change may wait before it is sent."""
+
+from collections import deque
+from typing import Deque, Dict
+
+# Lanes ordered from most to least urgent
+LANE_CRITICAL = 0  # Locks, alarms and doors: sent immediately
+LANE_INTERACTIVE = 1  # Lights, switches, covers: sent within a short window
+LANE_BULK = 2  # Sensors and the rest: batched in the connection's window
+LANES = (LANE_CRITICAL, LANE_INTERACTIVE, LANE_BULK)
+LANE_NAMES = {
+    LANE_CRITICAL: "critical",
+    LANE_INTERACTIVE: "interactive",
+    LANE_BULK: "bulk",
+}
+
+# Lowest EntityMapper.calculate_entity_priority score of each lane
+CRITICAL_PRIORITY = 9
+INTERACTIVE_PRIORITY = 7
+
+# Longest coalescing window of the interactive lane
+INTERACTIVE_WINDOW_MS = 25
+
+# p99 send latency the critical lane is expected to stay under
+CRITICAL_TARGET_P99_MS = 50
+
+# Latency samples kept per lane for percentiles
+LATENCY_SAMPLES = 1024
+
+
+def lane_for_priority(priority: int) -> int:
+    """Return the lane of an entity from its priority score."""
+    if priority >= CRITICAL_PRIORITY:
+        return LANE_CRITICAL
+    if priority >= INTERACTIVE_PRIORITY:
+        return LANE_INTERACTIVE
+    return LANE_BULK
+
+
+def lane_window_ms(lane: int, flush_interval_ms: int) -> int:
+    """Return how long a change in a lane may wait given the connection's window."""
+    if lane == LANE_CRITICAL:
+        return 0
+    if lane == LANE_INTERACTIVE:
+        return min(flush_interval_ms, INTERACTIVE_WINDOW_MS)
+    return flush_interval_ms
+
+
+class LatencyRecorder:
+    """Keeps recent queue-to-send latencies of one lane."""
+
+    def __init__(self, max_samples: int = LATENCY_SAMPLES):
+        """Initialize the recorder."""
+        self._samples: Deque[float] = deque(maxlen=max_samples)
+        self.count = 0
+
+    def record(self, latency_ms: float) -> None:
+        """Add one latency sample in milliseconds."""
+        self._samples.append(latency_ms)
+        self.count += 1
+
+    def get_stats(self) -> Dict[str, float]:
+        """Return the sample count and recent p50, p99 and max latency."""
+        if not self._samples:
+            return {"count": self.count, "p50_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        samples = sorted(self._samples)
+        return {
+            "count": self.count,
+            "p50_ms": round(samples[len(samples) // 2], 3),
+            "p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))], 3),
+            "max_ms": round(samples[-1], 3),
+        }
@@ -0,0 +1,692 @@
+"""Per-connection outbox that coalesces state changes into batched messages."""
+
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from homeassistant.const import (
+    COMPRESSED_STATE_ATTRIBUTES,
+    COMPRESSED_STATE_LAST_CHANGED,
+    COMPRESSED_STATE_LAST_UPDATED,
+    COMPRESSED_STATE_STATE,
+)
+from homeassistant.components import websocket_api
+from homeassistant.core import HomeAssistant, State, callback
+from homeassistant.helpers.event import async_call_later
+from homeassistant.helpers.json import json_bytes, json_fragment
+
+from .lanes import LANE_BULK, LANE_NAMES, LANES, LatencyRecorder, lane_window_ms
+from .stats import SubscriptionStats
+from .throttle import TIER_NEARBY, TIER_VISIBLE, UpdateFilter
+
+_LOGGER = logging.getLogger(__name__)
+
+# Event type of the batched message pushed to dashboard connections
+EVENT_STATES_CHANGED = "dashview_v2_states_changed"
+# Event type telling an evicted client to call resync_entities
+EVENT_RESYNC_REQUIRED = "dashview_v2_resync_required"
+
+# Consecutive overflowing or failed flushes before a client is evicted
+STALL_THRESHOLD = 3
+
+# Wire modes a connection can negotiate
+WIRE_MODE_FULL = "full"  # old_state/new_state dicts per entity
+WIRE_MODE_DELTA = "delta"  # compressed states and attribute diffs
+WIRE_MODES = (WIRE_MODE_FULL, WIRE_MODE_DELTA)
+
+# Keys of a delta-mode batch, matching Home Assistant's subscribe_entities
+DELTA_ADDED = "a"
+DELTA_CHANGED = "c"
+DELTA_REMOVED = "r"
+DIFF_ADDITIONS = "+"
+DIFF_REMOVALS = "-"
+
+_MISSING = object()
+
+
+def state_fragment(state: Optional[State]) -> Optional[json_fragment]:
+    """
+    Return the pre-encoded JSON of a state.
+
+    State.json_fragment is cached on the State object itself, so a state is
+    serialized once no matter how many connections it is sent to.
+    """
+    return state.json_fragment if state else None
+
+
+def compact_state(state: State, attributes: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """
+    Return the compressed form of a state for inlining in a command result.
+
+    Without a projection the compressed state cached on the State object is
+    returned as is; with one, only the listed attributes are kept.
+    """
+    compressed = state.as_compressed_state
+    if attributes is None:
+        return compressed
+    source = state.attributes
+    return {
+        **compressed,
+        COMPRESSED_STATE_ATTRIBUTES: {key: source[key] for key in attributes if key in source}
+    }
+
+
+def state_diff(old_state: State, new_state: State) -> Dict[str, Any]:
+    """
+    Build the delta from a state the client already has to a newer one.
+
+    The new state string is always included; attributes are limited to the
+    keys whose value changed, and removed keys are listed separately.
+    """
+    additions: Dict[str, Any] = {COMPRESSED_STATE_STATE: new_state.state}
+    diff: Dict[str, Any] = {DIFF_ADDITIONS: additions}
+
+    if old_state.last_changed != new_state.last_changed:
+        additions[COMPRESSED_STATE_LAST_CHANGED] = new_state.last_changed.timestamp()
+    elif old_state.last_updated != new_state.last_updated:
+        additions[COMPRESSED_STATE_LAST_UPDATED] = new_state.last_updated.timestamp()
+
+    old_attributes = old_state.attributes
+    new_attributes = new_state.attributes
+    if old_attributes != new_attributes:
+        changed = {
+            key: value
+            for key, value in new_attributes.items()
+            if old_attributes.get(key, _MISSING) != value
+        }
+        if changed:
+            additions[COMPRESSED_STATE_ATTRIBUTES] = changed
+        removed = [key for key in old_attributes if key not in new_attributes]
+        if removed:
+            diff[DIFF_REMOVALS] = {COMPRESSED_STATE_ATTRIBUTES: removed}
+
+    return diff
+
+
+class StateDeltaCache:
+    """Shares encoded deltas between connections holding the same base state."""
+
+    def __init__(self):
+        """Initialize the cache."""
+        self._entries: Dict[str, Tuple[State, State, json_fragment]] = {}  # entity_id -> (base, new, delta)
+
+    def get(self, base: State, new_state: State) -> json_fragment:
+        """Return the encoded delta from base to new_state, computing it at most once."""
+        entry = self._entries.get(new_state.entity_id)
+        if entry is not None and entry[0] is base and entry[1] is new_state:
+            return entry[2]
+
+        delta = json_fragment(json_bytes(state_diff(base, new_state)))
+        self._entries[new_state.entity_id] = (base, new_state, delta)
+        return delta
+
+    def discard(self, entity_id: str) -> None:
+        """Forget the cached delta of an entity that is no longer tracked."""
+        self._entries.pop(entity_id, None)
+
+
+class ConnectionOutbox:
+    """Buffers state changes for one connection and flushes them in batches."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        send_message: Callable[[Any], None],
+        flush_interval_ms: int,
+        delta_cache: Optional[StateDeltaCache] = None,
+        max_pending: int = 1000,
+        stats: Optional[SubscriptionStats] = None,
+        subscription_id: Optional[int] = None
+    ):
+        """
+        Initialize the outbox.
+
+        Args:
+            hass: Home Assistant instance
+            send_message: Function sending a message to the connection
+            flush_interval_ms: Coalescing window in milliseconds, 0 sends immediately
+            delta_cache: Delta cache shared with the other connections
+            max_pending: Maximum number of entities buffered between flushes
+            stats: Statistics shared with the other outboxes
+            subscription_id: ID of the subscribe message carrying pushes, if open yet
+        """
+        self.hass = hass
+        self.send_message = send_message
+        # ID of the subscribe message whose event stream the client listens on
+        self.subscription_id = subscription_id
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending = max_pending
+        self._wire_mode = WIRE_MODE_FULL
+        self._delta_cache = delta_cache or StateDeltaCache()
+        self._pending: Dict[str, Dict[str, Any]] = {}  # entity_id -> change
+        self._last_sent: Dict[str, State] = {}  # entity_id -> state the client holds (delta mode)
+        self._held: Dict[str, Dict[str, Any]] = {}  # entity_id -> change waiting for its interval
+        self._dropped: Dict[str, Optional[int]] = {}  # entity_id -> seq of its first change lost on overflow
+        self._unannounced: Set[str] = set()  # dropped entity_ids the client was not told about yet
+        self._nearby: Set[str] = set()  # entity_ids in the reduced-rate tier
+        self._cancel_flush: Optional[Callable[[], None]] = None
+        self._flush_at: Optional[float] = None
+        self._cancel_release: Optional[Callable[[], None]] = None
+        self._release_at: Optional[float] = None
+        self._overflowed = False
+        self._stall_streak = 0
+        self._last_seq = 0
+        self.needs_resync = False
+        self.evicted_at: Optional[float] = None
+        self.updates_received = 0
+        self.updates_coalesced = 0
+        self.updates_dropped = 0
+        self.messages_sent = 0
+        self.evictions = 0
+        self.update_filter = UpdateFilter()
+        self.latency = {lane: LatencyRecorder() for lane in LANES}
+        self.stats = stats or SubscriptionStats()
+
+    @property
+    def pending_count(self) -> int:
+        """Return the number of entities waiting to be flushed."""
+        return len(self._pending)
+
+    @property
+    def stream_open(self) -> bool:
+        """Return whether pushes have a subscribe message to go out on."""
+        return self.subscription_id is not None
+
+    @callback
+    def async_open_stream(self, subscription_id: int) -> None:
+        """Carry pushes on a subscribe message and send what waited for it."""
+        self.subscription_id = subscription_id
+        self.async_flush()
+
+    @property
+    def wire_mode(self) -> str:
+        """Return the negotiated wire mode."""
+        return self._wire_mode
+
+    @wire_mode.setter
+    def wire_mode(self, wire_mode: str) -> None:
+        """Switch wire mode; the delta baseline starts over."""
+        if wire_mode != self._wire_mode:
+            self._wire_mode = wire_mode
+            self._last_sent.clear()
+
+    @callback
+    def async_add(
+        self,
+        entity_id: str,
+        old_state: Optional[State],
+        new_state: Optional[State],
+        seq: Optional[int] = None,
+        category: Optional[str] = None,
+        lane: int = LANE_BULK
+    ) -> None:
+        """
+        Queue a state change, replacing any pending change for the same entity.
+
+        The first old_state of the window is kept so the client still sees
+        the transition it missed; the newest new_state wins. Each batch
+        carries the sequence number up to which nothing is left buffered.
+        Changes are first run through the update policy of their category;
+        their lane decides how soon the batch goes out.
+        """
+        self.updates_received += 1
+        if seq is not None:
+            self._last_seq = max(self._last_seq, seq)
+        if self.needs_resync:
+            # Evicted clients are not buffered until they resync
+            self.updates_dropped += 1
+            self.stats.dropped += 1
+            return
+
+        if not self._async_admit(entity_id, old_state, new_state, category, lane, seq):
+            return
+        self._enqueue(entity_id, old_state, new_state, lane, seq)
+
+    @callback
+    def _async_admit(
+        self,
+        entity_id: str,
+        old_state: Optional[State],
+        new_state: Optional[State],
+        category: Optional[str],
+        lane: int,
+        seq: Optional[int]
+    ) -> bool:
+        """Apply the category's deadband and minimum interval to a change."""
+        if new_state is None:
+            # Removals always go out and reset what the filter knows
+            self._held.pop(entity_id, None)
+            self.update_filter.forget(entity_id)
+            return True
+
+        tier = TIER_NEARBY if entity_id in self._nearby else TIER_VISIBLE
+        policy = self.update_filter.policy_for(category, tier)
+        if not policy.active:
+            return True
+
+        if self.update_filter.within_deadband(entity_id, new_state, policy):
+            # The client's value is close enough; a held change is moot too
+            self._held.pop(entity_id, None)
+            self.update_filter.dropped_deadband += 1
+            self.stats.filtered += 1
+            return False
+
+        now = time.monotonic()
+        delay = self.update_filter.delay(entity_id, policy, now)
+        if delay > 0:
+            held = self._held.get(entity_id)
+            if held is not None:
+                held["new_state"] = new_state
+                held["seq"] = seq
+                self.update_filter.dropped_interval += 1
+                self.stats.filtered += 1
+            else:
+                self._held[entity_id] = {
+                    "old_state": old_state,
+                    "new_state": new_state,
+                    "policy": policy,
+                    "lane": lane,
+                    "seq": seq,
+                    "due": now + delay
+                }
+                self._schedule_release(now + delay, now)
+            return False
+
+        self._held.pop(entity_id, None)
+        self.update_filter.mark_passed(entity_id, new_state, now)
+        return True
+
+    @callback
+    def _schedule_release(self, release_at: float, now: float) -> None:
+        """Make sure held changes are released no later than release_at."""
+        if self._release_at is not None and self._release_at <= release_at:
+            return
+        if self._cancel_release:
+            self._cancel_release()
+        self._release_at = release_at
+        self._cancel_release = async_call_later(
+            self.hass,
+            max(0.0, release_at - now),
+            self._async_release_held
+        )
+
+    @callback
+    def _async_release_held(self, _now: Any) -> None:
+        """Queue held changes whose interval has passed."""
+        self._cancel_release = None
+        self._release_at = None
+        now = time.monotonic()
+
+        for entity_id in [
+            entity_id for entity_id, held in self._held.items() if held["due"] <= now
+        ]:
+            held = self._held.pop(entity_id)
+            new_state = held["new_state"]
+            if self.update_filter.within_deadband(entity_id, new_state, held["policy"]):
+                self.update_filter.dropped_deadband += 1
+                self.stats.filtered += 1
+                continue
+            self.update_filter.mark_passed(entity_id, new_state, now)
+            self._enqueue(entity_id, held["old_state"], new_state, held["lane"], held["seq"])
+
+        if self._held:
+            self._schedule_release(min(held["due"] for held in self._held.values()), now)
+
+    @callback
+    def _enqueue(
+        self,
+        entity_id: str,
+        old_state: Optional[State],
+        new_state: Optional[State],
+        lane: int = LANE_BULK,
+        seq: Optional[int] = None
+    ) -> None:
+        """Add an admitted change to the pending batch and schedule its lane."""
+        now = time.monotonic()
+        pending = self._pending.get(entity_id)
+        if pending is not None:
+            pending["new_state"] = new_state
+            pending["seq"] = seq
+            self.updates_coalesced += 1
+            self.stats.coalesced += 1
+        else:
+            if len(self._pending) >= self.max_pending:
+                # Queue full: the oldest change of the least urgent lane makes room,
+                # and its entity is sent to the client for a resync on the next flush
+                dropped_id = max(self._pending, key=lambda eid: self._pending[eid]["lane"])
+                self._mark_dropped(dropped_id, self._pending.pop(dropped_id)["seq"])
+                self.updates_dropped += 1
+                self.stats.dropped += 1
+                self._overflowed = True
+            self._pending[entity_id] = {
+                "old_state": old_state,
+                "new_state": new_state,
+                "lane": lane,
+                "seq": seq,
+                "queued_at": now
+            }
+
+        window_ms = lane_window_ms(lane, self.flush_interval_ms)
+        if window_ms <= 0:
+            # Urgent changes go out alone, without waiting on the batch
+            self.async_flush(lane if self.flush_interval_ms > 0 else LANE_BULK)
+            return
+
+        # The most urgent pending lane sets the deadline of the whole batch
+        flush_at = now + window_ms / 1000
+        if self._flush_at is not None and self._flush_at <= flush_at:
+            return
+        if self._cancel_flush:
+            self._cancel_flush()
+        self._flush_at = flush_at
+        self._cancel_flush = async_call_later(
+            self.hass,
+            window_ms / 1000,
+            self._async_scheduled_flush
+        )
+
+    @callback
+    def _async_scheduled_flush(self, _now: Any) -> None:
+        """Flush when the coalescing window closes."""
+        self._cancel_flush = None
+        self._flush_at = None
+        self.async_flush()
+
+    @callback
+    def async_flush(self, max_lane: int = LANE_BULK) -> None:
+        """
+        Send pending changes as one batched event message.
+
+        With max_lane below LANE_BULK only the more urgent lanes are sent and
+        the rest keeps waiting for its scheduled flush. A full flush is followed
+        by a resync notice listing the entities whose changes were dropped.
+        Until the client opens its push subscription nothing is sent; the
+        changes wait, bounded by max_pending like any other backlog.
+        """
+        if not self.stream_open:
+            return
+
+        if max_lane < LANE_BULK:
+            batch = {
+                entity_id: change
+                for entity_id, change in self._pending.items()
+                if change["lane"] <= max_lane
+            }
+            for entity_id in batch:
+                del self._pending[entity_id]
+            if batch:
+                self._send_batch(batch)
+            return
+
+        if self._cancel_flush:
+            self._cancel_flush()
+            self._cancel_flush = None
+        self._flush_at = None
+        if not self._pending and not self._unannounced:
+            return
+
+        overflowed, self._overflowed = self._overflowed, False
+        if overflowed:
+            self._stall_streak += 1
+            if self._stall_streak >= STALL_THRESHOLD:
+                self._async_evict("queue_overflow")
+                return
+
+        pending, self._pending = self._pending, {}
+        if pending and self._send_batch(pending) and not overflowed:
+            self._stall_streak = 0
+        if self._unannounced and not self.needs_resync:
+            self._announce_dropped()
+
+    def _mark_dropped(self, entity_id: str, seq: Optional[int]) -> None:
+        """Remember an entity whose change never reached the client."""
+        self._dropped.setdefault(entity_id, seq)
+        self._unannounced.add(entity_id)
+
+    def _announce_dropped(self) -> None:
+        """Tell the client which entities lost changes so it resyncs just those."""
+        try:
+            self.send_event({
+                "event_type": EVENT_RESYNC_REQUIRED,
+                "reason": "queue_overflow",
+                "entity_ids": sorted(self._unannounced)
+            })
+        except Exception as err:
+            _LOGGER.debug(f"Could not notify client about dropped changes: {err}")
+            return
+        self._unannounced.clear()
+
+    def send_event(self, event: Any) -> None:
+        """Send an event on the client's subscription, keyed by its subscribe message ID."""
+        self.send_message(websocket_api.event_message(self.subscription_id, event))
+
+    def _delivered_seq(self, sending: Iterable[str] = ()) -> int:
+        """Return the sequence number up to which nothing is buffered or was dropped."""
+        undelivered = [
+            change["seq"]
+            for changes in (self._pending, self._held)
+            for change in changes.values()
+            if change["seq"] is not None
+        ]
+        # Dropped changes hold the client's resync point back until they are resent
+        undelivered.extend(
+            seq for entity_id, seq in self._dropped.items()
+            if seq is not None and entity_id not in sending
+        )
+        if undelivered:
+            return min(self._last_seq, min(undelivered) - 1)
+        return self._last_seq
+
+    def _send_batch(self, pending: Dict[str, Dict[str, Any]]) -> bool:
+        """Send a batch of changes and return whether it went out."""
+        if self._wire_mode == WIRE_MODE_DELTA:
+            event = self._build_delta_event(pending)
+            if not event:
+                return True
+        else:
+            event = {
+                "changes": {
+                    entity_id: {
+                        "old_state": state_fragment(change["old_state"]),
+                        "new_state": state_fragment(change["new_state"])
+                    }
+                    for entity_id, change in pending.items()
+                }
+            }
+        event["event_type"] = EVENT_STATES_CHANGED
+        # Changes still buffered must stay after the client's resync point
+        event["seq"] = self._delivered_seq(pending)
+
+        try:
+            self.send_event(event)
+            self.messages_sent += 1
+            self.stats.messages_out.add()
+            self.stats.updates_out.add(len(pending))
+        except Exception as err:
+            _LOGGER.error(f"Error sending batched state changes: {err}")
+            # The client never got these, so they cannot serve as a baseline
+            for entity_id, change in pending.items():
+                self._last_sent.pop(entity_id, None)
+                self._mark_dropped(entity_id, change["seq"])
+            self._stall_streak += 1
+            if self._stall_streak >= STALL_THRESHOLD:
+                self._async_evict("send_failed")
+            return False
+
+        # A newer change reached the client; whatever was dropped before is moot
+        for entity_id in pending:
+            self._dropped.pop(entity_id, None)
+            self._unannounced.discard(entity_id)
+
+        sent_at = time.monotonic()
+        for change in pending.values():
+            latency_ms = (sent_at - change["queued_at"]) * 1000
+            self.latency[change["lane"]].record(latency_ms)
+            self.stats.delivery[change["lane"]].record(latency_ms)
+        return True
+
+    @callback
+    def _async_evict(self, reason: str) -> None:
+        """Stop buffering for a client that cannot keep up until it resyncs."""
+        self.needs_resync = True
+        self.evicted_at = time.monotonic()
+        self.evictions += 1
+        self.updates_dropped += len(self._pending) + len(self._held)
+        self.stats.dropped += len(self._pending) + len(self._held)
+        self._pending.clear()
+        self._last_sent.clear()
+        self._cancel_timers()
+        self.update_filter.clear()
+        # The resync the client is told to make covers every dropped entity
+        self._unannounced.clear()
+        _LOGGER.warning(f"Client marked as needing resync: {reason}")
+
+        try:
+            self.send_event({"event_type": EVENT_RESYNC_REQUIRED, "reason": reason})
+        except Exception as err:
+            _LOGGER.debug(f"Could not notify client about resync: {err}")
+
+    def _build_delta_event(self, pending: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Diff pending states against the last state sent to this connection."""
+        added: Dict[str, Any] = {}
+        changed: Dict[str, Any] = {}
+        removed = []
+
+        for entity_id, change in pending.items():
+            new_state = change["new_state"]
+            if new_state is None:
+                self._last_sent.pop(entity_id, None)
+                removed.append(entity_id)
+                continue
+
+            base = self._last_sent.get(entity_id)
+            if base is None:
+                added[entity_id] = new_state.as_compressed_state
+            elif base is not new_state:
+                changed[entity_id] = self._delta_cache.get(base, new_state)
+            self._last_sent[entity_id] = new_state
+
+        event: Dict[str, Any] = {}
+        if added:
+            event[DELTA_ADDED] = added
+        if changed:
+            event[DELTA_CHANGED] = changed
+        if removed:
+            event[DELTA_REMOVED] = removed
+        return event
+
+    @callback
+    def async_resync(self, states: Iterable[State], seq: Optional[int] = None) -> None:
+        """Send the given states in full, replacing the client's baseline."""
+        self.needs_resync = False
+        self.evicted_at = None
+        self._stall_streak = 0
+        if seq is not None:
+            self._last_seq = max(self._last_seq, seq)
+        now = time.monotonic()
+        for state in states:
+            self._last_sent.pop(state.entity_id, None)
+            self._held.pop(state.entity_id, None)
+            self.update_filter.mark_passed(state.entity_id, state, now)
+            self._pending[state.entity_id] = {
+                "old_state": None,
+                "new_state": state,
+                "lane": LANE_BULK,
+                "seq": None,
+                "queued_at": now
+            }
+        self.async_flush()
+
+    @callback
+    def async_forget_dropped(self, entity_ids: Iterable[str]) -> None:
+        """Forget dropped changes the client caught up on through another outbox."""
+        for entity_id in entity_ids:
+            self._dropped.pop(entity_id, None)
+            self._unannounced.discard(entity_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return queue statistics for monitoring."""
+        return {
+            "queue_depth": len(self._pending),
+            "max_pending": self.max_pending,
+            "updates_received": self.updates_received,
+            "updates_coalesced": self.updates_coalesced,
+            "updates_dropped": self.updates_dropped,
+            "messages_sent": self.messages_sent,
+            "evictions": self.evictions,
+            "needs_resync": self.needs_resync,
+            "held": len(self._held),
+            "dropped_awaiting_resync": len(self._dropped),
+            "nearby": len(self._nearby),
+            **self.update_filter.get_stats(),
+            "lanes": {
+                LANE_NAMES[lane]: recorder.get_stats()
+                for lane, recorder in self.latency.items()
+            }
+        }
+
+    @callback
+    def async_set_tier(self, entity_ids: Iterable[str], tier: str) -> None:
+        """
+        Move entities between the visible and the near-visible tier.
+
+        A promoted entity's held change is sent right away, so a card that
+        scrolls into view never shows a value the server is still sitting on.
+        """
+        if tier == TIER_NEARBY:
+            self._nearby.update(entity_ids)
+            return
+
+        now = time.monotonic()
+        for entity_id in entity_ids:
+            if entity_id not in self._nearby:
+                continue
+            self._nearby.discard(entity_id)
+            held = self._held.pop(entity_id, None)
+            if held is not None:
+                self.update_filter.mark_passed(entity_id, held["new_state"], now)
+                self._enqueue(
+                    entity_id, held["old_state"], held["new_state"], held["lane"], held["seq"]
+                )
+
+    @callback
+    def async_seed_baseline(self, states: Iterable[State]) -> None:
+        """Record states the client received in full outside of the outbox."""
+        if self._wire_mode != WIRE_MODE_DELTA:
+            return
+        for state in states:
+            self._last_sent[state.entity_id] = state
+
+    @callback
+    def async_discard(self, entity_ids: Iterable[str]) -> None:
+        """Drop pending changes and the baseline of entities no longer subscribed."""
+        for entity_id in entity_ids:
+            self._pending.pop(entity_id, None)
+            self._last_sent.pop(entity_id, None)
+            self._held.pop(entity_id, None)
+            self._nearby.discard(entity_id)
+            self._dropped.pop(entity_id, None)
+            self._unannounced.discard(entity_id)
+            self.update_filter.forget(entity_id)
+
+    @callback
+    def async_close(self) -> None:
+        """Cancel any scheduled flush and drop pending changes."""
+        self._cancel_timers()
+        self._pending.clear()
+        self._last_sent.clear()
+        self._dropped.clear()
+        self._unannounced.clear()
+
+    @callback
+    def _cancel_timers(self) -> None:
+        """Cancel the scheduled flush and release and drop held changes."""
+        if self._cancel_flush:
+            self._cancel_flush()
+            self._cancel_flush = None
+        self._flush_at = None
+        if self._cancel_release:
+            self._cancel_release()
+            self._cancel_release = None
+        self._release_at = None
+        self._held.clear()
@@ -0,0 +1,130 @@
+"""Admission control and quotas for dashboard subscriptions."""
+
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Optional, Set, Tuple
+
+# Rejection codes, also the translation keys of the error messages
+QUOTA_TOO_MANY_ENTITIES = "too_many_entities"
+QUOTA_TOO_MANY_CONNECTIONS = "too_many_connections"
+QUOTA_RATE_LIMITED = "subscribe_rate_limited"
+
+
+class QuotaExceeded(Exception):
+    """Raised when a request would take a client over one of its quotas."""
+
+    def __init__(self, code: str, message: str, limit: int, retry_after: Optional[float] = None):
+        """
+        Initialize the rejection.
+
+        Args:
+            code: Which quota was hit
+            message: Human readable explanation
+            limit: The configured limit
+            retry_after: Seconds after which retrying can succeed, None if
+                retrying the same request will keep failing
+        """
+        super().__init__(message)
+        self.code = code
+        self.limit = limit
+        self.retry_after = retry_after
+
+    @property
+    def hints(self) -> Dict[str, Any]:
+        """Return the machine readable details sent with the error."""
+        return {
+            "limit": self.limit,
+            "retry_after": None if self.retry_after is None else round(self.retry_after, 3)
+        }
+
+
+class SubscriptionQuotas:
+    """Enforces per-connection and per-user subscription limits."""
+
+    def __init__(
+        self,
+        max_entities_per_connection: int,
+        max_connections_per_user: int,
+        max_subscribe_rate: float,
+        subscribe_burst: int
+    ):
+        """
+        Initialize the quotas.
+
+        Args:
+            max_entities_per_connection: Entities one connection may receive
+            max_connections_per_user: Concurrent subscribing connections per user
+            max_subscribe_rate: Subscription calls per second per connection
+            subscribe_burst: Subscription calls a connection may make at once
+        """
+        self.max_entities_per_connection = max_entities_per_connection
+        self.max_connections_per_user = max_connections_per_user
+        self.max_subscribe_rate = max_subscribe_rate
+        self.subscribe_burst = subscribe_burst
+        self._buckets: Dict[str, Tuple[float, float]] = {}  # connection_id -> (tokens, updated)
+        self._user_connections: Dict[str, Set[str]] = defaultdict(set)  # user_id -> connection_ids
+        self._connection_users: Dict[str, str] = {}  # connection_id -> user_id
+        self.rejections: Counter = Counter()
+
+    def _reject(self, code: str, message: str, limit: int, retry_after: Optional[float] = None):
+        """Count a rejection and raise it."""
+        self.rejections[code] += 1
+        raise QuotaExceeded(code, message, limit, retry_after)
+
+    def admit_connection(self, connection_id: str, user_id: Optional[str]) -> None:
+        """Account a new connection to its user, rejecting it over the limit."""
+        if user_id is None or connection_id in self._connection_users:
+            return
+        connections = self._user_connections[user_id]
+        if len(connections) >= self.max_connections_per_user:
+            self._reject(
+                QUOTA_TOO_MANY_CONNECTIONS,
+                f"User already has {len(connections)} dashboard connections",
+                self.max_connections_per_user
+            )
+        connections.add(connection_id)
+        self._connection_users[connection_id] = user_id
+
+    def release_connection(self, connection_id: str) -> None:
+        """Forget a connection that went away."""
+        self._buckets.pop(connection_id, None)
+        user_id = self._connection_users.pop(connection_id, None)
+        if user_id is not None:
+            self._user_connections[user_id].discard(connection_id)
+            if not self._user_connections[user_id]:
+                del self._user_connections[user_id]
+
+    def check_subscribe_rate(self, connection_id: str) -> None:
+        """Take one token from the connection's bucket, rejecting when empty."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(connection_id, (self.subscribe_burst, now))
+        tokens = min(self.subscribe_burst, tokens + (now - updated) * self.max_subscribe_rate)
+        if tokens < 1:
+            self._buckets[connection_id] = (tokens, now)
+            self._reject(
+                QUOTA_RATE_LIMITED,
+                "Too many subscription requests",
+                self.subscribe_burst,
+                (1 - tokens) / self.max_subscribe_rate
+            )
+        self._buckets[connection_id] = (tokens - 1, now)
+
+    def check_entity_count(self, count: int) -> None:
+        """Reject a request that would leave a connection with too many entities."""
+        if count > self.max_entities_per_connection:
+            self._reject(
+                QUOTA_TOO_MANY_ENTITIES,
+                f"Subscription would cover {count} entities",
+                self.max_entities_per_connection
+            )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the limits and rejection counters."""
+        return {
+            "max_entities_per_connection": self.max_entities_per_connection,
+            "max_connections_per_user": self.max_connections_per_user,
+            "max_subscribe_rate": self.max_subscribe_rate,
+            "subscribe_burst": self.subscribe_burst,
+            "rejections": dict(self.rejections),
+            "rejections_total": sum(self.rejections.values()),
+        }
@@ -0,0 +1,182 @@
+"""Selector index resolving area, domain and category selectors to entities."""
+
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from homeassistant.const import MATCH_ALL
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import (
+    async_track_state_added_domain,
+    async_track_state_removed_domain,
+)
+
+from ..intelligence.engine import UNASSIGNED_AREA
+from ..intelligence.entity_mapper import EntityMapper
+from ..intelligence.registry_index import RegistryIndex
+
+_LOGGER = logging.getLogger(__name__)
+
+# Keys a selector can match on; several keys must all match
+SELECTOR_AREA = "area_id"
+SELECTOR_DOMAIN = "domain"
+SELECTOR_CATEGORY = "category"
+SELECTOR_KEYS = (SELECTOR_AREA, SELECTOR_DOMAIN, SELECTOR_CATEGORY)
+
+# Called with entity_id, old and new selector attributes (None when absent)
+MembershipListener = Callable[[str, Optional[Dict[str, str]], Optional[Dict[str, str]]], None]
+
+
+def selector_key(selector: Dict[str, str]) -> str:
+    """Return the canonical key of a selector, e.g. 'area_id=kitchen&domain=light'."""
+    return "&".join(f"{key}={selector[key]}" for key in SELECTOR_KEYS if key in selector)
+
+
+def selector_matches(selector: Dict[str, str], attributes: Optional[Dict[str, str]]) -> bool:
+    """Check whether an entity with the given attributes matches a selector."""
+    if attributes is None:
+        return False
+    return all(attributes.get(key) == value for key, value in selector.items())
+
+
+class SelectorIndex:
+    """Maps area, domain and category to entities and keeps the mapping current."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        on_change: MembershipListener,
+        registry_index: Optional[RegistryIndex] = None
+    ):
+        """
+        Initialize the selector index.
+
+        Args:
+            hass: Home Assistant instance
+            on_change: Called whenever an entity's selector attributes change
+            registry_index: Shared registry index; an own one is started if omitted
+        """
+        self.hass = hass
+        self._on_change = on_change
+        self._owns_registry_index = registry_index is None
+        self._registry_index = registry_index or RegistryIndex(hass)
+        self._mapper = EntityMapper(hass)
+        self._attributes: Dict[str, Dict[str, str]] = {}  # entity_id -> selector attributes
+        self._members: Dict[Tuple[str, str], Set[str]] = defaultdict(set)  # (key, value) -> entity_ids
+        self._unsubscribers: List[Callable[[], None]] = []
+
+    @property
+    def started(self) -> bool:
+        """Return whether the index is built and listening for changes."""
+        return bool(self._unsubscribers)
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index from the state machine and follow registry changes."""
+        if self.started:
+            return
+
+        if self._owns_registry_index:
+            self._registry_index.async_start()
+        for entity_id in self.hass.states.async_entity_ids():
+            self._index_entity(entity_id, notify=False)
+
+        self._unsubscribers = [
+            self._registry_index.async_add_listener(self._async_registry_changed),
+            async_track_state_added_domain(self.hass, MATCH_ALL, self._async_state_added),
+            async_track_state_removed_domain(self.hass, MATCH_ALL, self._async_state_removed),
+        ]
+        _LOGGER.debug(f"Selector index built for {len(self._attributes)} entities")
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following changes and drop the index."""
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+        if self._owns_registry_index:
+            self._registry_index.async_stop()
+        self._attributes.clear()
+        self._members.clear()
+
+    def resolve(self, selector: Dict[str, str]) -> Set[str]:
+        """Return the entities currently matching a selector."""
+        if not selector:
+            return set()
+        groups = sorted(
+            (self._members.get((key, value), set()) for key, value in selector.items()),
+            key=len
+        )
+        return set(groups[0]).intersection(*groups[1:])
+
+    def get_attributes(self, entity_id: str) -> Optional[Dict[str, str]]:
+        """Return the selector attributes of an indexed entity."""
+        return self._attributes.get(entity_id)
+
+    def _resolve_attributes(self, entity_id: str) -> Dict[str, str]:
+        """Work out the area, domain and category of an entity."""
+        attributes = {
+            SELECTOR_DOMAIN: entity_id.split('.')[0],
+            SELECTOR_CATEGORY: self._mapper.categorize_entity_type(entity_id),
+        }
+
+        area_id = self._registry_index.entity_area(entity_id)
+        if area_id and area_id != UNASSIGNED_AREA:
+            attributes[SELECTOR_AREA] = area_id
+
+        return attributes
+
+    def _index_entity(self, entity_id: str, notify: bool = True) -> None:
+        """Re-resolve one entity and update the index."""
+        if self.hass.states.get(entity_id) is None:
+            self._drop_entity(entity_id, notify)
+            return
+
+        # Resolving may apply a registry batch that re-indexes this entity first
+        new_attributes = self._resolve_attributes(entity_id)
+        old_attributes = self._attributes.get(entity_id)
+        if new_attributes == old_attributes:
+            return
+
+        self._unlink(entity_id, old_attributes)
+        self._attributes[entity_id] = new_attributes
+        for key, value in new_attributes.items():
+            self._members[(key, value)].add(entity_id)
+
+        if notify:
+            self._on_change(entity_id, old_attributes, new_attributes)
+
+    def _drop_entity(self, entity_id: str, notify: bool = True) -> None:
+        """Remove an entity from the index."""
+        old_attributes = self._attributes.pop(entity_id, None)
+        if old_attributes is None:
+            return
+        self._unlink(entity_id, old_attributes)
+        if notify:
+            self._on_change(entity_id, old_attributes, None)
+
+    def _unlink(self, entity_id: str, attributes: Optional[Dict[str, str]]) -> None:
+        """Remove an entity from the member sets of its old attributes."""
+        for key, value in (attributes or {}).items():
+            members = self._members.get((key, value))
+            if members is not None:
+                members.discard(entity_id)
+                if not members:
+                    del self._members[(key, value)]
+
+    @callback
+    def _async_registry_changed(self, moved: Set[str]) -> None:
+        """Re-resolve the entities a debounced registry batch moved between areas."""
+        for entity_id in moved:
+            if entity_id in self._attributes:
+                self._index_entity(entity_id)
+
+    @callback
+    def _async_state_added(self, event: Event) -> None:
+        """Index an entity that appeared in the state machine."""
+        self._index_entity(event.data["entity_id"])
+
+    @callback
+    def _async_state_removed(self, event: Event) -> None:
+        """Drop an entity that left the state machine."""
+        self._drop_entity(event.data["entity_id"])
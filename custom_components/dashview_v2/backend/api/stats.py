@@ -0,0 +1,131 @@
+"""Subscription statistics maintained as things happen, cheap to poll."""
+
+import time
+from bisect import bisect_left
+from typing import Any, Dict, List
+
+from .lanes import LANE_NAMES, LANES
+
+# Upper bounds of the latency histogram buckets in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# Seconds of history the per-second rates are averaged over
+RATE_WINDOW = 10
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram; recording and reading never sort."""
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        self._buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, latency_ms: float) -> None:
+        """Add one latency sample in milliseconds."""
+        self._buckets[bisect_left(LATENCY_BUCKETS_MS, latency_ms)] += 1
+        self.count += 1
+        self.total_ms += latency_ms
+        self.max_ms = max(self.max_ms, latency_ms)
+
+    def quantile(self, fraction: float) -> float:
+        """Return the upper bound of the bucket holding the given quantile."""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self._buckets):
+            seen += count
+            if seen >= rank:
+                return min(float(bound), self.max_ms)
+        return self.max_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the sample count, estimated quantiles and bucket counts."""
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 3),
+            "p99_ms": round(self.quantile(0.99), 3),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self._buckets)},
+                "le_inf": self._buckets[-1],
+            },
+        }
+
+
+class RateMeter:
+    """Counts events in total and per second over a short sliding window."""
+
+    def __init__(self, window: int = RATE_WINDOW):
+        """
+        Initialize the meter.
+
+        Args:
+            window: Number of one-second slots kept, including the current one
+        """
+        self.total = 0
+        self._slots: List[int] = [0] * window
+        self._second = int(time.monotonic())
+
+    def _advance(self) -> None:
+        """Clear the slots of the seconds that passed since the last call."""
+        second = int(time.monotonic())
+        elapsed = second - self._second
+        if elapsed <= 0:
+            return
+        for offset in range(1, min(elapsed, len(self._slots)) + 1):
+            self._slots[(self._second + offset) % len(self._slots)] = 0
+        self._second = second
+
+    def add(self, count: int = 1) -> None:
+        """Count events happening now."""
+        self._advance()
+        self._slots[self._second % len(self._slots)] += count
+        self.total += count
+
+    def rate(self) -> float:
+        """Return the average per second over the completed seconds of the window."""
+        self._advance()
+        current = self._second % len(self._slots)
+        completed = sum(self._slots) - self._slots[current]
+        return completed / (len(self._slots) - 1)
+
+
+class SubscriptionStats:
+    """Counters shared by the subscription manager and every outbox."""
+
+    def __init__(self):
+        """Initialize all counters at zero."""
+        self.subscriptions = 0  # Explicit entity subscriptions over all connections
+        self.selectors = 0  # Selector subscriptions over all connections
+        self.events_in = RateMeter()  # State changes with at least one listener
+        self.updates_out = RateMeter()  # Changes delivered to clients
+        self.messages_out = RateMeter()  # Batches sent to clients
+        self.coalesced = 0
+        self.filtered = 0  # Dropped by an update policy
+        self.dropped = 0  # Lost to overflow or eviction
+        self.fanout = LatencyHistogram()  # Time to queue one change with every listener
+        self.delivery = {lane: LatencyHistogram() for lane in LANES}  # Queue to send, per lane
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Return the counters, rates and latency histograms."""
+        return {
+            "events_in": self.events_in.total,
+            "events_in_per_second": round(self.events_in.rate(), 2),
+            "updates_out": self.updates_out.total,
+            "updates_out_per_second": round(self.updates_out.rate(), 2),
+            "messages_out": self.messages_out.total,
+            "messages_out_per_second": round(self.messages_out.rate(), 2),
+            "updates_coalesced": self.coalesced,
+            "updates_filtered": self.filtered,
+            "updates_dropped": self.dropped,
+            "fanout_latency": self.fanout.get_stats(),
+            "delivery_latency": {
+                LANE_NAMES[lane]: histogram.get_stats()
+                for lane, histogram in self.delivery.items()
+            },
+        }
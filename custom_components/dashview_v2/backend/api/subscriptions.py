@@ -1,40 +1,222 @@
 """Subscription manager for Dashview V2 WebSocket connections."""
 
 import logging
-from typing import Dict, List, Set, Optional, Any
+from typing import Callable, Dict, FrozenSet, List, Set, Optional, Any
 from collections import defaultdict
-import asyncio
+from datetime import timedelta
+import itertools
+import time
 
-from homeassistant.core import HomeAssistant, callback
-from homeassistant.helpers.event import async_track_state_change_event
-from homeassistant.const import EVENT_STATE_CHANGED
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import (
+    async_track_state_change_event,
+    async_track_time_interval,
+)
+
+from ..config import (
+    DEFAULT_FLUSH_INTERVAL_MS,
+    DEFAULT_MAX_CONNECTIONS_PER_USER,
+    DEFAULT_MAX_ENTITIES_PER_CONNECTION,
+    DEFAULT_MAX_PENDING_UPDATES,
+    DEFAULT_MAX_SUBSCRIBE_RATE,
+    DEFAULT_SUBSCRIBE_BURST,
+)
+from ..intelligence.entity_mapper import EntityMapper
+from ..intelligence.registry_index import RegistryIndex
+from .groups import VIEW_GROUP_PREFIX, ViewGroup, view_hash
+from .lanes import LANE_BULK, lane_for_priority
+from .outbox import ConnectionOutbox, StateDeltaCache, compact_state
+from .quotas import SubscriptionQuotas
+from .selectors import SelectorIndex, selector_key, selector_matches
+from .stats import SubscriptionStats
+from .throttle import TIER_NEARBY, TIER_VISIBLE, policy_category
+from .versions import EntityVersionTable
 
 _LOGGER = logging.getLogger(__name__)
 
+# How often orphaned connections and trackers are reclaimed
+SWEEP_INTERVAL = timedelta(minutes=5)
+# How long an evicted client may stay without resyncing before it is dropped
+EVICTED_TIMEOUT = 600
+
+# Event type telling a client which entities joined or left one of its selectors
+EVENT_SELECTOR_CHANGED = "dashview_v2_selector_changed"
+
 
 class SubscriptionManager:
-    """Manages entity subscriptions for dashboard connections."""
+    """
+    Manages entity subscriptions for dashboard connections.
     
-    def __init__(self, hass: HomeAssistant):
+    Everything runs on the event loop and no method awaits between reading
+    and updating the indexes, so they need no lock; listener sets are
+    replaced rather than mutated so dispatch can fan out over a snapshot.
+    """
+    
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        flush_interval_ms: int = DEFAULT_FLUSH_INTERVAL_MS,
+        max_pending_updates: int = DEFAULT_MAX_PENDING_UPDATES,
+        quotas: Optional[SubscriptionQuotas] = None,
+        registry_index: Optional[RegistryIndex] = None
+    ):
         """Initialize the subscription manager."""
         self.hass = hass
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending_updates = max_pending_updates
+        self.quotas = quotas or SubscriptionQuotas(
+            DEFAULT_MAX_ENTITIES_PER_CONNECTION,
+            DEFAULT_MAX_CONNECTIONS_PER_USER,
+            DEFAULT_MAX_SUBSCRIBE_RATE,
+            DEFAULT_SUBSCRIBE_BURST
+        )
         self._subscriptions: Dict[str, Set[str]] = defaultdict(set)  # connection_id -> entity_ids
-        self._entity_listeners: Dict[str, Set[str]] = defaultdict(set)  # entity_id -> connection_ids
-        self._connection_handlers: Dict[str, Any] = {}  # connection_id -> send_message function
-        self._unsubscribe_handlers: Dict[str, List[Any]] = defaultdict(list)  # connection_id -> unsubscribe functions
-        self._lock = asyncio.Lock()
+        self._selectors: Dict[str, Dict[str, Dict[str, str]]] = defaultdict(dict)  # connection_id -> key -> selector
+        self._selector_members: Dict[str, Dict[str, Set[str]]] = defaultdict(dict)  # connection_id -> key -> entity_ids
+        self._selector_index = SelectorIndex(
+            hass, self._async_selector_attributes_changed, registry_index
+        )
+        self._view_groups: Dict[str, ViewGroup] = {}  # group_id -> shared view group
+        self._connection_views: Dict[str, str] = {}  # connection_id -> group_id
+        # entity_id -> connection_ids; replaced, never mutated, so dispatch can iterate without a lock
+        self._entity_listeners: Dict[str, FrozenSet[str]] = {}
+        self._outboxes: Dict[str, ConnectionOutbox] = {}  # connection_id -> batching outbox
+        self._delta_cache = StateDeltaCache()
+        self._versions = EntityVersionTable()
+        self._entity_categories: Dict[str, str] = {}  # entity_id -> category picking its update policy
+        self._entity_lanes: Dict[str, int] = {}  # entity_id -> priority lane
+        self._mapper = EntityMapper(hass)
+        self._entity_trackers: Dict[str, Callable[[], None]] = {}  # entity_id -> HA tracker unsubscribe
+        self._liveness: Dict[str, Callable[[], bool]] = {}  # connection_id -> is connection open
+        self._connection_ids = itertools.count(1)
+        self._cancel_sweep: Optional[Callable[[], None]] = None
+        self.stats = SubscriptionStats()
+    
+    def new_connection_id(self) -> str:
+        """Return a connection ID that is never handed out again."""
+        return f"{self.epoch[:8]}-{next(self._connection_ids)}"
+    
+    @callback
+    def async_start(self) -> None:
+        """Start periodically sweeping orphaned connections and trackers."""
+        if self._cancel_sweep is None:
+            self._cancel_sweep = async_track_time_interval(
+                self.hass, self.async_sweep, SWEEP_INTERVAL
+            )
+    
+    async def async_shutdown(self) -> None:
+        """Stop sweeping and release every connection and tracker."""
+        if self._cancel_sweep:
+            self._cancel_sweep()
+            self._cancel_sweep = None
+        for connection_id in list(self._outboxes):
+            self._remove_connection(connection_id)
+        for entity_id in list(self._entity_trackers):
+            self._release_tracker(entity_id)
+        self._selector_index.async_stop()
+    
+    @callback
+    def async_update_config(
+        self,
+        flush_interval_ms: int,
+        max_pending_updates: int,
+        max_entities_per_connection: int,
+        max_connections_per_user: int,
+        max_subscribe_rate: float,
+        subscribe_burst: int
+    ) -> None:
+        """
+        Apply changed integration options without dropping any connection.
+        
+        The flush window is the default of connections and views created from
+        now on; queue bounds and quotas apply to every connection at once.
+        """
+        self.flush_interval_ms = flush_interval_ms
+        self.max_pending_updates = max_pending_updates
+        for outbox in self._outboxes.values():
+            outbox.max_pending = max_pending_updates
+        for group in self._view_groups.values():
+            group.outbox.max_pending = max_pending_updates
+        self.quotas.max_entities_per_connection = max_entities_per_connection
+        self.quotas.max_connections_per_user = max_connections_per_user
+        self.quotas.max_subscribe_rate = max_subscribe_rate
+        self.quotas.subscribe_burst = subscribe_burst
     
-    async def register_connection(self, connection_id: str, send_message_handler: Any) -> None:
+    async def register_connection(
+        self,
+        connection_id: str,
+        send_message_handler: Any,
+        flush_interval_ms: Optional[int] = None,
+        wire_mode: Optional[str] = None,
+        is_alive: Optional[Callable[[], bool]] = None,
+        update_policies: Optional[Dict[str, Dict[str, Any]]] = None,
+        user_id: Optional[str] = None,
+        subscription_id: Optional[int] = None
+    ) -> None:
         """
         Register a new connection for subscription management.
         
+        Registering an already known connection keeps its pending updates and
+        only refreshes the handler and, if given, the flush window, wire mode
+        and update policies. Pushed changes go out as events of the first
+        subscribe message that is still open; later ones share its stream.
+        
         Args:
             connection_id: Unique identifier for the connection
             send_message_handler: Function to send messages to this connection
+            flush_interval_ms: Optional coalescing window overriding the default
+            wire_mode: Optional wire mode ("full" or "delta") for pushed changes
+            is_alive: Optional probe the sweeper uses to detect closed connections
+            update_policies: Optional per-category rate limit and deadband overrides
+            user_id: Optional user owning the connection, for per-user quotas
+            subscription_id: Optional ID of a subscribe message that can carry pushes
+            
+        Raises:
+            QuotaExceeded: If the user already has too many connections
         """
-        async with self._lock:
-            self._connection_handlers[connection_id] = send_message_handler
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None:
+            self.quotas.admit_connection(connection_id, user_id)
+            outbox = self._outboxes[connection_id] = ConnectionOutbox(
+                self.hass,
+                send_message_handler,
+                self.flush_interval_ms if flush_interval_ms is None else flush_interval_ms,
+                self._delta_cache,
+                self.max_pending_updates,
+                self.stats
+            )
             _LOGGER.debug(f"Registered connection: {connection_id}")
+        else:
+            outbox.send_message = send_message_handler
+            if flush_interval_ms is not None:
+                outbox.flush_interval_ms = flush_interval_ms
+        
+        if not outbox.stream_open and subscription_id is not None:
+            outbox.async_open_stream(subscription_id)
+        if wire_mode is not None:
+            outbox.wire_mode = wire_mode
+        if is_alive is not None:
+            self._liveness[connection_id] = is_alive
+        if update_policies:
+            outbox.update_filter.set_overrides(update_policies)
+    
+    @callback
+    def async_close_subscription(self, connection_id: str, subscription_id: int) -> bool:
+        """
+        Handle the client unsubscribing from one of its subscribe messages.
+        
+        Closing the message that carries the pushes ends the connection's
+        subscriptions; closing any other one changes nothing.
+        
+        Returns:
+            Whether the connection was unregistered
+        """
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None or outbox.subscription_id != subscription_id:
+            return False
+        self._remove_connection(connection_id)
+        _LOGGER.debug(f"Connection {connection_id} closed its subscription")
+        return True
     
     async def unregister_connection(self, connection_id: str) -> None:
         """
@@ -43,26 +225,62 @@ class SubscriptionManager:
         Args:
             connection_id: Connection to unregister
         """
-        async with self._lock:
-            # Cancel all subscriptions for this connection
-            if connection_id in self._unsubscribe_handlers:
-                for unsubscribe in self._unsubscribe_handlers[connection_id]:
-                    unsubscribe()
-                del self._unsubscribe_handlers[connection_id]
-            
-            # Remove from entity listeners
-            if connection_id in self._subscriptions:
-                for entity_id in self._subscriptions[connection_id]:
-                    self._entity_listeners[entity_id].discard(connection_id)
-                    if not self._entity_listeners[entity_id]:
-                        del self._entity_listeners[entity_id]
-                del self._subscriptions[connection_id]
-            
-            # Remove connection handler
-            if connection_id in self._connection_handlers:
-                del self._connection_handlers[connection_id]
-            
-            _LOGGER.debug(f"Unregistered connection: {connection_id}")
+        self._remove_connection(connection_id)
+        _LOGGER.debug(f"Unregistered connection: {connection_id}")
+    
+    def _remove_connection(self, connection_id: str) -> None:
+        """Drop a connection's subscriptions and outbox."""
+        self._leave_view(connection_id)
+        self.quotas.release_connection(connection_id)
+        entity_ids = self._connection_entities(connection_id)
+        self.stats.subscriptions -= len(self._subscriptions.pop(connection_id, ()))
+        self.stats.selectors -= len(self._selectors.pop(connection_id, ()))
+        self._selector_members.pop(connection_id, None)
+        
+        # Remove from entity listeners, dropping trackers nobody needs anymore
+        for entity_id in entity_ids:
+            self._detach(connection_id, entity_id)
+        
+        # Drop the outbox along with anything still buffered
+        outbox = self._outboxes.pop(connection_id, None)
+        if outbox:
+            outbox.async_close()
+        self._liveness.pop(connection_id, None)
+    
+    async def async_sweep(self, _now: Any = None) -> int:
+        """
+        Reclaim state left behind by connections that are gone.
+        
+        Drops connections whose probe reports them closed or that stayed
+        evicted longer than EVICTED_TIMEOUT, then releases listeners and
+        trackers no live connection accounts for.
+        
+        Returns:
+            Number of connections reclaimed
+        """
+        now = time.monotonic()
+        orphaned = [
+            connection_id
+            for connection_id, outbox in self._outboxes.items()
+            if not self._liveness.get(connection_id, lambda: True)()
+            or (outbox.evicted_at is not None and now - outbox.evicted_at > EVICTED_TIMEOUT)
+        ]
+        orphaned.extend(
+            connection_id
+            for connection_id in set(self._subscriptions) | set(self._selector_members)
+            if connection_id not in self._outboxes
+        )
+        for connection_id in orphaned:
+            self._remove_connection(connection_id)
+        
+        for entity_id in list(self._entity_trackers):
+            if not self._entity_listeners.get(entity_id):
+                self._entity_listeners.pop(entity_id, None)
+                self._release_tracker(entity_id)
+        
+        if orphaned:
+            _LOGGER.info(f"Reclaimed {len(orphaned)} orphaned connections")
+        return len(orphaned)
     
     async def subscribe_to_entities(
         self, 
@@ -78,70 +296,162 @@ class SubscriptionManager:
             
         Returns:
             Dictionary mapping entity_id to subscription success
+            
+        Raises:
+            QuotaExceeded: If the connection would exceed its entity quota
         """
         results = {}
         
-        async with self._lock:
-            if connection_id not in self._connection_handlers:
-                _LOGGER.warning(f"Connection {connection_id} not registered")
-                return {entity_id: False for entity_id in entity_ids}
-            
-            new_entities = []
-            for entity_id in entity_ids:
-                # Check if entity exists
-                if not self.hass.states.get(entity_id):
-                    results[entity_id] = False
-                    _LOGGER.warning(f"Entity {entity_id} not found")
-                    continue
-                
-                # Add to subscriptions
-                if entity_id not in self._subscriptions[connection_id]:
-                    self._subscriptions[connection_id].add(entity_id)
-                    self._entity_listeners[entity_id].add(connection_id)
-                    new_entities.append(entity_id)
-                    results[entity_id] = True
-                else:
-                    results[entity_id] = True  # Already subscribed
+        if connection_id not in self._outboxes:
+            _LOGGER.warning(f"Connection {connection_id} not registered")
+            return {entity_id: False for entity_id in entity_ids}
+        
+        self._check_entity_quota(connection_id, set(entity_ids))
+        
+        new_entities = []
+        for entity_id in entity_ids:
+            # Check if entity exists
+            if not self.hass.states.get(entity_id):
+                results[entity_id] = False
+                _LOGGER.warning(f"Entity {entity_id} not found")
+                continue
             
-            # Set up state change listener for new entities
-            if new_entities:
-                @callback
-                def state_changed(event):
-                    """Handle state changes for subscribed entities."""
-                    entity_id = event.data.get("entity_id")
-                    if entity_id not in self._entity_listeners:
-                        return
-                    
-                    new_state = event.data.get("new_state")
-                    old_state = event.data.get("old_state")
-                    
-                    # Send update to all connections subscribed to this entity
-                    for conn_id in self._entity_listeners[entity_id]:
-                        if conn_id in self._connection_handlers:
-                            handler = self._connection_handlers[conn_id]
-                            self.hass.async_create_task(
-                                handler({
-                                    "type": "event",
-                                    "event": {
-                                        "event_type": "state_changed",
-                                        "entity_id": entity_id,
-                                        "old_state": old_state.as_dict() if old_state else None,
-                                        "new_state": new_state.as_dict() if new_state else None
-                                    }
-                                })
-                            )
-                
-                # Track state changes for new entities
-                unsubscribe = async_track_state_change_event(
-                    self.hass,
-                    new_entities,
-                    state_changed
-                )
-                self._unsubscribe_handlers[connection_id].append(unsubscribe)
+            # Add to subscriptions
+            if entity_id not in self._subscriptions[connection_id]:
+                self._subscriptions[connection_id].add(entity_id)
+                self.stats.subscriptions += 1
+                self._attach(connection_id, entity_id)
+                new_entities.append(entity_id)
+                results[entity_id] = True
+            else:
+                results[entity_id] = True  # Already subscribed
         
         _LOGGER.debug(f"Connection {connection_id} subscribed to {len(new_entities)} new entities")
         return results
     
+    @property
+    def epoch(self) -> str:
+        """Return the epoch sequence numbers belong to."""
+        return self._versions.epoch
+    
+    @property
+    def seq(self) -> int:
+        """Return the latest sequence number handed out."""
+        return self._versions.seq
+    
+    def _connection_entities(self, connection_id: str) -> Set[str]:
+        """Return every entity a connection receives, explicit, via selectors or its view."""
+        entity_ids = set(self._subscriptions.get(connection_id, ()))
+        for members in self._selector_members.get(connection_id, {}).values():
+            entity_ids |= members
+        group = self._view_groups.get(self._connection_views.get(connection_id))
+        if group:
+            entity_ids |= group.entity_ids
+        return entity_ids
+    
+    def _check_entity_quota(
+        self,
+        connection_id: str,
+        adding: Set[str],
+        include_view: bool = True,
+        releasing: FrozenSet[str] = frozenset()
+    ) -> None:
+        """Reject a request that would take a connection over its entity quota."""
+        entity_ids = set(self._subscriptions.get(connection_id, ())) - releasing
+        for members in self._selector_members.get(connection_id, {}).values():
+            entity_ids |= members
+        group = self._view_groups.get(self._connection_views.get(connection_id))
+        if group and include_view:
+            entity_ids |= group.entity_ids
+        self.quotas.check_entity_count(len(entity_ids | adding))
+    
+    def _holds(self, connection_id: str, entity_id: str) -> bool:
+        """Check whether a connection still wants an entity through any source."""
+        if entity_id in self._subscriptions.get(connection_id, ()):
+            return True
+        return any(
+            entity_id in members
+            for members in self._selector_members.get(connection_id, {}).values()
+        )
+    
+    def _attach(self, connection_id: str, entity_id: str) -> None:
+        """Route an entity's changes to a connection."""
+        self._entity_listeners[entity_id] = self._entity_listeners.get(entity_id, frozenset()) | {connection_id}
+        # Start one shared tracker per entity; later subscribers reuse it
+        self._ensure_tracker(entity_id)
+    
+    def _detach(self, connection_id: str, entity_id: str) -> None:
+        """Stop routing an entity to a connection unless another source holds it."""
+        if self._holds(connection_id, entity_id):
+            return
+        listeners = self._entity_listeners.get(entity_id)
+        if listeners is not None and connection_id in listeners:
+            listeners = listeners - {connection_id}
+            if listeners:
+                self._entity_listeners[entity_id] = listeners
+            else:
+                # Last listener gone: stop processing HA events for it
+                del self._entity_listeners[entity_id]
+                self._release_tracker(entity_id)
+        outbox = self._outboxes.get(connection_id)
+        if outbox:
+            # Nothing buffered or remembered for entities the client dropped
+            outbox.async_discard([entity_id])
+    
+    def _ensure_tracker(self, entity_id: str) -> None:
+        """Start tracking an entity unless a tracker already exists."""
+        if entity_id in self._entity_trackers:
+            return
+        # Changes made while untracked were not observed; catch up on them
+        self._versions.observe(entity_id, self.hass.states.get(entity_id))
+        self._entity_categories[entity_id] = policy_category(
+            entity_id, self._mapper.categorize_entity_type(entity_id)
+        )
+        self._entity_lanes[entity_id] = lane_for_priority(
+            self._mapper.calculate_entity_priority(entity_id)
+        )
+        self._entity_trackers[entity_id] = async_track_state_change_event(
+            self.hass,
+            [entity_id],
+            self._async_state_changed
+        )
+    
+    def _release_tracker(self, entity_id: str) -> None:
+        """Stop tracking an entity no connection listens to anymore."""
+        unsubscribe = self._entity_trackers.pop(entity_id, None)
+        if unsubscribe:
+            unsubscribe()
+        self._delta_cache.discard(entity_id)
+        self._entity_categories.pop(entity_id, None)
+        self._entity_lanes.pop(entity_id, None)
+    
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Dispatch a state change to all connections subscribed to the entity."""
+        entity_id = event.data.get("entity_id")
+        new_state = event.data.get("new_state")
+        old_state = event.data.get("old_state")
+        
+        seq = self._versions.record(entity_id, new_state)
+        listeners = self._entity_listeners.get(entity_id)
+        if not listeners:
+            return
+        
+        started = time.perf_counter()
+        self.stats.events_in.add()
+        # Queue the change in each listener's outbox; they filter and flush in batches
+        category = self._entity_categories.get(entity_id)
+        lane = self._entity_lanes.get(entity_id, LANE_BULK)
+        for conn_id in listeners:
+            outbox = self._outboxes.get(conn_id)
+            if outbox is None:
+                # View groups listen once on behalf of all their members
+                group = self._view_groups.get(conn_id)
+                outbox = group.outbox if group else None
+            if outbox:
+                outbox.async_add(entity_id, old_state, new_state, seq, category, lane)
+        self.stats.fanout.record((time.perf_counter() - started) * 1000)
+    
     async def unsubscribe_from_entities(
         self, 
         connection_id: str, 
@@ -159,26 +469,299 @@ class SubscriptionManager:
         """
         results = {}
         
-        async with self._lock:
-            if connection_id not in self._subscriptions:
-                return {entity_id: False for entity_id in entity_ids}
-            
-            for entity_id in entity_ids:
-                if entity_id in self._subscriptions[connection_id]:
-                    self._subscriptions[connection_id].discard(entity_id)
-                    self._entity_listeners[entity_id].discard(connection_id)
-                    
-                    # Clean up empty entity listener sets
-                    if not self._entity_listeners[entity_id]:
-                        del self._entity_listeners[entity_id]
-                    
-                    results[entity_id] = True
-                else:
-                    results[entity_id] = False  # Wasn't subscribed
+        if connection_id not in self._subscriptions:
+            return {entity_id: False for entity_id in entity_ids}
+        
+        for entity_id in entity_ids:
+            if entity_id in self._subscriptions[connection_id]:
+                self._subscriptions[connection_id].discard(entity_id)
+                self.stats.subscriptions -= 1
+                self._detach(connection_id, entity_id)
+                results[entity_id] = True
+            else:
+                results[entity_id] = False  # Wasn't subscribed
         
         _LOGGER.debug(f"Connection {connection_id} unsubscribed from {sum(results.values())} entities")
         return results
     
+    async def resync_entities(
+        self,
+        connection_id: str,
+        entity_ids: Optional[List[str]] = None,
+        since: Optional[int] = None,
+        epoch: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Send the current state of subscribed entities in full.
+        
+        In delta mode this resets the client's baseline, so later changes
+        are diffed against the states sent here. A reconnecting client that
+        passes the last sequence number it saw, and the epoch it belongs
+        to, only gets the entities that changed after it.
+        
+        Args:
+            connection_id: Connection requesting the resync
+            entity_ids: Entities to resync, defaults to all subscribed entities
+            since: Last sequence number the client processed
+            epoch: Epoch the since sequence number belongs to
+            
+        Returns:
+            Dictionary with the 'resynced' entity IDs, the current 'seq' and
+            'epoch', and whether a 'full' resync was needed
+        """
+        full = since is None or epoch != self._versions.epoch
+        
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None:
+            return {"resynced": [], "seq": self.seq, "epoch": self.epoch, "full": full}
+        
+        subscribed = self._connection_entities(connection_id)
+        candidates = subscribed if entity_ids is None else subscribed.intersection(entity_ids)
+        states = [
+            state for state in map(self.hass.states.get, candidates)
+            if state is not None and (
+                full or self._versions.changed_since(state.entity_id, state, since)
+            )
+        ]
+        outbox.async_resync(states, self.seq)
+        
+        # The member's own outbox caught it up; let the shared one resume
+        group = self._view_groups.get(self._connection_views.get(connection_id))
+        if group:
+            group.outbox.async_forget_dropped(state.entity_id for state in states)
+            if group.outbox.needs_resync:
+                group.outbox.async_resync([], self.seq)
+        
+        _LOGGER.debug(f"Resynced {len(states)} entities for connection {connection_id}")
+        return {
+            "resynced": [state.entity_id for state in states],
+            "seq": self.seq,
+            "epoch": self.epoch,
+            "full": full
+        }
+    
+    def get_initial_states(
+        self,
+        connection_id: str,
+        entity_ids: List[str],
+        attributes: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Get compact current states to inline in a subscription response.
+        
+        States sent with all attributes become the connection's delta baseline,
+        so its next pushed change for them is a diff.
+        
+        Args:
+            connection_id: Connection the states are sent to
+            entity_ids: Entities to include
+            attributes: Optional attribute names to keep, all if omitted
+            
+        Returns:
+            Dictionary mapping entity_id to its compressed state
+        """
+        states = [
+            state for state in map(self.hass.states.get, entity_ids)
+            if state is not None
+        ]
+        
+        outbox = self._outboxes.get(connection_id)
+        if outbox and attributes is None:
+            outbox.async_seed_baseline(states)
+        
+        return {state.entity_id: compact_state(state, attributes) for state in states}
+    
+    async def join_view(
+        self,
+        connection_id: str,
+        entity_ids: List[str]
+    ) -> Dict[str, Any]:
+        """
+        Subscribe connection to a view shared with every client showing it.
+        
+        Clients subscribing to the same entity set join one group that
+        coalesces and encodes each batch once and broadcasts it to all
+        members, so fan-out scales with distinct views, not devices.
+        A connection is a member of at most one view.
+        
+        Args:
+            connection_id: Connection joining the view
+            entity_ids: Entities shown by the view
+            
+        Returns:
+            Dictionary with the 'view' hash, its 'entities' and 'members' count
+            
+        Raises:
+            QuotaExceeded: If the connection would exceed its entity quota
+        """
+        view = view_hash(entity_ids)
+        group_id = f"{VIEW_GROUP_PREFIX}{view}"
+        
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None:
+            _LOGGER.warning(f"Connection {connection_id} not registered")
+            return {"view": view, "entities": [], "members": 0}
+        
+        self._check_entity_quota(connection_id, set(entity_ids), include_view=False)
+        if self._connection_views.get(connection_id) != group_id:
+            self._leave_view(connection_id)
+        
+        group = self._view_groups.get(group_id)
+        if group is None:
+            group = self._view_groups[group_id] = ViewGroup(
+                self.hass,
+                view,
+                frozenset(e for e in entity_ids if self.hass.states.get(e)),
+                self.flush_interval_ms,
+                self._delta_cache,
+                self.max_pending_updates,
+                self.stats
+            )
+            for entity_id in group.entity_ids:
+                self._attach(group_id, entity_id)
+            _LOGGER.debug(f"Created view group {view} with {len(group.entity_ids)} entities")
+        
+        group.members[connection_id] = outbox.send_event
+        self._connection_views[connection_id] = group_id
+        
+        return {
+            "view": view,
+            "entities": sorted(group.entity_ids),
+            "members": len(group.members)
+        }
+    
+    async def leave_view(self, connection_id: str) -> bool:
+        """
+        Remove connection from its shared view.
+        
+        Args:
+            connection_id: Connection leaving its view
+            
+        Returns:
+            Whether the connection was a member of a view
+        """
+        return self._leave_view(connection_id)
+    
+    def _leave_view(self, connection_id: str) -> bool:
+        """Leave the connection's view, dropping the group once empty."""
+        group_id = self._connection_views.pop(connection_id, None)
+        group = self._view_groups.get(group_id) if group_id else None
+        if group is None:
+            return False
+        
+        group.members.pop(connection_id, None)
+        if not group.members:
+            del self._view_groups[group_id]
+            group.outbox.async_close()
+            for entity_id in group.entity_ids:
+                self._detach(group_id, entity_id)
+            _LOGGER.debug(f"Dropped view group {group.view}")
+        return True
+    
+    async def subscribe_to_selector(
+        self,
+        connection_id: str,
+        selector: Dict[str, str]
+    ) -> Dict[str, Any]:
+        """
+        Subscribe connection to every entity matching a selector.
+        
+        Membership follows registry changes: entities moved into the area,
+        added to the domain or renamed into the category are picked up
+        without the client re-subscribing.
+        
+        Args:
+            connection_id: Connection making the subscription
+            selector: Mapping of area_id, domain and/or category to match
+            
+        Returns:
+            Dictionary with the canonical 'selector' key and matching 'entities'
+            
+        Raises:
+            QuotaExceeded: If the connection would exceed its entity quota
+        """
+        key = selector_key(selector)
+        
+        if connection_id not in self._outboxes:
+            _LOGGER.warning(f"Connection {connection_id} not registered")
+            return {"selector": key, "entities": []}
+        
+        self._selector_index.async_start()
+        members = self._selector_index.resolve(selector)
+        self._check_entity_quota(connection_id, members)
+        if key not in self._selectors[connection_id]:
+            self.stats.selectors += 1
+        self._selectors[connection_id][key] = dict(selector)
+        self._selector_members[connection_id][key] = members
+        for entity_id in members:
+            self._attach(connection_id, entity_id)
+        
+        _LOGGER.debug(f"Connection {connection_id} subscribed to selector {key} ({len(members)} entities)")
+        return {"selector": key, "entities": sorted(members)}
+    
+    async def unsubscribe_from_selector(
+        self,
+        connection_id: str,
+        selector: Dict[str, str]
+    ) -> bool:
+        """
+        Unsubscribe connection from a selector.
+        
+        Args:
+            connection_id: Connection making the unsubscription
+            selector: Selector previously subscribed to
+            
+        Returns:
+            Whether the connection was subscribed to the selector
+        """
+        key = selector_key(selector)
+        
+        if key not in self._selectors.get(connection_id, {}):
+            return False
+        
+        del self._selectors[connection_id][key]
+        self.stats.selectors -= 1
+        members = self._selector_members[connection_id].pop(key)
+        for entity_id in members:
+            self._detach(connection_id, entity_id)
+        
+        return True
+    
+    @callback
+    def _async_selector_attributes_changed(
+        self,
+        entity_id: str,
+        old_attributes: Optional[Dict[str, str]],
+        new_attributes: Optional[Dict[str, str]]
+    ) -> None:
+        """Move an entity between selector subscriptions after a registry change."""
+        for connection_id, selectors in self._selectors.items():
+            for key, selector in selectors.items():
+                was_member = selector_matches(selector, old_attributes)
+                is_member = selector_matches(selector, new_attributes)
+                if was_member == is_member:
+                    continue
+                
+                members = self._selector_members[connection_id][key]
+                if is_member:
+                    members.add(entity_id)
+                    self._attach(connection_id, entity_id)
+                else:
+                    members.discard(entity_id)
+                    self._detach(connection_id, entity_id)
+                
+                outbox = self._outboxes.get(connection_id)
+                if outbox:
+                    try:
+                        outbox.send_event({
+                            "event_type": EVENT_SELECTOR_CHANGED,
+                            "selector": key,
+                            "added": [entity_id] if is_member else [],
+                            "removed": [] if is_member else [entity_id]
+                        })
+                    except Exception as err:
+                        _LOGGER.error(f"Error sending selector change: {err}")
+    
     async def get_active_subscriptions(self, connection_id: Optional[str] = None) -> Dict[str, Set[str]]:
         """
         Get active subscriptions.
@@ -189,11 +772,10 @@ class SubscriptionManager:
         Returns:
             Dictionary of connection_id -> set of entity_ids
         """
-        async with self._lock:
-            if connection_id:
-                return {connection_id: self._subscriptions.get(connection_id, set())}
-            else:
-                return dict(self._subscriptions)
+        if connection_id:
+            return {connection_id: self._subscriptions.get(connection_id, set())}
+        else:
+            return dict(self._subscriptions)
     
     async def get_entity_listeners(self, entity_id: str) -> Set[str]:
         """
@@ -205,63 +787,141 @@ class SubscriptionManager:
         Returns:
             Set of connection IDs subscribed to this entity
         """
-        async with self._lock:
-            return self._entity_listeners.get(entity_id, set()).copy()
+        return set(self._entity_listeners.get(entity_id, ()))
     
     async def update_subscriptions(
         self, 
         connection_id: str, 
-        new_entity_ids: List[str]
+        new_entity_ids: List[str],
+        nearby_entity_ids: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """
         Update subscriptions to match new entity list.
         
         This will subscribe to new entities and unsubscribe from removed ones.
+        Entities moving between the visible and near-visible lists only
+        change tier and stay subscribed.
         
         Args:
             connection_id: Connection to update
-            new_entity_ids: New complete list of entity IDs
+            new_entity_ids: New complete list of visible entity IDs
+            nearby_entity_ids: Optional entity IDs just outside the viewport
             
         Returns:
-            Dictionary with 'subscribed', 'unsubscribed', and 'failed' lists
+            Dictionary with 'subscribed', 'unsubscribed', 'failed' and 'nearby' lists
+            
+        Raises:
+            QuotaExceeded: If the new list would exceed the entity quota; nothing changes
         """
         current_subscriptions = await self.get_active_subscriptions(connection_id)
         current_set = current_subscriptions.get(connection_id, set())
-        new_set = set(new_entity_ids)
+        nearby_set = set(nearby_entity_ids or ()) - set(new_entity_ids)
+        new_set = set(new_entity_ids) | nearby_set
         
         # Determine changes
         to_subscribe = list(new_set - current_set)
         to_unsubscribe = list(current_set - new_set)
         
-        # Perform updates
-        subscribe_results = await self.subscribe_to_entities(connection_id, to_subscribe)
+        # Check the final set up front so a rejected update leaves the old one intact
+        if connection_id in self._outboxes:
+            self._check_entity_quota(connection_id, new_set, releasing=frozenset(to_unsubscribe))
+        
         unsubscribe_results = await self.unsubscribe_from_entities(connection_id, to_unsubscribe)
+        subscribe_results = await self.subscribe_to_entities(connection_id, to_subscribe)
+        
+        await self.set_entity_tier(connection_id, new_entity_ids, TIER_VISIBLE)
+        nearby = await self.set_entity_tier(connection_id, list(nearby_set), TIER_NEARBY)
         
         return {
             "subscribed": [e for e, success in subscribe_results.items() if success],
             "unsubscribed": [e for e, success in unsubscribe_results.items() if success],
-            "failed": [e for e, success in subscribe_results.items() if not success]
+            "failed": [e for e, success in subscribe_results.items() if not success],
+            "nearby": nearby
         }
     
+    async def set_entity_tier(
+        self,
+        connection_id: str,
+        entity_ids: List[str],
+        tier: str
+    ) -> List[str]:
+        """
+        Move subscribed entities between the visible and near-visible tier.
+        
+        Near-visible entities stay subscribed but are pushed at a reduced rate;
+        promoting one back sends any change held for it right away.
+        
+        Args:
+            connection_id: Connection owning the subscriptions
+            entity_ids: Entities to move
+            tier: "visible" or "nearby"
+            
+        Returns:
+            The entities whose tier was set; unsubscribed ones are skipped
+        """
+        outbox = self._outboxes.get(connection_id)
+        if outbox is None:
+            return []
+        
+        entity_ids = [
+            entity_id for entity_id in entity_ids
+            if self._holds(connection_id, entity_id)
+        ]
+        outbox.async_set_tier(entity_ids, tier)
+        
+        return entity_ids
+    
     def get_subscription_stats(self) -> Dict[str, Any]:
         """
         Get statistics about current subscriptions.
         
+        Counters are kept up to date as subscriptions and changes come and
+        go, so the cost does not grow with connections or entities and the
+        stats can be polled every second.
+        
         Returns:
             Dictionary with subscription statistics
         """
-        total_subscriptions = sum(len(entities) for entities in self._subscriptions.values())
-        
         return {
-            "total_connections": len(self._connection_handlers),
-            "total_subscriptions": total_subscriptions,
+            "total_connections": len(self._outboxes),
+            "total_subscriptions": self.stats.subscriptions,
             "unique_entities_monitored": len(self._entity_listeners),
+            "active_trackers": len(self._entity_trackers),
+            "selector_subscriptions": self.stats.selectors,
+            "seq": self.seq,
+            "versions_tracked": len(self._versions),
+            "view_groups": len(self._view_groups),
+            "view_members": len(self._connection_views),
+            "quotas": self.quotas.get_stats(),
+            **self.stats.get_stats()
+        }
+    
+    def get_subscription_details(self) -> Dict[str, Any]:
+        """
+        Get per-entity, per-connection and per-view breakdowns for debugging.
+        
+        Unlike get_subscription_stats this walks every connection and
+        listened entity, so it is meant for occasional inspection only.
+        
+        Returns:
+            Dictionary with the breakdowns
+        """
+        return {
             "connections_per_entity": {
                 entity_id: len(listeners)
                 for entity_id, listeners in self._entity_listeners.items()
-            } if len(self._entity_listeners) < 100 else "Too many to list",
+            },
             "subscriptions_per_connection": {
                 conn_id: len(entities)
                 for conn_id, entities in self._subscriptions.items()
+            },
+            "connections_needing_resync": sum(o.needs_resync for o in self._outboxes.values()),
+            "views": {
+                group.view: group.get_stats()
+                for group in self._view_groups.values()
+            },
+            "queues": {
+                conn_id: outbox.get_stats()
+                for conn_id, outbox in self._outboxes.items()
             }
         }
\ No newline at end of file
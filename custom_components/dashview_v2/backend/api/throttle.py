@@ -0,0 +1,160 @@
+"""Per-entity rate limiting and numeric deadband filtering of pushed changes."""
+
+from dataclasses import dataclass, replace
+from typing import Any, Dict, Optional, Tuple
+
+from homeassistant.core import State
+
+# Subscription tiers: visible entities get full-rate updates, entities just
+# outside the viewport are kept warm at a reduced rate
+TIER_VISIBLE = "visible"
+TIER_NEARBY = "nearby"
+TIERS = (TIER_VISIBLE, TIER_NEARBY)
+
+# Minimum interval between two pushes of a near-visible entity
+NEARBY_MIN_INTERVAL_MS = 1000
+
+# Policy fields accepted from clients
+POLICY_MIN_INTERVAL_MS = "min_interval_ms"
+POLICY_DEADBAND = "deadband"
+POLICY_DEADBAND_PERCENT = "deadband_percent"
+
+
+@dataclass(frozen=True)
+class UpdatePolicy:
+    """How often, and by how much, an entity must change to be pushed."""
+
+    min_interval_ms: int = 0  # Minimum time between two pushes of one entity
+    deadband: float = 0.0  # Numeric changes smaller than this are dropped
+    deadband_percent: float = 0.0  # Same, relative to the last pushed value
+
+    @property
+    def active(self) -> bool:
+        """Return whether the policy filters anything at all."""
+        return bool(self.min_interval_ms or self.deadband or self.deadband_percent)
+
+    def merge(self, overrides: Dict[str, Any]) -> "UpdatePolicy":
+        """Return a copy with the given fields overridden."""
+        return UpdatePolicy(
+            min_interval_ms=overrides.get(POLICY_MIN_INTERVAL_MS, self.min_interval_ms),
+            deadband=overrides.get(POLICY_DEADBAND, self.deadband),
+            deadband_percent=overrides.get(POLICY_DEADBAND_PERCENT, self.deadband_percent),
+        )
+
+
+NO_POLICY = UpdatePolicy()
+
+# Defaults per EntityMapper category; categories not listed are pushed unfiltered.
+# EntityMapper files binary sensors, fans and switches under these too;
+# policy_category exempts them.
+DEFAULT_UPDATE_POLICIES: Dict[str, UpdatePolicy] = {
+    "energy": UpdatePolicy(min_interval_ms=2000, deadband_percent=1.0),
+    "climate": UpdatePolicy(min_interval_ms=1000, deadband=0.1),
+    "sensor": UpdatePolicy(min_interval_ms=1000),
+}
+
+
+# Domains never filtered: each motion, door or contact edge matters the moment it
+# happens, and a fan or switch toggled from the dashboard must show it at once
+UNFILTERED_DOMAINS = frozenset({"binary_sensor", "fan", "switch"})
+
+
+def policy_category(entity_id: str, category: Optional[str]) -> Optional[str]:
+    """Return the category whose update policy applies to an entity, None for no policy."""
+    if entity_id.split(".", 1)[0] in UNFILTERED_DOMAINS:
+        return None
+    return category
+
+
+def _numeric(state: State) -> Optional[float]:
+    """Return the state as a number, or None if it is not numeric."""
+    try:
+        return float(state.state)
+    except (TypeError, ValueError):
+        return None
+
+
+class UpdateFilter:
+    """Decides for one connection which entity changes are worth pushing."""
+
+    def __init__(self, overrides: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        Initialize the filter.
+
+        Args:
+            overrides: Policy fields per category overriding the defaults
+        """
+        self._policies = dict(DEFAULT_UPDATE_POLICIES)
+        self._nearby_policies: Dict[Optional[str], UpdatePolicy] = {}  # category -> reduced-rate policy
+        self._last_passed: Dict[str, Tuple[float, State]] = {}  # entity_id -> (time, state)
+        self.passed = 0
+        self.dropped_deadband = 0
+        self.dropped_interval = 0
+        self.set_overrides(overrides)
+
+    def set_overrides(self, overrides: Optional[Dict[str, Dict[str, Any]]]) -> None:
+        """Apply per-category overrides on top of the defaults."""
+        for category, fields in (overrides or {}).items():
+            self._policies[category] = self._policies.get(category, NO_POLICY).merge(fields)
+        self._nearby_policies.clear()
+
+    def policy_for(self, category: Optional[str], tier: str = TIER_VISIBLE) -> UpdatePolicy:
+        """Return the policy of a category, slowed down for near-visible entities."""
+        policy = self._policies.get(category, NO_POLICY)
+        if tier != TIER_NEARBY:
+            return policy
+
+        nearby = self._nearby_policies.get(category)
+        if nearby is None:
+            nearby = self._nearby_policies[category] = replace(
+                policy, min_interval_ms=max(policy.min_interval_ms, NEARBY_MIN_INTERVAL_MS)
+            )
+        return nearby
+
+    def within_deadband(self, entity_id: str, new_state: State, policy: UpdatePolicy) -> bool:
+        """Check whether a change is too small to be worth pushing."""
+        if not (policy.deadband or policy.deadband_percent):
+            return False
+        last = self._last_passed.get(entity_id)
+        if last is None:
+            return False
+
+        last_state = last[1]
+        # Only plain numeric moves are filtered; anything else is a real change
+        if last_state.attributes != new_state.attributes:
+            return False
+        last_value = _numeric(last_state)
+        new_value = _numeric(new_state)
+        if last_value is None or new_value is None:
+            return False
+
+        threshold = max(policy.deadband, abs(last_value) * policy.deadband_percent / 100)
+        return abs(new_value - last_value) < threshold
+
+    def delay(self, entity_id: str, policy: UpdatePolicy, now: float) -> float:
+        """Return how many seconds a change has to wait for its interval."""
+        last = self._last_passed.get(entity_id)
+        if last is None or not policy.min_interval_ms:
+            return 0.0
+        return max(0.0, last[0] + policy.min_interval_ms / 1000 - now)
+
+    def mark_passed(self, entity_id: str, new_state: State, now: float) -> None:
+        """Remember the state the client is about to receive."""
+        self._last_passed[entity_id] = (now, new_state)
+        self.passed += 1
+
+    def forget(self, entity_id: str) -> None:
+        """Drop what is known about an entity the client no longer holds."""
+        self._last_passed.pop(entity_id, None)
+
+    def clear(self) -> None:
+        """Forget every entity, e.g. after the client lost its state."""
+        self._last_passed.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        """Return filter counters for tuning."""
+        return {
+            "updates_passed": self.passed,
+            "updates_dropped_deadband": self.dropped_deadband,
+            "updates_dropped_interval": self.dropped_interval,
+        }
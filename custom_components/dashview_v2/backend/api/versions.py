@@ -0,0 +1,75 @@
+"""Sequence numbers and per-entity versions for resyncing dashboards."""
+
+import uuid
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from homeassistant.core import State
+
+# Entities remembered for resyncs; older entries are treated as changed
+DEFAULT_MAX_VERSIONS = 10000
+
+
+class EntityVersionTable:
+    """Tracks the sequence number of the latest change seen for each entity."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_VERSIONS):
+        """
+        Initialize the version table.
+
+        Args:
+            max_entries: Maximum number of entities remembered
+        """
+        # A new epoch per instance invalidates sequence numbers from before a restart
+        self.epoch = uuid.uuid4().hex
+        self.seq = 0
+        self.max_entries = max_entries
+        self._versions: Dict[str, Tuple[int, Optional[datetime]]] = {}  # entity_id -> (seq, last_updated)
+
+    def __len__(self) -> int:
+        """Return the number of remembered entities."""
+        return len(self._versions)
+
+    def record(self, entity_id: str, state: Optional[State]) -> int:
+        """
+        Record a change or the start of observing an entity.
+
+        Args:
+            entity_id: Entity that changed
+            state: Its new state, None if it was removed
+
+        Returns:
+            The sequence number assigned to the change
+        """
+        self.seq += 1
+        # Re-insert so the dict stays ordered from least to most recently changed
+        self._versions.pop(entity_id, None)
+        self._versions[entity_id] = (self.seq, state.last_updated if state else None)
+        if len(self._versions) > self.max_entries:
+            del self._versions[next(iter(self._versions))]
+        return self.seq
+
+    def observe(self, entity_id: str, state: Optional[State]) -> None:
+        """
+        Record an entity that is about to be tracked again.
+
+        Its version is kept if the state is unchanged since it was last
+        recorded; otherwise it changed unobserved and gets a new version.
+        """
+        entry = self._versions.get(entity_id)
+        if entry is None or entry[1] != (state.last_updated if state else None):
+            self.record(entity_id, state)
+
+    def changed_since(self, entity_id: str, state: Optional[State], since: int) -> bool:
+        """
+        Check whether a client that saw everything up to since is out of date.
+
+        Entities changed after since, entities not remembered, and entities
+        whose current state differs from the recorded one (they changed
+        while nobody tracked them) all count as changed.
+        """
+        entry = self._versions.get(entity_id)
+        if entry is None:
+            return True
+        seq, last_updated = entry
+        return seq > since or (state.last_updated if state else None) != last_updated
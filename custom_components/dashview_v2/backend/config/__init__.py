@@ -1,5 +1,35 @@
 """Configuration module for Dashview V2."""
 
-from .schema import DashviewConfigSchema
+from .schema import (
+    CONF_FLUSH_INTERVAL_MS,
+    CONF_MAX_CONNECTIONS_PER_USER,
+    CONF_MAX_ENTITIES_PER_CONNECTION,
+    CONF_MAX_PENDING_UPDATES,
+    CONF_MAX_SUBSCRIBE_RATE,
+    CONF_SUBSCRIBE_BURST,
+    DEFAULT_FLUSH_INTERVAL_MS,
+    DEFAULT_MAX_CONNECTIONS_PER_USER,
+    DEFAULT_MAX_ENTITIES_PER_CONNECTION,
+    DEFAULT_MAX_PENDING_UPDATES,
+    DEFAULT_MAX_SUBSCRIBE_RATE,
+    DEFAULT_SUBSCRIBE_BURST,
+    MAX_FLUSH_INTERVAL_MS,
+    DashviewConfigSchema,
+)
 
-__all__ = ["DashviewConfigSchema"]
\ No newline at end of file
+__all__ = [
+    "CONF_FLUSH_INTERVAL_MS",
+    "CONF_MAX_CONNECTIONS_PER_USER",
+    "CONF_MAX_ENTITIES_PER_CONNECTION",
+    "CONF_MAX_PENDING_UPDATES",
+    "CONF_MAX_SUBSCRIBE_RATE",
+    "CONF_SUBSCRIBE_BURST",
+    "DEFAULT_FLUSH_INTERVAL_MS",
+    "DEFAULT_MAX_CONNECTIONS_PER_USER",
+    "DEFAULT_MAX_ENTITIES_PER_CONNECTION",
+    "DEFAULT_MAX_PENDING_UPDATES",
+    "DEFAULT_MAX_SUBSCRIBE_RATE",
+    "DEFAULT_SUBSCRIBE_BURST",
+    "MAX_FLUSH_INTERVAL_MS",
+    "DashviewConfigSchema",
+]
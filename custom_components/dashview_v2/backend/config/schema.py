@@ -2,9 +2,45 @@
 
 import voluptuous as vol
 
-# Configuration schema (will be expanded in future)
+CONF_FLUSH_INTERVAL_MS = "flush_interval_ms"
+CONF_MAX_PENDING_UPDATES = "max_pending_updates"
+CONF_MAX_ENTITIES_PER_CONNECTION = "max_entities_per_connection"
+CONF_MAX_CONNECTIONS_PER_USER = "max_connections_per_user"
+CONF_MAX_SUBSCRIBE_RATE = "max_subscribe_rate"
+CONF_SUBSCRIBE_BURST = "subscribe_burst"
+
+# Coalescing window for state changes pushed to dashboards
+DEFAULT_FLUSH_INTERVAL_MS = 100
+MAX_FLUSH_INTERVAL_MS = 5000
+
+# Entities buffered per connection before updates are dropped
+DEFAULT_MAX_PENDING_UPDATES = 1000
+
+# Subscription quotas; the frontend caps itself at 500 entities
+DEFAULT_MAX_ENTITIES_PER_CONNECTION = 2000
+DEFAULT_MAX_CONNECTIONS_PER_USER = 50
+DEFAULT_MAX_SUBSCRIBE_RATE = 10.0  # Subscription calls per second per connection
+DEFAULT_SUBSCRIBE_BURST = 20
+
 DashviewConfigSchema = vol.Schema(
     {
-        # Future configuration options will go here
+        vol.Optional(CONF_FLUSH_INTERVAL_MS, default=DEFAULT_FLUSH_INTERVAL_MS): vol.All(
+            vol.Coerce(int), vol.Range(min=0, max=MAX_FLUSH_INTERVAL_MS)
+        ),
+        vol.Optional(CONF_MAX_PENDING_UPDATES, default=DEFAULT_MAX_PENDING_UPDATES): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
+        vol.Optional(
+            CONF_MAX_ENTITIES_PER_CONNECTION, default=DEFAULT_MAX_ENTITIES_PER_CONNECTION
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(
+            CONF_MAX_CONNECTIONS_PER_USER, default=DEFAULT_MAX_CONNECTIONS_PER_USER
+        ): vol.All(vol.Coerce(int), vol.Range(min=1)),
+        vol.Optional(CONF_MAX_SUBSCRIBE_RATE, default=DEFAULT_MAX_SUBSCRIBE_RATE): vol.All(
+            vol.Coerce(float), vol.Range(min=0.1)
+        ),
+        vol.Optional(CONF_SUBSCRIBE_BURST, default=DEFAULT_SUBSCRIBE_BURST): vol.All(
+            vol.Coerce(int), vol.Range(min=1)
+        ),
     }
-)
\ No newline at end of file
+)
@@ -1,5 +1,6 @@
 """Home intelligence module for Dashview V2."""
 
 from .analyzer import HomeComplexityAnalyzer
+from .registry_index import RegistryIndex
 
-__all__ = ["HomeComplexityAnalyzer"]
\ No newline at end of file
+__all__ = ["HomeComplexityAnalyzer", "RegistryIndex"]
\ No newline at end of file
@@ -1,34 +1,76 @@
 """Home complexity analyzer for Dashview V2."""
 
+import asyncio
 import logging
-from typing import Dict, List, Set, Optional, Any
-from dataclasses import dataclass
+import threading
+from typing import Dict, List, Optional, Any, Set, Tuple
 
-from homeassistant.core import HomeAssistant
-from homeassistant.helpers import area_registry, device_registry, entity_registry
+from homeassistant.core import HomeAssistant, callback
+
+from .engine import (
+    CATEGORIES,
+    DOMAIN_CATEGORIES,
+    UNASSIGNED_AREA,
+    UNASSIGNED_AREA_NAME,
+    AreaInfo,
+    RegistrySnapshot,
+    analyze_home,
+    complexity_score,
+)
+from .registry_index import RegistryIndex
 
 _LOGGER = logging.getLogger(__name__)
 
 
-@dataclass
-class AreaInfo:
-    """Information about a home area."""
-    area_id: str
-    name: str
-    entities: List[str]
-    device_count: int
-    last_activity: Optional[float] = None
+def _build_home_complexity(snapshot: RegistrySnapshot, cancel: threading.Event) -> Dict[str, Any]:
+    """Analyze a snapshot into the get_home_complexity result; runs in the executor."""
+    analysis = analyze_home(snapshot, cancel)
+    return {
+        "version": analysis.version,
+        "complexity_score": analysis.complexity_score,
+        "total_entities": analysis.entity_count,
+        "total_areas": analysis.area_count,
+        "total_devices": analysis.device_count,
+        "areas": {
+            area_id: {
+                "name": area_info.name,
+                "entity_count": len(area_info.entities),
+                "device_count": area_info.device_count,
+                "entities": area_info.entities,
+                "hash": analysis.area_hashes[area_id]
+            }
+            for area_id, area_info in analysis.areas.items()
+        },
+        "entity_categories": analysis.category_counts,
+        "unassigned_entity_count": analysis.unassigned_count
+    }
 
 
 class HomeComplexityAnalyzer:
     """Analyzes home complexity for intelligent dashboard configuration."""
     
-    def __init__(self, hass: HomeAssistant):
-        """Initialize the analyzer."""
+    def __init__(self, hass: HomeAssistant, index: Optional[RegistryIndex] = None):
+        """
+        Initialize the analyzer.
+        
+        Args:
+            hass: Home Assistant instance
+            index: Long-lived registry index; a one-off index is built if omitted
+        """
         self.hass = hass
-        self._area_reg = area_registry.async_get(hass)
-        self._device_reg = device_registry.async_get(hass)
-        self._entity_reg = entity_registry.async_get(hass)
+        if index is None:
+            index = RegistryIndex(hass)
+            index.async_build()
+        self._index = index
+        self._complexity: Optional[Dict[str, Any]] = None  # last result, stamped with its version
+        # Version, executor job and cancel flag of the analysis in progress
+        self._computation: Optional[Tuple[str, asyncio.Future, threading.Event]] = None
+        self._remove_listener = index.async_add_listener(self._async_registry_changed)
+    
+    @property
+    def version(self) -> str:
+        """Return the registry version results are currently computed from."""
+        return self._index.version
     
     async def calculate_complexity_score(self) -> int:
         """
@@ -41,108 +83,35 @@ class HomeComplexityAnalyzer:
         - Entity type diversity
         - Automation count
         """
-        score = 0
-        
-        # Entity count factor (0-3 points)
-        entity_count = len(self._entity_reg.entities)
-        if entity_count < 50:
-            score += 1
-        elif entity_count < 150:
-            score += 2
-        else:
-            score += 3
-        
-        # Area count factor (0-2 points)
-        area_count = len(self._area_reg.areas)
-        if area_count < 5:
-            score += 1
-        elif area_count >= 5:
-            score += 2
-        
-        # Device count factor (0-2 points)
-        device_count = len(self._device_reg.devices)
-        if device_count < 20:
-            score += 1
-        elif device_count >= 20:
-            score += 2
-        
-        # Entity diversity factor (0-3 points)
-        entity_domains = self._get_entity_domains()
-        domain_count = len(entity_domains)
-        if domain_count < 10:
-            score += 1
-        elif domain_count < 20:
-            score += 2
-        else:
-            score += 3
-        
-        # Cap at 10
-        return min(score, 10)
-    
-    def _get_entity_domains(self) -> Set[str]:
-        """Get unique entity domains."""
-        domains = set()
-        for entity in self._entity_reg.entities.values():
-            domain = entity.entity_id.split('.')[0]
-            domains.add(domain)
-        return domains
+        return complexity_score(
+            self._index.entity_count,
+            len(self._index.areas),
+            self._index.device_count,
+            len(self._index.domains)
+        )
     
     async def detect_areas(self) -> List[Dict[str, any]]:
         """Detect and categorize areas in the home."""
         areas = []
         
-        for area_id, area in self._area_reg.areas.items():
-            # Count entities in this area
-            area_entities = [
-                entity for entity in self._entity_reg.entities.values()
-                if entity.area_id == area_id
-            ]
-            
-            # Count devices in this area
-            area_devices = [
-                device for device in self._device_reg.devices.values()
-                if device.area_id == area_id
-            ]
-            
+        for area_id, name in self._index.areas.items():
             areas.append({
                 "id": area_id,
-                "name": area.name,
-                "entity_count": len(area_entities),
-                "device_count": len(area_devices),
+                "name": name,
+                "entity_count": len(self._index.area_entities(area_id)),
+                "device_count": self._index.area_device_count(area_id),
             })
         
         return areas
     
     async def categorize_entities(self) -> Dict[str, List[str]]:
         """Categorize entities by type."""
-        categories = {
-            "lights": [],
-            "switches": [],
-            "sensors": [],
-            "climate": [],
-            "media": [],
-            "security": [],
-            "other": [],
-        }
+        categories = {category: [] for category in CATEGORIES}
         
-        for entity in self._entity_reg.entities.values():
-            entity_id = entity.entity_id
-            domain = entity_id.split('.')[0]
-            
-            if domain == "light":
-                categories["lights"].append(entity_id)
-            elif domain == "switch":
-                categories["switches"].append(entity_id)
-            elif domain in ["sensor", "binary_sensor"]:
-                categories["sensors"].append(entity_id)
-            elif domain == "climate":
-                categories["climate"].append(entity_id)
-            elif domain in ["media_player", "remote"]:
-                categories["media"].append(entity_id)
-            elif domain in ["lock", "alarm_control_panel", "camera"]:
-                categories["security"].append(entity_id)
-            else:
-                categories["other"].append(entity_id)
+        # Whole domains at a time; entity_ids are never split again
+        for domain in self._index.domains:
+            category = DOMAIN_CATEGORIES.get(domain, "other")
+            categories[category].extend(self._index.domain_entities(domain))
         
         return categories
     
@@ -153,47 +122,24 @@ class HomeComplexityAnalyzer:
         Returns:
             Dictionary mapping area_id to AreaInfo objects
         """
-        areas = {}
-        
-        # First, get all areas from the registry
-        for area_id, area in self._area_reg.areas.items():
-            area_entities = []
-            device_count = 0
-            
-            # Get entities assigned to this area
-            for entity in self._entity_reg.entities.values():
-                if entity.area_id == area_id:
-                    area_entities.append(entity.entity_id)
-            
-            # Get devices in this area
-            for device in self._device_reg.devices.values():
-                if device.area_id == area_id:
-                    device_count += 1
-                    # Also get entities from devices in this area
-                    for entity in self._entity_reg.entities.values():
-                        if entity.device_id == device.id and entity.entity_id not in area_entities:
-                            area_entities.append(entity.entity_id)
-            
-            areas[area_id] = AreaInfo(
+        areas = {
+            area_id: AreaInfo(
                 area_id=area_id,
-                name=area.name,
-                entities=area_entities,
-                device_count=device_count
+                name=name,
+                entities=self._index.area_entities(area_id),
+                device_count=self._index.area_device_count(area_id)
             )
+            for area_id, name in self._index.areas.items()
+        }
         
         # Handle unassigned entities
         unassigned_entities = await self.find_unassigned_entities()
         if unassigned_entities:
-            areas["unassigned"] = AreaInfo(
-                area_id="unassigned",
-                name="Unassigned Devices",
+            areas[UNASSIGNED_AREA] = AreaInfo(
+                area_id=UNASSIGNED_AREA,
+                name=UNASSIGNED_AREA_NAME,
                 entities=unassigned_entities,
-                device_count=len(set(
-                    self._entity_reg.entities[entity_id].device_id 
-                    for entity_id in unassigned_entities 
-                    if entity_id in self._entity_reg.entities and 
-                    self._entity_reg.entities[entity_id].device_id
-                ))
+                device_count=self._index.area_device_count(UNASSIGNED_AREA)
             )
         
         return areas
@@ -202,29 +148,12 @@ class HomeComplexityAnalyzer:
         """
         Group all entities by their assigned area.
         
+        Entities without an area of their own use their device's area.
+        
         Returns:
             Dictionary mapping area_id to list of entity_ids
         """
-        grouped = {}
-        
-        # Group by assigned areas
-        for entity_id, entity in self._entity_reg.entities.items():
-            area_id = entity.area_id
-            
-            # If entity has no area but has a device, use device's area
-            if not area_id and entity.device_id:
-                device = self._device_reg.devices.get(entity.device_id)
-                if device:
-                    area_id = device.area_id
-            
-            # Use area_id or "unassigned"
-            area_key = area_id if area_id else "unassigned"
-            
-            if area_key not in grouped:
-                grouped[area_key] = []
-            grouped[area_key].append(entity_id)
-        
-        return grouped
+        return self._index.grouped_by_area()
     
     async def find_unassigned_entities(self) -> List[str]:
         """
@@ -233,53 +162,76 @@ class HomeComplexityAnalyzer:
         Returns:
             List of entity_ids that have no area assignment
         """
-        unassigned = []
-        
-        for entity_id, entity in self._entity_reg.entities.items():
-            # Check if entity has direct area assignment
-            if entity.area_id:
-                continue
-            
-            # Check if entity's device has area assignment
-            if entity.device_id:
-                device = self._device_reg.devices.get(entity.device_id)
-                if device and device.area_id:
-                    continue
-            
-            # Entity has no area assignment
-            unassigned.append(entity_id)
-        
-        return unassigned
+        return self._index.area_entities(UNASSIGNED_AREA)
     
     async def get_home_complexity(self) -> Dict[str, Any]:
         """
         Get comprehensive home complexity analysis.
         
+        The analysis runs in the executor against a snapshot taken on the
+        event loop. The result is computed once per registry version and
+        shared by all callers until the registries change; it must not be
+        modified. A newer registry version cancels a running analysis, and
+        its callers wait for the analysis of the newer version instead.
+        
         Returns:
-            Dictionary with complexity score and detailed breakdown
+            Dictionary with complexity score, detailed breakdown and the
+            registry version it was computed from
         """
-        complexity_score = await self.calculate_complexity_score()
-        areas = await self.analyze_areas()
-        entity_groups = await self.group_entities_by_area()
-        categories = await self.categorize_entities()
-        
-        return {
-            "complexity_score": complexity_score,
-            "total_entities": len(self._entity_reg.entities),
-            "total_areas": len(self._area_reg.areas),
-            "total_devices": len(self._device_reg.devices),
-            "areas": {
-                area_id: {
-                    "name": area_info.name,
-                    "entity_count": len(area_info.entities),
-                    "device_count": area_info.device_count,
-                    "entities": area_info.entities
-                }
-                for area_id, area_info in areas.items()
-            },
-            "entity_categories": {
-                category: len(entities)
-                for category, entities in categories.items()
-            },
-            "unassigned_entity_count": len(entity_groups.get("unassigned", []))
-        }
\ No newline at end of file
+        while True:
+            version = self._index.version
+            if self._complexity is not None and self._complexity["version"] == version:
+                return self._complexity
+            
+            if self._computation is None or self._computation[0] != version:
+                self._async_cancel_stale()
+                self._async_start_computation()
+            future = self._computation[1]
+            
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # Superseded by a newer registry version; analyze that one instead
+    
+    @callback
+    def _async_start_computation(self) -> None:
+        """Snapshot the index and analyze the snapshot in the executor."""
+        snapshot = self._index.snapshot()
+        cancel = threading.Event()
+        future = self.hass.async_add_executor_job(_build_home_complexity, snapshot, cancel)
+        self._computation = (snapshot.version, future, cancel)
+        future.add_done_callback(self._async_publish)
+    
+    @callback
+    def _async_publish(self, future: asyncio.Future) -> None:
+        """Publish a finished analysis unless it was cancelled meanwhile."""
+        if self._computation is None or self._computation[1] is not future:
+            return
+        self._computation = None
+        if not future.cancelled() and future.exception() is None:
+            # One assignment on the loop; readers see the old or the new result
+            self._complexity = future.result()
+    
+    @callback
+    def async_stop(self) -> None:
+        """Stop following the index and cancel the analysis in progress."""
+        self._remove_listener()
+        self._async_cancel_stale()
+    
+    @callback
+    def _async_registry_changed(self, _moved: Set[str]) -> None:
+        """Drop the analysis in progress once the registries changed."""
+        self._async_cancel_stale()
+    
+    @callback
+    def _async_cancel_stale(self) -> None:
+        """Cancel the analysis in progress; the registries moved past its snapshot."""
+        if self._computation is None:
+            return
+        version, future, cancel = self._computation
+        self._computation = None
+        cancel.set()
+        future.cancel()
+        _LOGGER.debug(f"Cancelled home analysis of stale version {version}")
@@ -0,0 +1,219 @@
+"""Single-pass home analysis over a snapshot of the registry index."""
+
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, FrozenSet, Iterable, List, Mapping, NamedTuple, Optional
+
+# Pseudo area holding entities that neither they nor their device are assigned to
+UNASSIGNED_AREA = "unassigned"
+UNASSIGNED_AREA_NAME = "Unassigned Devices"
+
+# How long an executor job may hold the GIL before letting the event loop run
+YIELD_INTERVAL = 0.001
+
+# Entity categories in display order, and the domains falling into each
+CATEGORIES = ("lights", "switches", "sensors", "climate", "media", "security", "other")
+DOMAIN_CATEGORIES = {
+    "light": "lights",
+    "switch": "switches",
+    "sensor": "sensors",
+    "binary_sensor": "sensors",
+    "climate": "climate",
+    "media_player": "media",
+    "remote": "media",
+    "lock": "security",
+    "alarm_control_panel": "security",
+    "camera": "security",
+}
+
+
+class AnalysisCancelled(Exception):
+    """Raised by an analysis whose result is no longer wanted."""
+
+
+@dataclass
+class AreaInfo:
+    """Information about a home area."""
+    area_id: str
+    name: str
+    entities: List[str]
+    device_count: int
+    last_activity: Optional[float] = None
+
+
+class RegistrySnapshot(NamedTuple):
+    """Read-only copy of the registry groupings the analysis needs."""
+
+    version: str
+    area_names: Mapping[str, str]  # area_id -> name
+    area_entities: Mapping[str, FrozenSet[str]]  # effective area_id or UNASSIGNED_AREA -> entity_ids
+    area_device_counts: Mapping[str, int]  # area_id or UNASSIGNED_AREA -> devices
+    domain_counts: Mapping[str, int]  # domain -> entities
+    entity_count: int
+    device_count: int
+
+    @classmethod
+    def create(
+        cls,
+        version: str,
+        area_names: Mapping[str, str],
+        area_entities: Mapping[str, Iterable[str]],
+        area_device_counts: Mapping[str, int],
+        domain_counts: Mapping[str, int],
+        entity_count: int,
+        device_count: int
+    ) -> "RegistrySnapshot":
+        """Copy the given groupings into a snapshot nobody can modify."""
+        return cls(
+            version,
+            MappingProxyType(dict(area_names)),
+            MappingProxyType({
+                area_id: frozenset(entity_ids)
+                for area_id, entity_ids in area_entities.items()
+                if entity_ids
+            }),
+            MappingProxyType(dict(area_device_counts)),
+            MappingProxyType(dict(domain_counts)),
+            entity_count,
+            device_count,
+        )
+
+
+@dataclass(frozen=True)
+class HomeAnalysis:
+    """Everything the home analysis derives from one registry snapshot."""
+
+    version: str
+    entity_count: int
+    device_count: int
+    area_count: int
+    domains: FrozenSet[str]
+    category_counts: Dict[str, int]
+    areas: Dict[str, AreaInfo]  # registered areas, plus UNASSIGNED_AREA when not empty
+    area_hashes: Dict[str, str]  # area_id -> area_content_hash of areas
+    unassigned_count: int
+
+    @property
+    def complexity_score(self) -> int:
+        """Return the home complexity score (1-10)."""
+        return complexity_score(
+            self.entity_count, self.area_count, self.device_count, len(self.domains)
+        )
+
+
+class LoopYielder:
+    """
+    Lets the event loop thread take the GIL from a long executor job.
+
+    Without it, pure Python work in a thread keeps the loop waiting a
+    whole switch interval, or longer with several jobs, each time the
+    loop wants to run. Call it once per item of work; on the event loop
+    thread itself it does nothing.
+    """
+
+    def __init__(self) -> None:
+        """Start timing the job."""
+        self._enabled = threading.current_thread() is not threading.main_thread()
+        self._deadline = time.perf_counter() + YIELD_INTERVAL
+
+    def __call__(self) -> None:
+        """Release the GIL if the job held it for YIELD_INTERVAL."""
+        if self._enabled and time.perf_counter() >= self._deadline:
+            time.sleep(0)
+            self._deadline = time.perf_counter() + YIELD_INTERVAL
+
+
+def area_content_hash(area: AreaInfo) -> str:
+    """
+    Return a hash of what a client shows for an area.
+
+    It covers the name, device count and entity list, and stays the same
+    across registry versions and restarts as long as those do.
+    """
+    content = hashlib.blake2b(digest_size=8)
+    content.update(f"{area.name}\0{area.device_count}\0".encode())
+    content.update("\0".join(area.entities).encode())
+    return content.hexdigest()
+
+
+def complexity_score(entity_count: int, area_count: int, device_count: int, domain_count: int) -> int:
+    """
+    Calculate home complexity score (1-10).
+
+    Factors:
+    - Number of entities (1-3 points)
+    - Number of areas/rooms (1-2 points)
+    - Number of devices (1-2 points)
+    - Entity type diversity (1-3 points)
+    """
+    score = 1 if entity_count < 50 else 2 if entity_count < 150 else 3
+    score += 1 if area_count < 5 else 2
+    score += 1 if device_count < 20 else 2
+    score += 1 if domain_count < 10 else 2 if domain_count < 20 else 3
+    return min(score, 10)
+
+
+def analyze_home(snapshot: RegistrySnapshot, cancel: Optional[threading.Event] = None) -> HomeAnalysis:
+    """
+    Derive domains, categories, area grouping, device counts and area hashes in one pass.
+
+    The snapshot already groups entities by effective area and by domain,
+    so the pass walks areas and domains once and never visits an entity
+    on its own, nor splits an entity_id. Safe to run outside the event
+    loop, since nothing but the snapshot is read.
+
+    Args:
+        snapshot: Registry groupings to analyze
+        cancel: Checked between areas; once set the pass stops early
+
+    Returns:
+        The complete analysis
+
+    Raises:
+        AnalysisCancelled: If cancel was set before the pass finished
+    """
+    category_counts = dict.fromkeys(CATEGORIES, 0)
+    for domain, count in snapshot.domain_counts.items():
+        category_counts[DOMAIN_CATEGORIES.get(domain, "other")] += count
+
+    area_entities = snapshot.area_entities
+    area_device_counts = snapshot.area_device_counts
+    yield_to_loop = LoopYielder()
+    areas: Dict[str, AreaInfo] = {}
+    for area_id, name in snapshot.area_names.items():
+        yield_to_loop()
+        if cancel is not None and cancel.is_set():
+            raise AnalysisCancelled(snapshot.version)
+        areas[area_id] = AreaInfo(
+            area_id=area_id,
+            name=name,
+            entities=sorted(area_entities.get(area_id, ())),
+            device_count=area_device_counts.get(area_id, 0)
+        )
+    unassigned = area_entities.get(UNASSIGNED_AREA, ())
+    if unassigned:
+        areas[UNASSIGNED_AREA] = AreaInfo(
+            area_id=UNASSIGNED_AREA,
+            name=UNASSIGNED_AREA_NAME,
+            entities=sorted(unassigned),
+            device_count=area_device_counts.get(UNASSIGNED_AREA, 0)
+        )
+    area_hashes = {}
+    for area_id, area in areas.items():
+        yield_to_loop()
+        area_hashes[area_id] = area_content_hash(area)
+
+    return HomeAnalysis(
+        version=snapshot.version,
+        entity_count=snapshot.entity_count,
+        device_count=snapshot.device_count,
+        area_count=len(snapshot.area_names),
+        domains=frozenset(snapshot.domain_counts),
+        category_counts=category_counts,
+        areas=areas,
+        area_hashes=area_hashes,
+        unassigned_count=len(unassigned),
+    )
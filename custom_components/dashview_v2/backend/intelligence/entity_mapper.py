@@ -1,14 +1,21 @@
 """Entity relationship mapper for Dashview V2."""
 
 import logging
-from typing import Dict, List, Set, Optional
+from collections import defaultdict
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Set, Optional, Tuple
 from dataclasses import dataclass
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.helpers import device_registry, entity_registry
 
+from .engine import LoopYielder
+
 _LOGGER = logging.getLogger(__name__)
 
+# entity_id, area_id and device_id of every registered entity
+RegistryEntries = Tuple[Tuple[str, Optional[str], Optional[str]], ...]
+
 
 @dataclass
 class EntityRelationship:
@@ -30,6 +37,26 @@ class EntityMapper:
         self._device_reg = device_registry.async_get(hass)
         self._entity_reg = entity_registry.async_get(hass)
     
+    @callback
+    def _async_snapshot(self) -> Tuple[RegistryEntries, Mapping[str, Optional[str]]]:
+        """
+        Copy what the mappings read from the registries.
+        
+        Taken on the event loop, so the mappings can run in the executor
+        while the registries keep changing.
+        
+        Returns:
+            Entity entries and the area of every device
+        """
+        entries = tuple(
+            (entity_id, entity.area_id, entity.device_id)
+            for entity_id, entity in self._entity_reg.entities.items()
+        )
+        device_areas = MappingProxyType({
+            device_id: device.area_id for device_id, device in self._device_reg.devices.items()
+        })
+        return entries, device_areas
+    
     async def map_entity_relationships(self) -> Dict[str, EntityRelationship]:
         """
         Map relationships between entities.
@@ -37,17 +64,30 @@ class EntityMapper:
         Returns:
             Dictionary mapping entity_id to EntityRelationship objects
         """
+        entries, device_areas = self._async_snapshot()
+        return await self.hass.async_add_executor_job(
+            self._map_relationships, entries, device_areas
+        )
+    
+    def _map_relationships(
+        self,
+        entries: RegistryEntries,
+        device_areas: Mapping[str, Optional[str]]
+    ) -> Dict[str, EntityRelationship]:
+        """Map relationships from a registry snapshot; runs in the executor."""
+        device_entities = _group_by_device(entries)
+        entity_ids = [entity_id for entity_id, _, _ in entries]
         relationships = {}
         
-        for entity_id, entity in self._entity_reg.entities.items():
+        yield_to_loop = LoopYielder()
+        for entity_id, area_id, device_id in entries:
+            yield_to_loop()
             related_entities = set()
             
             # Find entities from the same device
-            if entity.device_id:
-                for other_entity in self._entity_reg.entities.values():
-                    if (other_entity.device_id == entity.device_id and 
-                        other_entity.entity_id != entity_id):
-                        related_entities.add(other_entity.entity_id)
+            if device_id:
+                related_entities.update(device_entities[device_id])
+                related_entities.discard(entity_id)
             
             # Find entities with similar naming patterns (e.g., room prefixes)
             entity_name_parts = entity_id.split('.')
@@ -55,21 +95,18 @@ class EntityMapper:
                 domain, name = entity_name_parts
                 name_prefix = name.split('_')[0] if '_' in name else name
                 
-                for other_id in self._entity_reg.entities:
+                for other_id in entity_ids:
                     if other_id != entity_id and name_prefix in other_id:
                         related_entities.add(other_id)
             
             # Get area from entity or device
-            area_id = entity.area_id
-            if not area_id and entity.device_id:
-                device = self._device_reg.devices.get(entity.device_id)
-                if device:
-                    area_id = device.area_id
+            if not area_id and device_id:
+                area_id = device_areas.get(device_id)
             
             relationships[entity_id] = EntityRelationship(
                 entity_id=entity_id,
                 area_id=area_id,
-                device_id=entity.device_id,
+                device_id=device_id,
                 related_entities=related_entities,
                 entity_type=self.categorize_entity_type(entity_id),
                 priority=self.calculate_entity_priority(entity_id)
@@ -195,6 +232,12 @@ class EntityMapper:
         Returns:
             Dictionary mapping function type to list of entity IDs
         """
+        return await self.hass.async_add_executor_job(
+            self._group_by_function, tuple(self._entity_reg.entities)
+        )
+    
+    def _group_by_function(self, entity_ids: Tuple[str, ...]) -> Dict[str, List[str]]:
+        """Group a snapshot of entity IDs by functional type; runs in the executor."""
         groups = {
             'lighting': [],
             'climate': [],
@@ -211,7 +254,9 @@ class EntityMapper:
             'other': []
         }
         
-        for entity_id in self._entity_reg.entities:
+        yield_to_loop = LoopYielder()
+        for entity_id in entity_ids:
+            yield_to_loop()
             entity_type = self.categorize_entity_type(entity_id)
             if entity_type in groups:
                 groups[entity_type].append(entity_id)
@@ -235,45 +280,64 @@ class EntityMapper:
         if entity_id not in self._entity_reg.entities:
             return set()
         
-        related = set()
-        to_check = {entity_id}
-        checked = set()
-        current_depth = 0
+        entries, _ = self._async_snapshot()
+        return await self.hass.async_add_executor_job(
+            _find_related, entries, entity_id, max_depth
+        )
+
+
+def _group_by_device(entries: RegistryEntries) -> Dict[str, List[str]]:
+    """Return the entity IDs of every device in a snapshot."""
+    device_entities = defaultdict(list)
+    for entity_id, _, device_id in entries:
+        if device_id:
+            device_entities[device_id].append(entity_id)
+    return device_entities
+
+
+def _find_related(entries: RegistryEntries, entity_id: str, max_depth: int) -> Set[str]:
+    """Traverse device and naming relationships in a snapshot; runs in the executor."""
+    devices = {other_id: device_id for other_id, _, device_id in entries}
+    device_entities = _group_by_device(entries)
+    yield_to_loop = LoopYielder()
+    related = set()
+    to_check = {entity_id}
+    checked = set()
+    current_depth = 0
+    
+    while to_check and current_depth < max_depth:
+        next_check = set()
         
-        while to_check and current_depth < max_depth:
-            next_check = set()
+        for check_id in to_check:
+            if check_id in checked:
+                continue
+            yield_to_loop()
             
-            for check_id in to_check:
-                if check_id in checked:
-                    continue
-                
-                checked.add(check_id)
-                entity = self._entity_reg.entities.get(check_id)
-                
-                if not entity:
-                    continue
-                
-                # Add entities from same device
-                if entity.device_id:
-                    for other_entity in self._entity_reg.entities.values():
-                        if (other_entity.device_id == entity.device_id and 
-                            other_entity.entity_id != check_id):
-                            related.add(other_entity.entity_id)
-                            if current_depth < max_depth - 1:
-                                next_check.add(other_entity.entity_id)
-                
-                # Add entities with similar names
-                name_parts = check_id.split('_')
-                if len(name_parts) > 1:
-                    prefix = name_parts[0]
-                    for other_id in self._entity_reg.entities:
-                        if other_id != check_id and prefix in other_id:
-                            related.add(other_id)
+            checked.add(check_id)
+            if check_id not in devices:
+                continue
             
-            to_check = next_check
-            current_depth += 1
-        
-        # Remove the original entity from results
-        related.discard(entity_id)
+            # Add entities from same device
+            device_id = devices[check_id]
+            if device_id:
+                for other_id in device_entities[device_id]:
+                    if other_id != check_id:
+                        related.add(other_id)
+                        if current_depth < max_depth - 1:
+                            next_check.add(other_id)
+            
+            # Add entities with similar names
+            name_parts = check_id.split('_')
+            if len(name_parts) > 1:
+                prefix = name_parts[0]
+                for other_id in devices:
+                    if other_id != check_id and prefix in other_id:
+                        related.add(other_id)
         
-        return related
\ No newline at end of file
+        to_check = next_check
+        current_depth += 1
+    
+    # Remove the original entity from results
+    related.discard(entity_id)
+    
+    return related
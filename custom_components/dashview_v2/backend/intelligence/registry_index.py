@@ -0,0 +1,421 @@
+"""Registry index answering area, device and domain lookups without scans."""
+
+import logging
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers import area_registry, device_registry, entity_registry
+from homeassistant.helpers.event import async_call_later
+
+from .engine import UNASSIGNED_AREA, RegistrySnapshot
+
+_LOGGER = logging.getLogger(__name__)
+
+# How long registry updates are collected before being applied as one batch
+REGISTRY_DEBOUNCE_SECONDS = 0.5
+
+
+def _discard(mapping: Dict[str, Set[str]], key: str, member: str) -> None:
+    """Remove a member from a set-valued mapping, dropping the set once empty."""
+    members = mapping.get(key)
+    if members is not None:
+        members.discard(member)
+        if not members:
+            del mapping[key]
+
+
+def _normalized(mapping: Dict[str, Any]) -> Dict[str, Any]:
+    """Return a mapping without the empty sets a defaultdict may leave behind."""
+    return {key: value for key, value in mapping.items() if value != set()}
+
+
+class RegistryIndex:
+    """
+    Maps areas, devices and domains to entities, built in one registry pass.
+
+    Registry updates are applied as deltas to the touched areas, devices
+    and entities. Bursts are collected for a short while and applied as
+    one batch; a lookup arriving first applies the batch right away.
+    The version changes whenever a batch changed anything.
+    """
+
+    def __init__(self, hass: HomeAssistant):
+        """
+        Initialize an empty index.
+
+        Args:
+            hass: Home Assistant instance
+        """
+        self.hass = hass
+        self._area_reg: Optional[area_registry.AreaRegistry] = None
+        self._device_reg: Optional[device_registry.DeviceRegistry] = None
+        self._entity_reg: Optional[entity_registry.EntityRegistry] = None
+        self._area_names: Dict[str, str] = {}  # area_id -> name
+        self._device_area: Dict[str, Optional[str]] = {}  # device_id -> area_id
+        self._area_devices: Dict[str, Set[str]] = defaultdict(set)  # area_id -> device_ids
+        self._entities: Dict[str, Tuple[Optional[str], Optional[str]]] = {}  # entity_id -> (area_id, device_id)
+        self._entity_area: Dict[str, str] = {}  # entity_id -> effective area_id or UNASSIGNED_AREA
+        self._area_entities: Dict[str, Set[str]] = defaultdict(set)  # effective area_id -> entity_ids
+        self._device_entities: Dict[str, Set[str]] = defaultdict(set)  # device_id -> entity_ids
+        self._domain_entities: Dict[str, Set[str]] = defaultdict(set)  # domain -> entity_ids
+        self._unsubscribers: List[Callable[[], None]] = []
+        self._dirty_areas: Set[str] = set()
+        self._dirty_devices: Set[str] = set()
+        self._dirty_entities: Set[str] = set()
+        self._cancel_apply: Optional[Callable[[], None]] = None
+        self._listeners: List[Callable[[Set[str]], None]] = []  # called when the version changes
+        # A new epoch per instance invalidates versions from before a restart
+        self._epoch = uuid.uuid4().hex[:8]
+        self._generation = 0
+        self.batches_applied = 0
+        self.deltas_applied = 0
+
+    @property
+    def started(self) -> bool:
+        """Return whether the index follows registry changes."""
+        return bool(self._unsubscribers)
+
+    @callback
+    def async_build(self) -> None:
+        """Build the index once from the registries."""
+        self._area_reg = area_registry.async_get(self.hass)
+        self._device_reg = device_registry.async_get(self.hass)
+        self._entity_reg = entity_registry.async_get(self.hass)
+        self._rebuild()
+
+    @callback
+    def async_start(self) -> None:
+        """Build the index and keep it current for the integration's lifetime."""
+        if self.started:
+            return
+
+        self.async_build()
+        bus = self.hass.bus
+        self._unsubscribers = [
+            bus.async_listen(event_type, self._async_registry_updated)
+            for event_type in (
+                entity_registry.EVENT_ENTITY_REGISTRY_UPDATED,
+                device_registry.EVENT_DEVICE_REGISTRY_UPDATED,
+                area_registry.EVENT_AREA_REGISTRY_UPDATED,
+            )
+        ]
+        _LOGGER.debug(f"Registry index built for {len(self._entities)} entities")
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop following registry changes."""
+        for unsubscribe in self._unsubscribers:
+            unsubscribe()
+        self._unsubscribers = []
+        if self._cancel_apply:
+            self._cancel_apply()
+            self._cancel_apply = None
+
+    @callback
+    def async_add_listener(self, listener: Callable[[Set[str]], None]) -> Callable[[], None]:
+        """
+        Call listener whenever the version changes.
+
+        Args:
+            listener: Called on the event loop right after a changing batch,
+                with the entities that were added, removed or changed area
+
+        Returns:
+            Callable removing the listener
+        """
+        self._listeners.append(listener)
+
+        @callback
+        def _remove() -> None:
+            self._listeners.remove(listener)
+
+        return _remove
+
+    @callback
+    def _async_registry_updated(self, event: Event) -> None:
+        """Queue what a registry update touched and schedule the batch."""
+        data = event.data
+        if "entity_id" in data:
+            self._dirty_entities.add(data["entity_id"])
+            if old_entity_id := data.get("old_entity_id"):
+                self._dirty_entities.add(old_entity_id)
+        elif "device_id" in data:
+            self._dirty_devices.add(data["device_id"])
+        elif "area_id" in data:
+            self._dirty_areas.add(data["area_id"])
+        else:
+            return
+
+        if self._cancel_apply is None:
+            self._cancel_apply = async_call_later(
+                self.hass, REGISTRY_DEBOUNCE_SECONDS, self._async_apply_scheduled
+            )
+
+    @callback
+    def _async_apply_scheduled(self, _now: Any) -> None:
+        """Apply the batch once the debounce window closed."""
+        self._cancel_apply = None
+        self._apply_pending()
+
+    def _ensure_current(self) -> None:
+        """Apply queued registry updates before answering a lookup."""
+        if self._dirty_areas or self._dirty_devices or self._dirty_entities:
+            if self._cancel_apply:
+                self._cancel_apply()
+                self._cancel_apply = None
+            self._apply_pending()
+
+    def _apply_pending(self) -> None:
+        """Apply queued updates; devices go first so entities see their new area."""
+        areas, self._dirty_areas = self._dirty_areas, set()
+        devices, self._dirty_devices = self._dirty_devices, set()
+        entities, self._dirty_entities = self._dirty_entities, set()
+
+        changed = False
+        moved: Set[str] = set()
+        for area_id in areas:
+            area = self._area_reg.async_get_area(area_id)
+            name = area.name if area else None
+            if self._area_names.get(area_id) != name:
+                changed = True
+                if area is None:
+                    del self._area_names[area_id]
+                else:
+                    self._area_names[area_id] = name
+        for device_id in devices:
+            changed |= self._update_device(device_id, moved)
+        for entity_id in entities:
+            changed |= self._update_entity(entity_id, moved)
+
+        self.batches_applied += 1
+        self.deltas_applied += len(areas) + len(devices) + len(entities)
+        _LOGGER.debug(
+            f"Registry index applied {len(areas)} area, {len(devices)} device "
+            f"and {len(entities)} entity updates"
+        )
+        if changed:
+            self._generation += 1
+            for listener in list(self._listeners):
+                listener(moved)
+
+    def _rebuild(self) -> None:
+        """Index the registries in one pass over devices and one over entities."""
+        self._dirty_areas.clear()
+        self._dirty_devices.clear()
+        self._dirty_entities.clear()
+        self._area_names = {area_id: area.name for area_id, area in self._area_reg.areas.items()}
+        self._device_area.clear()
+        self._area_devices.clear()
+        self._entities.clear()
+        self._entity_area.clear()
+        self._area_entities.clear()
+        self._device_entities.clear()
+        self._domain_entities.clear()
+
+        for device_id, device in self._device_reg.devices.items():
+            self._device_area[device_id] = device.area_id
+            if device.area_id:
+                self._area_devices[device.area_id].add(device_id)
+        for entity in self._entity_reg.entities.values():
+            self._add_entity(entity.entity_id, entity.area_id, entity.device_id)
+        self._generation += 1
+
+    def _add_entity(self, entity_id: str, area_id: Optional[str], device_id: Optional[str]) -> None:
+        """Link an entity into every mapping."""
+        self._entities[entity_id] = (area_id, device_id)
+        self._domain_entities[entity_id.split(".", 1)[0]].add(entity_id)
+        if device_id:
+            self._device_entities[device_id].add(entity_id)
+
+        # Entity area wins over the area of its device
+        effective_area = area_id or self._device_area.get(device_id) or UNASSIGNED_AREA
+        self._entity_area[entity_id] = effective_area
+        self._area_entities[effective_area].add(entity_id)
+
+    def _remove_entity(self, entity_id: str) -> None:
+        """Unlink an entity from every mapping."""
+        assignment = self._entities.pop(entity_id, None)
+        if assignment is None:
+            return
+        _discard(self._domain_entities, entity_id.split(".", 1)[0], entity_id)
+        if assignment[1]:
+            _discard(self._device_entities, assignment[1], entity_id)
+        _discard(self._area_entities, self._entity_area.pop(entity_id), entity_id)
+
+    def _update_entity(self, entity_id: str, moved: Set[str]) -> bool:
+        """
+        Re-read one entity from the registry.
+
+        Args:
+            entity_id: Entity to re-read
+            moved: Collects the entity if it was added, removed or changed area
+
+        Returns:
+            Whether the entity changed
+        """
+        entry = self._entity_reg.async_get(entity_id)
+        old_area = self._entity_area.get(entity_id)
+        if entry is None:
+            if entity_id not in self._entities:
+                return False
+            self._remove_entity(entity_id)
+            moved.add(entity_id)
+            return True
+        if self._entities.get(entity_id) == (entry.area_id, entry.device_id):
+            return False
+        self._remove_entity(entity_id)
+        self._add_entity(entity_id, entry.area_id, entry.device_id)
+        if self._entity_area[entity_id] != old_area:
+            moved.add(entity_id)
+        return True
+
+    def _update_device(self, device_id: str, moved: Set[str]) -> bool:
+        """
+        Re-read one device.
+
+        Args:
+            device_id: Device to re-read
+            moved: Collects the device's entities that changed area
+
+        Returns:
+            Whether the device changed
+        """
+        device = self._device_reg.async_get(device_id)
+        area_id = device.area_id if device else None
+        if device is None and device_id not in self._device_area:
+            return False
+        if device is not None and device_id in self._device_area and self._device_area[device_id] == area_id:
+            return False
+
+        old_area_id = self._device_area.pop(device_id, None)
+        if old_area_id:
+            _discard(self._area_devices, old_area_id, device_id)
+        if device is not None:
+            self._device_area[device_id] = area_id
+            if area_id:
+                self._area_devices[area_id].add(device_id)
+
+        # Entities with an area of their own stay where they are
+        for entity_id in list(self._device_entities.get(device_id, ())):
+            own_area_id = self._entities[entity_id][0]
+            if own_area_id:
+                continue
+            effective_area = area_id or UNASSIGNED_AREA
+            if self._entity_area[entity_id] == effective_area:
+                continue
+            _discard(self._area_entities, self._entity_area[entity_id], entity_id)
+            moved.add(entity_id)
+            self._entity_area[entity_id] = effective_area
+            self._area_entities[effective_area].add(entity_id)
+        return True
+
+    def async_verify(self) -> List[str]:
+        """
+        Compare the index against a rebuild from scratch.
+
+        Returns:
+            Names of the mappings that differ, empty when consistent
+        """
+        self._ensure_current()
+        fresh = RegistryIndex(self.hass)
+        fresh.async_build()
+        return [
+            name for name in (
+                "_area_names", "_device_area", "_area_devices", "_entities",
+                "_entity_area", "_area_entities", "_device_entities", "_domain_entities",
+            )
+            if _normalized(getattr(self, name)) != _normalized(getattr(fresh, name))
+        ]
+
+    @property
+    def version(self) -> str:
+        """Return a stamp that changes whenever the indexed registries changed."""
+        self._ensure_current()
+        return f"{self._epoch}-{self._generation}"
+
+    def snapshot(self) -> RegistrySnapshot:
+        """Return a read-only copy of the groupings the analysis engine needs."""
+        self._ensure_current()
+        area_device_counts = {area_id: len(devices) for area_id, devices in self._area_devices.items()}
+        area_device_counts[UNASSIGNED_AREA] = self.area_device_count(UNASSIGNED_AREA)
+        return RegistrySnapshot.create(
+            self.version,
+            self._area_names,
+            self._area_entities,
+            area_device_counts,
+            {domain: len(entity_ids) for domain, entity_ids in self._domain_entities.items() if entity_ids},
+            len(self._entities),
+            len(self._device_area),
+        )
+
+    @property
+    def entity_count(self) -> int:
+        """Return the number of registered entities."""
+        self._ensure_current()
+        return len(self._entities)
+
+    @property
+    def device_count(self) -> int:
+        """Return the number of registered devices."""
+        self._ensure_current()
+        return len(self._device_area)
+
+    @property
+    def areas(self) -> Dict[str, str]:
+        """Return the name of every registered area by area_id."""
+        self._ensure_current()
+        return self._area_names
+
+    @property
+    def domains(self) -> Set[str]:
+        """Return the domains having at least one entity."""
+        self._ensure_current()
+        return set(self._domain_entities)
+
+    def area_entities(self, area_id: str) -> List[str]:
+        """Return the entities in an area, directly or through their device."""
+        self._ensure_current()
+        return sorted(self._area_entities.get(area_id, ()))
+
+    def area_device_count(self, area_id: str) -> int:
+        """Return the number of devices in an area."""
+        self._ensure_current()
+        if area_id == UNASSIGNED_AREA:
+            # Devices some unassigned entity belongs to
+            return len({
+                self._entities[entity_id][1]
+                for entity_id in self._area_entities.get(UNASSIGNED_AREA, ())
+                if self._entities[entity_id][1]
+            })
+        return len(self._area_devices.get(area_id, ()))
+
+    def device_entities(self, device_id: str) -> List[str]:
+        """Return the entities of a device."""
+        self._ensure_current()
+        return sorted(self._device_entities.get(device_id, ()))
+
+    def device_area(self, device_id: str) -> Optional[str]:
+        """Return the area a device is assigned to."""
+        self._ensure_current()
+        return self._device_area.get(device_id)
+
+    def domain_entities(self, domain: str) -> List[str]:
+        """Return the entities of a domain."""
+        self._ensure_current()
+        return sorted(self._domain_entities.get(domain, ()))
+
+    def entity_area(self, entity_id: str) -> Optional[str]:
+        """Return the effective area of an entity, UNASSIGNED_AREA if it has none."""
+        self._ensure_current()
+        return self._entity_area.get(entity_id)
+
+    def grouped_by_area(self) -> Dict[str, List[str]]:
+        """Return every effective area, including UNASSIGNED_AREA, with its entities."""
+        self._ensure_current()
+        return {
+            area_id: sorted(entity_ids)
+            for area_id, entity_ids in self._area_entities.items()
+            if entity_ids
+        }
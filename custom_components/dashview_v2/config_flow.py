@@ -5,9 +5,10 @@ from typing import Any, Dict, Optional
 import voluptuous as vol
 
 from homeassistant import config_entries
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.data_entry_flow import FlowResult
 
+from .backend.config import DashviewConfigSchema
 from .const import DOMAIN
 
 _LOGGER = logging.getLogger(__name__)
@@ -18,6 +19,14 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
     VERSION = 1
 
+    @staticmethod
+    @callback
+    def async_get_options_flow(
+        config_entry: config_entries.ConfigEntry,
+    ) -> "OptionsFlowHandler":
+        """Return the options flow for the push and quota settings."""
+        return OptionsFlowHandler()
+
     async def async_step_user(
         self, user_input: Optional[Dict[str, Any]] = None
     ) -> FlowResult:
@@ -53,4 +62,35 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         return self.async_create_entry(
             title="Dashview V2",
             data={},
-        )
\ No newline at end of file
+        )
+
+
+class OptionsFlowHandler(config_entries.OptionsFlow):
+    """Handle the Dashview V2 options: push batching, queue bound and quotas."""
+
+    async def async_step_init(
+        self, user_input: Optional[Dict[str, Any]] = None
+    ) -> FlowResult:
+        """Manage the options."""
+        errors: Dict[str, str] = {}
+
+        if user_input is not None:
+            try:
+                options = DashviewConfigSchema(user_input)
+            except vol.Invalid as err:
+                _LOGGER.debug(f"Invalid Dashview V2 options: {err}")
+                errors["base"] = "invalid_options"
+            else:
+                return self.async_create_entry(title="", data=options)
+
+        # The stored options, or the defaults, pre-fill the form
+        entry = self.hass.config_entries.async_get_entry(self.handler)
+        current = DashviewConfigSchema(dict(entry.options) if entry else {})
+        return self.async_show_form(
+            step_id="init",
+            data_schema=vol.Schema({
+                vol.Optional(str(key), default=current[str(key)]): validator
+                for key, validator in DashviewConfigSchema.schema.items()
+            }),
+            errors=errors,
+        )
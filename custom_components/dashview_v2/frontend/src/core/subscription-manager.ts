@@ -10,6 +10,10 @@ import type { HomeAssistant } from '../types';
 
 const logger = new Logger('SubscriptionManager');
 
+// Event types pushed on the Dashview subscription
+const EVENT_STATES_CHANGED = 'dashview_v2_states_changed';
+const EVENT_RESYNC_REQUIRED = 'dashview_v2_resync_required';
+
 export interface SubscriptionConfig {
   debounceDelay?: number;  // Milliseconds to debounce visibility changes
   maxSubscriptions?: number;  // Maximum concurrent subscriptions
@@ -19,6 +23,20 @@ export interface SubscriptionResult {
   subscribed: string[];
   unsubscribed: string[];
   failed: string[];
+  seq?: number;
+  epoch?: string;
+}
+
+interface StatesChangedEvent {
+  event_type: typeof EVENT_STATES_CHANGED;
+  changes: { [entityId: string]: { old_state: any; new_state: any } };
+  seq: number;
+}
+
+interface ResyncRequiredEvent {
+  event_type: typeof EVENT_RESYNC_REQUIRED;
+  reason: string;
+  entity_ids?: string[];
 }
 
 export class SubscriptionManager {
@@ -29,6 +47,8 @@ export class SubscriptionManager {
   private debounceTimer: number | null = null;
   private config: Required<SubscriptionConfig>;
   private unsubscribeHandler: (() => void) | null = null;
+  private lastSeq: number | null = null;
+  private epoch: string | null = null;
 
   constructor(
     websocket: WebSocketConnection,
@@ -88,6 +108,7 @@ export class SubscriptionManager {
       
       // Call backend to update subscriptions
       const result = await this.callUpdateSubscriptions(targetEntities);
+      this.trackEpoch(result);
       
       // Update local tracking
       this.subscribedEntities = new Set([
@@ -183,7 +204,8 @@ export class SubscriptionManager {
 
   /**
    * Start listening for state changes.
-   * This sets up the WebSocket event listener for state updates.
+   * This opens the Dashview subscription the backend pushes batched
+   * changes of the subscribed entities on.
    */
   async startListening(): Promise<void> {
     if (this.unsubscribeHandler) {
@@ -192,18 +214,9 @@ export class SubscriptionManager {
     }
 
     try {
-      // Set up WebSocket event listener
-      this.unsubscribeHandler = await this.websocket.subscribeToStateChanges(
-        (event) => {
-          if (event.event_type === 'state_changed' && event.data) {
-            const { entity_id, new_state } = event.data;
-            
-            // Only process if we're subscribed to this entity
-            if (this.subscribedEntities.has(entity_id) && new_state) {
-              this.stateManager.updateState(entity_id, new_state);
-            }
-          }
-        }
+      this.unsubscribeHandler = await this.websocket.subscribeToUpdates(
+        (event) => this.handlePush(event),
+        Array.from(this.subscribedEntities)
       );
 
       logger.info('Started listening for state changes');
@@ -213,6 +226,59 @@ export class SubscriptionManager {
     }
   }
 
+  /**
+   * Handle an event pushed on the Dashview subscription.
+   */
+  private handlePush(event: StatesChangedEvent | ResyncRequiredEvent | { event_type: string }): void {
+    if (event.event_type === EVENT_STATES_CHANGED) {
+      const { changes, seq } = event as StatesChangedEvent;
+      for (const [entityId, change] of Object.entries(changes)) {
+        if (change.new_state) {
+          this.stateManager.updateState(entityId, change.new_state);
+        }
+      }
+      this.lastSeq = seq;
+    } else if (event.event_type === EVENT_RESYNC_REQUIRED) {
+      this.resync((event as ResyncRequiredEvent).entity_ids);
+    }
+  }
+
+  /**
+   * Ask the backend to resend entities whose changes this client missed.
+   * The states arrive as a regular push on the Dashview subscription.
+   */
+  private async resync(entityIds?: string[]): Promise<void> {
+    const hass = (this.websocket as any).hass as HomeAssistant;
+    const msg: { type: string; entities?: string[]; since?: number; epoch?: string } = {
+      type: 'dashview_v2/resync_entities',
+    };
+    if (entityIds) {
+      msg.entities = entityIds;
+    } else if (this.lastSeq !== null && this.epoch !== null) {
+      // Only what changed after the last batch this client processed
+      msg.since = this.lastSeq;
+      msg.epoch = this.epoch;
+    }
+
+    try {
+      const result = await hass.callWS<{ resynced: string[]; seq: number; epoch: string }>(msg);
+      this.trackEpoch(result);
+      logger.info(`Resynced ${result.resynced.length} entities`);
+    } catch (error) {
+      logger.error('Failed to resync entities:', error);
+    }
+  }
+
+  /**
+   * Remember the epoch sequence numbers belong to.
+   */
+  private trackEpoch(result: { epoch?: string }): void {
+    if (result.epoch && result.epoch !== this.epoch) {
+      this.epoch = result.epoch;
+      this.lastSeq = null;
+    }
+  }
+
   /**
    * Stop listening for state changes.
    */
@@ -39,6 +39,31 @@ export class WebSocketConnection {
     return unsubscribe as () => void;
   }
 
+  /**
+   * Open the stream Dashview pushes subscribed entity changes on.
+   * Unsubscribing ends every subscription of this connection on the server.
+   */
+  async subscribeToUpdates(
+    callback: (event: any) => void,
+    entityIds: string[] = []
+  ): Promise<() => void> {
+    if (!this.hass.connection) {
+      throw new Error('WebSocket connection not available');
+    }
+
+    const unsubscribe = await this.hass.connection.subscribeMessage<any>(
+      callback,
+      {
+        type: 'dashview_v2/subscribe_visible_entities',
+        entities: entityIds,
+      }
+    );
+
+    return () => {
+      unsubscribe();
+    };
+  }
+
   isConnected(): boolean {
     return !!this.hass && !!this.hass.connection;
   }
@@ -4,6 +4,7 @@ export interface HomeAssistant {
   callWS<T>(msg: MessageBase): Promise<T>;
   connection: {
     subscribeEvents(callback: (event: any) => void, eventType: string): Promise<() => void>;
+    subscribeMessage<T>(callback: (message: T) => void, msg: MessageBase): Promise<() => Promise<void>>;
     sendMessage(message: any): void;
   };
   user: {
@@ -0,0 +1,695 @@
+"""
+Tests for the Dashview V2 WebSocket command handlers.
+"""
+
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+
+from homeassistant.core import State
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.dashview_v2.backend.api import handlers
+from custom_components.dashview_v2.backend.api.quotas import (
+    QUOTA_RATE_LIMITED, QUOTA_TOO_MANY_CONNECTIONS, QUOTA_TOO_MANY_ENTITIES, SubscriptionQuotas
+)
+from custom_components.dashview_v2.backend.api.subscriptions import SubscriptionManager
+
+TRACK_PATH = (
+    "custom_components.dashview_v2.backend.api.subscriptions."
+    "async_track_state_change_event"
+)
+
+
+@pytest.fixture
+def hass():
+    """Create a mock Home Assistant instance that runs created tasks."""
+    hass = MagicMock()
+    hass.states.get = Mock(side_effect=lambda entity_id: Mock(entity_id=entity_id))
+    hass.async_create_task = Mock(side_effect=asyncio.ensure_future)
+    hass.async_add_executor_job = Mock(
+        side_effect=lambda target, *args: asyncio.get_running_loop().run_in_executor(None, target, *args)
+    )
+    return hass
+
+
+@pytest.fixture
+def manager(hass):
+    """Install a fresh subscription manager for the handlers."""
+    with patch(TRACK_PATH, side_effect=lambda *args: Mock()):
+        manager = SubscriptionManager(hass, flush_interval_ms=0)
+        with patch.object(handlers, "subscription_manager", manager):
+            yield manager
+
+
+def make_connection():
+    """Create a mock ActiveConnection."""
+    connection = MagicMock()
+    connection.subscriptions = {}
+    return connection
+
+
+def close(connection):
+    """Close a connection the way Home Assistant does."""
+    for unsub in connection.subscriptions.values():
+        unsub()
+    connection.subscriptions.clear()
+
+
+async def subscribe(hass, connection, entities, msg_id=1):
+    """Run the subscribe_visible_entities handler."""
+    await handlers.handle_subscribe_visible_entities.__wrapped__(hass, connection, {
+        "id": msg_id,
+        "type": "dashview_v2/subscribe_visible_entities",
+        "entities": entities,
+    })
+    return connection.send_result.call_args[0][1] if connection.send_result.called else None
+
+
+class TestConnectionLifecycle:
+    """Test suite for connection identity and close cleanup."""
+
+    @pytest.mark.asyncio
+    async def test_connection_id_stable_and_unique(self, hass, manager):
+        """A connection keeps its ID; a new connection never reuses one."""
+        first = make_connection()
+        first_id = handlers.async_get_connection_id(hass, first)
+        assert handlers.async_get_connection_id(hass, first) == first_id
+
+        close(first)
+        await asyncio.sleep(0)
+        second = make_connection()
+        assert handlers.async_get_connection_id(hass, second) != first_id
+
+    @pytest.mark.asyncio
+    async def test_close_releases_subscriptions(self, hass, manager):
+        """Closing the connection unregisters it and its trackers."""
+        connection = make_connection()
+        result = await subscribe(hass, connection, ["light.kitchen"])
+        assert result["subscribed"] == ["light.kitchen"]
+        assert manager.get_subscription_stats()["active_trackers"] == 1
+
+        close(connection)
+        await asyncio.sleep(0)
+
+        stats = manager.get_subscription_stats()
+        assert stats["total_connections"] == 0
+        assert stats["active_trackers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_pushes_are_events_of_the_subscribe_message(self, hass, manager):
+        """Changes arrive as events of the subscribe message until it is unsubscribed."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.kitchen"], msg_id=7)
+        await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+            "id": 8,
+            "type": "dashview_v2/update_subscriptions",
+            "entities": ["light.kitchen", "light.hall"]
+        })
+
+        manager._async_state_changed(Mock(data={
+            "entity_id": "light.hall",
+            "old_state": None,
+            "new_state": State("light.hall", "on")
+        }))
+
+        message = connection.send_message.call_args[0][0]
+        assert message["id"] == 7
+        assert message["type"] == "event"
+        assert "light.hall" in message["event"]["changes"]
+
+        # unsubscribe_events on the stream ends the connection's subscriptions
+        connection.subscriptions.pop(7)()
+        assert manager.get_subscription_stats()["total_connections"] == 0
+
+    @pytest.mark.asyncio
+    async def test_changes_before_subscribe_wait_for_it(self, hass, manager):
+        """Entities added by a one-shot update push nothing until a stream exists."""
+        connection = make_connection()
+        await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+            "id": 3,
+            "type": "dashview_v2/update_subscriptions",
+            "entities": ["light.hall"]
+        })
+        manager._async_state_changed(Mock(data={
+            "entity_id": "light.hall",
+            "old_state": None,
+            "new_state": State("light.hall", "on")
+        }))
+        connection.send_message.assert_not_called()
+
+        await subscribe(hass, connection, ["light.hall"], msg_id=4)
+
+        message = connection.send_message.call_args[0][0]
+        assert message["id"] == 4
+        assert "light.hall" in message["event"]["changes"]
+
+    @pytest.mark.asyncio
+    async def test_sweeper_reclaims_missed_close(self, hass, manager):
+        """Connections whose close hook never ran are reclaimed by the sweeper."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.kitchen"])
+
+        # Subscriptions cleared without running the hook
+        connection.subscriptions.clear()
+
+        assert await manager.async_sweep() == 1
+        assert manager.get_subscription_stats()["active_trackers"] == 0
+
+
+class TestInlineStates:
+    """Test suite for initial states inlined in subscription results."""
+
+    @pytest.fixture
+    def states(self, hass):
+        """Serve real states from the mock state machine."""
+        states = {
+            "light.hall": State("light.hall", "on", {"brightness": 200, "friendly_name": "Hall"}),
+            "sensor.power": State("sensor.power", "42", {"unit_of_measurement": "W"}),
+        }
+        hass.states.get = Mock(side_effect=states.get)
+        return states
+
+    @pytest.mark.asyncio
+    async def test_subscribe_inlines_projected_states(self, hass, manager, states):
+        """Only the requested attributes are sent with the current state."""
+        connection = make_connection()
+        await handlers.handle_subscribe_visible_entities.__wrapped__(hass, connection, {
+            "id": 1,
+            "type": "dashview_v2/subscribe_visible_entities",
+            "entities": ["light.hall", "sensor.power"],
+            "include_states": True,
+            "attributes": ["friendly_name"],
+        })
+
+        result = connection.send_result.call_args[0][1]
+        assert result["states"]["light.hall"]["s"] == "on"
+        assert result["states"]["light.hall"]["a"] == {"friendly_name": "Hall"}
+        assert result["states"]["sensor.power"]["a"] == {}
+
+    @pytest.mark.asyncio
+    async def test_subscribe_inlines_only_new_entities(self, hass, manager, states):
+        """Subscribing again does not resend states the connection already has."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.hall"])
+
+        await handlers.handle_subscribe_visible_entities.__wrapped__(hass, connection, {
+            "id": 2,
+            "type": "dashview_v2/subscribe_visible_entities",
+            "entities": ["light.hall", "sensor.power"],
+            "include_states": True,
+        })
+
+        result = connection.send_result.call_args[0][1]
+        assert result["subscribed"] == ["light.hall", "sensor.power"]
+        assert list(result["states"]) == ["sensor.power"]
+
+    @pytest.mark.asyncio
+    async def test_update_inlines_only_new_entities(self, hass, manager, states):
+        """Entities already subscribed are not sent again."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.hall"])
+        assert "states" not in connection.send_result.call_args[0][1]
+
+        await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+            "id": 2,
+            "type": "dashview_v2/update_subscriptions",
+            "entities": ["light.hall", "sensor.power"],
+            "include_states": True,
+        })
+
+        result = connection.send_result.call_args[0][1]
+        assert list(result["states"]) == ["sensor.power"]
+        assert result["states"]["sensor.power"] == states["sensor.power"].as_compressed_state
+
+    @pytest.mark.asyncio
+    async def test_inlined_state_is_delta_baseline(self, hass, manager, states):
+        """In delta mode the next push of an inlined entity is a diff."""
+        connection = make_connection()
+        await handlers.handle_subscribe_visible_entities.__wrapped__(hass, connection, {
+            "id": 1,
+            "type": "dashview_v2/subscribe_visible_entities",
+            "entities": ["sensor.power"],
+            "wire_mode": "delta",
+            "include_states": True,
+        })
+
+        new_state = State("sensor.power", "43", {"unit_of_measurement": "W"})
+        manager._async_state_changed(Mock(data={
+            "entity_id": "sensor.power",
+            "old_state": states["sensor.power"],
+            "new_state": new_state,
+        }))
+
+        event = connection.send_message.call_args[0][0]["event"]
+        assert "a" not in event
+        assert "sensor.power" in event["c"]
+
+
+class TestSubscriptionTiers:
+    """Test suite for visible and near-visible subscriptions."""
+
+    @pytest.mark.asyncio
+    async def test_scrolling_changes_tier_without_resubscribing(self, hass, manager):
+        """Entities moving into view are promoted, not subscribed again."""
+        connection = make_connection()
+
+        async def update(entities, nearby, msg_id):
+            await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+                "id": msg_id,
+                "type": "dashview_v2/update_subscriptions",
+                "entities": entities,
+                "nearby": nearby,
+            })
+            return connection.send_result.call_args[0][1]
+
+        first = await update(["light.a"], ["light.b", "light.c"], 1)
+        assert sorted(first["subscribed"]) == ["light.a", "light.b", "light.c"]
+        assert sorted(first["nearby"]) == ["light.b", "light.c"]
+
+        second = await update(["light.b"], ["light.a", "light.c"], 2)
+        assert second["subscribed"] == []
+        assert second["unsubscribed"] == []
+        assert sorted(second["nearby"]) == ["light.a", "light.c"]
+
+        outbox = next(iter(manager._outboxes.values()))
+        assert outbox.get_stats()["nearby"] == 2
+
+
+class TestQuotas:
+    """Test suite for subscription admission control."""
+
+    @pytest.fixture
+    def manager(self, hass):
+        """Install a manager with small quotas."""
+        quotas = SubscriptionQuotas(
+            max_entities_per_connection=3,
+            max_connections_per_user=1,
+            max_subscribe_rate=1.0,
+            subscribe_burst=2,
+        )
+        with patch(TRACK_PATH, side_effect=lambda *args: Mock()):
+            manager = SubscriptionManager(hass, flush_interval_ms=0, quotas=quotas)
+            with patch.object(handlers, "subscription_manager", manager):
+                yield manager
+
+    def rejection(self, connection):
+        """Return the code and hints of the last error sent."""
+        args, kwargs = connection.send_error.call_args
+        return args[1], kwargs["translation_placeholders"]
+
+    @pytest.mark.asyncio
+    async def test_entity_quota_rejects_whole_request(self, hass, manager):
+        """A request over the entity quota subscribes nothing."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a", "light.b"])
+        await subscribe(hass, connection, ["light.c", "light.d"], msg_id=2)
+
+        assert self.rejection(connection) == (
+            QUOTA_TOO_MANY_ENTITIES, {"limit": "3"}
+        )
+        assert await manager.get_active_subscriptions() == {
+            next(iter(manager._outboxes)): {"light.a", "light.b"}
+        }
+        assert manager.get_subscription_stats()["quotas"]["rejections"] == {
+            QUOTA_TOO_MANY_ENTITIES: 1
+        }
+
+    @pytest.mark.asyncio
+    async def test_rejected_update_keeps_subscriptions(self, hass, manager):
+        """An update over the entity quota leaves the old entities subscribed."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a", "light.b"])
+
+        await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+            "id": 2,
+            "type": "dashview_v2/update_subscriptions",
+            "entities": ["light.c", "light.d", "light.e", "light.f"],
+        })
+
+        assert self.rejection(connection)[0] == QUOTA_TOO_MANY_ENTITIES
+        assert await manager.get_active_subscriptions() == {
+            next(iter(manager._outboxes)): {"light.a", "light.b"}
+        }
+
+    @pytest.mark.asyncio
+    async def test_update_within_quota_swaps_entities(self, hass, manager):
+        """Released entities make room for the new ones in the same update."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a", "light.b"])
+
+        await handlers.handle_update_subscriptions.__wrapped__(hass, connection, {
+            "id": 2,
+            "type": "dashview_v2/update_subscriptions",
+            "entities": ["light.c", "light.d", "light.e"],
+        })
+
+        connection.send_error.assert_not_called()
+        assert await manager.get_active_subscriptions() == {
+            next(iter(manager._outboxes)): {"light.c", "light.d", "light.e"}
+        }
+
+    @pytest.mark.asyncio
+    async def test_subscribe_rate_limited_with_retry_hint(self, hass, manager):
+        """Calls beyond the burst are rejected with the time until the next token."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a"])
+        await subscribe(hass, connection, ["light.a"], msg_id=2)
+        connection.send_error.assert_not_called()
+
+        await subscribe(hass, connection, ["light.a"], msg_id=3)
+
+        code, hints = self.rejection(connection)
+        assert code == QUOTA_RATE_LIMITED
+        assert 0 < float(hints["retry_after"]) <= 1
+        assert hints["limit"] == "2"
+
+    @pytest.mark.asyncio
+    async def test_rate_limited_call_changes_nothing(self, hass, manager):
+        """A rejected subscribe does not refresh the connection's settings."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a"])
+        await subscribe(hass, connection, ["light.a"], msg_id=2)
+
+        await handlers.handle_subscribe_visible_entities.__wrapped__(hass, connection, {
+            "id": 3,
+            "type": "dashview_v2/subscribe_visible_entities",
+            "entities": ["light.b"],
+            "wire_mode": "delta",
+            "flush_interval_ms": 500,
+        })
+
+        assert self.rejection(connection)[0] == QUOTA_RATE_LIMITED
+        outbox = next(iter(manager._outboxes.values()))
+        assert outbox.wire_mode == "full"
+        assert outbox.flush_interval_ms == 0
+        assert 3 not in connection.subscriptions
+
+    @pytest.mark.asyncio
+    async def test_options_apply_to_live_connections(self, hass, manager):
+        """Changed options take effect without dropping connections."""
+        connection = make_connection()
+        await subscribe(hass, connection, ["light.a"])
+
+        await handlers.async_update_websocket_config(hass, {
+            "max_entities_per_connection": 1, "max_pending_updates": 5
+        })
+        await subscribe(hass, connection, ["light.b"], msg_id=2)
+
+        assert self.rejection(connection) == (
+            QUOTA_TOO_MANY_ENTITIES, {"limit": "1"}
+        )
+        assert next(iter(manager._outboxes.values())).max_pending == 5
+        assert manager.get_subscription_stats()["total_connections"] == 1
+
+    @pytest.mark.asyncio
+    async def test_connections_per_user(self, hass, manager):
+        """A user's second connection is admitted once the first has closed."""
+        first, second = make_connection(), make_connection()
+        second.user = first.user
+
+        await subscribe(hass, first, ["light.a"])
+        await subscribe(hass, second, ["light.a"])
+        assert self.rejection(second)[0] == QUOTA_TOO_MANY_CONNECTIONS
+
+        close(first)
+        await asyncio.sleep(0)
+        second.send_error.reset_mock()
+        await subscribe(hass, second, ["light.a"], msg_id=2)
+        second.send_error.assert_not_called()
+
+
+class TestSubscriptionStats:
+    """Test suite for the incrementally maintained subscription stats."""
+
+    async def get_stats(self, hass, connection, details=False):
+        """Run the get_subscription_stats handler past its admin check."""
+        await handlers.handle_get_subscription_stats.__wrapped__.__wrapped__(hass, connection, {
+            "id": 99,
+            "type": "dashview_v2/get_subscription_stats",
+            "details": details,
+        })
+        return connection.send_result.call_args[0][1]
+
+    @pytest.mark.asyncio
+    async def test_counters_follow_subscriptions(self, hass, manager):
+        """Subscription counters track subscribes, unsubscribes and closes."""
+        first, second = make_connection(), make_connection()
+        await subscribe(hass, first, ["light.a", "light.b"])
+        await subscribe(hass, second, ["light.b", "light.c"])
+
+        stats = await self.get_stats(hass, first)
+        assert stats["total_connections"] == 2
+        assert stats["total_subscriptions"] == 4
+        assert stats["unique_entities_monitored"] == 3
+        assert "details" not in stats
+
+        await handlers.handle_unsubscribe_hidden_entities.__wrapped__(hass, first, {
+            "id": 2,
+            "type": "dashview_v2/unsubscribe_hidden_entities",
+            "entities": ["light.a"],
+        })
+        close(second)
+        await asyncio.sleep(0)
+
+        stats = await self.get_stats(hass, first, details=True)
+        assert stats["total_subscriptions"] == 1
+        assert stats["details"]["connections_per_entity"] == {"light.b": 1}
+
+    @pytest.mark.asyncio
+    async def test_events_and_fanout_latency(self, hass, manager):
+        """Dispatched changes are counted once in and once per listener out."""
+        first, second = make_connection(), make_connection()
+        await subscribe(hass, first, ["light.hall"])
+        await subscribe(hass, second, ["light.hall"])
+
+        for value in ("on", "off", "on"):
+            manager._async_state_changed(Mock(data={
+                "entity_id": "light.hall",
+                "old_state": None,
+                "new_state": State("light.hall", value),
+            }))
+
+        stats = await self.get_stats(hass, first)
+        assert stats["events_in"] == 3
+        assert stats["updates_out"] == 6
+        assert stats["messages_out"] == 6
+        assert stats["fanout_latency"]["count"] == 3
+        assert sum(lane["count"] for lane in stats["delivery_latency"].values()) == 6
+
+
+class TestHomeInfo:
+    """Test suite for revalidating the cached home analysis."""
+
+    @pytest.fixture
+    def analyzer(self):
+        """Install an analyzer at a known registry version."""
+        analyzer = Mock(version="abc-2")
+
+        async def _get_home_complexity():
+            # Let concurrent requests pile up behind the computation
+            await asyncio.sleep(0)
+            return {"version": "abc-2", "areas": {}}
+
+        analyzer.get_home_complexity = AsyncMock(side_effect=_get_home_complexity)
+        with patch.object(handlers, "home_analyzer", analyzer), \
+             patch.dict(handlers._encoded_results, clear=True):
+            yield analyzer
+
+    def decode(self, result):
+        """Decode a result that may have been sent pre-encoded."""
+        return json.loads(json_bytes({"result": result}))["result"]
+
+    async def get_home_info(self, hass, connection, **fields):
+        """Run the get_home_info handler."""
+        await handlers.handle_get_home_info.__wrapped__(hass, connection, {
+            "id": 1, "type": "dashview_v2/get_home_info", **fields
+        })
+        return self.decode(connection.send_result.call_args[0][1])
+
+    @pytest.mark.asyncio
+    async def test_current_version_not_modified(self, hass, analyzer):
+        """A client holding the current version gets a tiny reply."""
+        result = await self.get_home_info(hass, make_connection(), if_version="abc-2")
+
+        assert result == {"not_modified": True, "version": "abc-2"}
+        analyzer.get_home_complexity.assert_not_awaited()
+
+    @pytest.mark.asyncio
+    async def test_stale_version_gets_full_result(self, hass, analyzer):
+        """A stale or missing version is answered with the full analysis."""
+        assert await self.get_home_info(hass, make_connection(), if_version="abc-1") == {
+            "version": "abc-2", "areas": {}
+        }
+        assert (await self.get_home_info(hass, make_connection()))["version"] == "abc-2"
+
+    @pytest.mark.asyncio
+    async def test_reconnect_storm_computes_once(self, hass, analyzer):
+        """Concurrent requests share one computation and one encoded payload."""
+        connections = [make_connection() for _ in range(30)]
+
+        await asyncio.gather(*(
+            handlers.handle_get_home_info.__wrapped__(hass, connection, {
+                "id": 1, "type": "dashview_v2/get_home_info"
+            })
+            for connection in connections
+        ))
+
+        assert analyzer.get_home_complexity.await_count == 1
+        payloads = {id(connection.send_result.call_args[0][1]) for connection in connections}
+        assert len(payloads) == 1
+        assert self.decode(connections[0].send_result.call_args[0][1])["version"] == "abc-2"
+
+
+class TestAreaStream:
+    """Test suite for streaming the area breakdown page by page."""
+
+    @pytest.fixture(autouse=True)
+    def analyzer(self):
+        """Install an analyzer with five areas and a mapper ranking lights first."""
+        def area(name, *entities):
+            return {
+                "name": name, "entity_count": len(entities), "device_count": 0, "entities": list(entities)
+            }
+
+        analyzer = Mock(version="abc-2")
+        analyzer.get_home_complexity = AsyncMock(return_value={"version": "abc-2", "areas": {
+            "attic": area("Attic", "sensor.attic"),
+            "hall": area("Hall", "light.hall"),
+            "kitchen": area("Kitchen", "light.counter", "light.ceiling", "sensor.fridge"),
+            "bedroom": area("Bedroom", "sensor.bedroom"),
+            "unassigned": area("Unassigned Devices", "light.porch", "light.garden"),
+        }})
+        mapper = Mock(calculate_entity_priority=lambda entity_id: 8 if entity_id.startswith("light.") else 5)
+        with patch.object(handlers, "home_analyzer", analyzer), \
+             patch.object(handlers, "entity_mapper", mapper), \
+             patch.object(handlers, "_area_order", None):
+            yield analyzer
+
+    async def stream(self, hass, connection, **fields):
+        """Run the subscribe_area_entities handler and return the pages sent."""
+        connection.send_message = Mock()
+        await handlers.handle_subscribe_area_entities.__wrapped__(hass, connection, {
+            "id": 7, "type": "dashview_v2/subscribe_area_entities", "page_size": 2, **fields
+        })
+        for _ in range(5):
+            await asyncio.sleep(0)
+        return [call.args[0]["event"] for call in connection.send_message.call_args_list]
+
+    @pytest.mark.asyncio
+    async def test_pages_in_priority_order(self, hass):
+        """Rooms with the most interactive entities come first, unassigned last."""
+        connection = make_connection()
+        pages = await self.stream(hass, connection)
+
+        assert connection.send_result.call_args[0][1] == {
+            "version": "abc-2", "total_areas": 5, "resumed": False
+        }
+        assert [list(page["areas"]) for page in pages] == [
+            ["kitchen", "hall"], ["attic", "bedroom"], ["unassigned"]
+        ]
+        assert pages[0]["areas"]["kitchen"]["entity_count"] == 3
+        assert [page["cursor"] for page in pages] == ["2@abc-2", "4@abc-2", None]
+        assert 7 not in connection.subscriptions
+
+    @pytest.mark.asyncio
+    async def test_result_precedes_eagerly_started_pages(self, hass):
+        """The result reaches the client before any page, even with eager tasks."""
+        def eager_create_task(coro):
+            # Run to the first await before returning, as eager tasks do
+            coro.send(None)
+
+            async def resume():
+                while True:
+                    await asyncio.sleep(0)
+                    try:
+                        coro.send(None)
+                    except StopIteration:
+                        return
+
+            return asyncio.ensure_future(resume())
+
+        hass.async_create_task = Mock(side_effect=eager_create_task)
+        sent = Mock()
+        connection = make_connection()
+        connection.send_result = sent.result
+        connection.send_message = sent.message
+
+        await handlers.handle_subscribe_area_entities.__wrapped__(hass, connection, {
+            "id": 7, "type": "dashview_v2/subscribe_area_entities", "page_size": 2
+        })
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert [name for name, _, _ in sent.mock_calls] == ["result", "message", "message", "message"]
+        assert 7 not in connection.subscriptions
+
+    @pytest.mark.asyncio
+    async def test_resume_from_cursor(self, hass):
+        """A cursor of the current version resumes; any other starts over."""
+        connection = make_connection()
+        pages = await self.stream(hass, connection, cursor="2@abc-2")
+        assert connection.send_result.call_args[0][1]["resumed"] is True
+        assert [list(page["areas"]) for page in pages] == [["attic", "bedroom"], ["unassigned"]]
+
+        connection = make_connection()
+        pages = await self.stream(hass, connection, cursor="2@abc-1")
+        assert connection.send_result.call_args[0][1]["resumed"] is False
+        assert len(pages) == 3
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_stops_stream(self, hass):
+        """Unsubscribing between pages sends nothing more."""
+        connection = make_connection()
+        connection.send_message = Mock(side_effect=lambda message: connection.subscriptions[7]())
+
+        await handlers.handle_subscribe_area_entities.__wrapped__(hass, connection, {
+            "id": 7, "type": "dashview_v2/subscribe_area_entities", "page_size": 2
+        })
+        for _ in range(5):
+            await asyncio.sleep(0)
+
+        assert connection.send_message.call_count == 1
+
+
+class TestSelectiveAreaRefresh:
+    """Test suite for fetching area hashes and only the areas that changed."""
+
+    @pytest.fixture(autouse=True)
+    def analyzer(self):
+        """Install an analyzer with two areas."""
+        analyzer = Mock(version="abc-2")
+        analyzer.get_home_complexity = AsyncMock(return_value={"version": "abc-2", "areas": {
+            "hall": {"name": "Hall", "entity_count": 1, "device_count": 0,
+                     "entities": ["light.hall"], "hash": "1111"},
+            "kitchen": {"name": "Kitchen", "entity_count": 1, "device_count": 1,
+                        "entities": ["light.counter"], "hash": "2222"},
+        }})
+        with patch.object(handlers, "home_analyzer", analyzer), \
+             patch.dict(handlers._encoded_results, clear=True):
+            yield analyzer
+
+    @pytest.mark.asyncio
+    async def test_get_area_versions(self, hass):
+        """Only the hash of each area is sent."""
+        connection = make_connection()
+        await handlers.handle_get_area_versions.__wrapped__(hass, connection, {
+            "id": 1, "type": "dashview_v2/get_area_versions"
+        })
+
+        result = json.loads(json_bytes({"result": connection.send_result.call_args[0][1]}))["result"]
+        assert result == {"version": "abc-2", "areas": {"hall": "1111", "kitchen": "2222"}}
+
+    @pytest.mark.asyncio
+    async def test_get_areas(self, hass):
+        """Only the requested areas are sent; unknown ones are reported."""
+        connection = make_connection()
+        await handlers.handle_get_areas.__wrapped__(hass, connection, {
+            "id": 1, "type": "dashview_v2/get_areas", "area_ids": ["kitchen", "garage"]
+        })
+
+        result = connection.send_result.call_args[0][1]
+        assert list(result["areas"]) == ["kitchen"]
+        assert result["areas"]["kitchen"]["hash"] == "2222"
+        assert result["missing"] == ["garage"]
@@ -0,0 +1,443 @@
+"""
+Tests for the per-connection coalescing outbox.
+"""
+
+import json
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+
+from homeassistant.core import State
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.dashview_v2.backend.api.outbox import (
+    EVENT_RESYNC_REQUIRED, EVENT_STATES_CHANGED, STALL_THRESHOLD, WIRE_MODE_DELTA,
+    ConnectionOutbox, StateDeltaCache
+)
+from custom_components.dashview_v2.backend.api.lanes import (
+    CRITICAL_TARGET_P99_MS, LANE_BULK, LANE_CRITICAL, LANE_INTERACTIVE, lane_for_priority
+)
+from custom_components.dashview_v2.backend.api.throttle import TIER_NEARBY, TIER_VISIBLE
+from custom_components.dashview_v2.backend.intelligence.entity_mapper import EntityMapper
+
+CALL_LATER_PATH = "custom_components.dashview_v2.backend.api.outbox.async_call_later"
+
+
+def make_state(entity_id, state):
+    """Build a state object."""
+    return State(entity_id, state, {"friendly_name": entity_id})
+
+
+def decode(message):
+    """Encode a message the way the websocket does and decode it again."""
+    return json.loads(json_bytes(message))
+
+
+@pytest.fixture
+def call_later():
+    """Patch the flush timer and keep the scheduled callbacks."""
+    with patch(CALL_LATER_PATH) as mock_call_later:
+        mock_call_later.return_value = Mock()
+        yield mock_call_later
+
+
+class TestConnectionOutbox:
+    """Test suite for ConnectionOutbox."""
+
+    def test_changes_wait_for_push_subscription(self, call_later):
+        """Nothing is sent until a subscribe message can carry it."""
+        send = Mock()
+        outbox = ConnectionOutbox(MagicMock(), send, 0)
+
+        outbox.async_add("light.kitchen", None, make_state("light.kitchen", "on"))
+        outbox.async_add("light.kitchen", None, make_state("light.kitchen", "off"))
+        send.assert_not_called()
+
+        outbox.async_open_stream(7)
+
+        message = decode(send.call_args[0][0])
+        assert message["id"] == 7
+        assert message["event"]["changes"]["light.kitchen"]["new_state"]["state"] == "off"
+
+    def test_burst_coalesces_into_one_message(self, call_later):
+        """A 10 Hz burst inside one window becomes one frame with the last state."""
+        send = Mock()
+        outbox = ConnectionOutbox(MagicMock(), send, 100, subscription_id=1)
+
+        first = make_state("sensor.power", "0")
+        previous = first
+        for value in range(1, 11):
+            current = make_state("sensor.power", str(value))
+            outbox.async_add("sensor.power", previous, current)
+            previous = current
+        outbox.async_add("sensor.energy", None, make_state("sensor.energy", "5"))
+
+        assert call_later.call_count == 1
+        send.assert_not_called()
+
+        # Fire the scheduled flush
+        call_later.call_args[0][2](None)
+
+        send.assert_called_once()
+        event = decode(send.call_args[0][0])["event"]
+        assert event["event_type"] == EVENT_STATES_CHANGED
+        assert event["changes"]["sensor.power"]["old_state"]["state"] == "0"
+        assert event["changes"]["sensor.power"]["new_state"]["state"] == "10"
+        assert event["changes"]["sensor.energy"]["old_state"] is None
+        assert outbox.updates_received == 11
+        assert outbox.updates_coalesced == 9
+        assert outbox.pending_count == 0
+
+    def test_zero_window_sends_immediately(self, call_later):
+        """A zero flush window disables batching."""
+        send = Mock()
+        outbox = ConnectionOutbox(MagicMock(), send, 0, subscription_id=1)
+
+        outbox.async_add("light.kitchen", None, make_state("light.kitchen", "on"))
+
+        send.assert_called_once()
+        call_later.assert_not_called()
+
+    def test_close_cancels_pending_flush(self, call_later):
+        """Closing the outbox cancels its timer and drops buffered changes."""
+        send = Mock()
+        outbox = ConnectionOutbox(MagicMock(), send, 100, subscription_id=1)
+        outbox.async_add("light.kitchen", None, make_state("light.kitchen", "on"))
+
+        outbox.async_close()
+
+        call_later.return_value.assert_called_once()
+        assert outbox.pending_count == 0
+        send.assert_not_called()
+
+    def test_state_encoded_once_across_connections(self, call_later):
+        """Every connection reuses the same pre-encoded state payload."""
+        sends = [Mock() for _ in range(3)]
+        outboxes = [ConnectionOutbox(MagicMock(), send, 0, subscription_id=1) for send in sends]
+        old_state = make_state("climate.hall", "heat")
+        new_state = make_state("climate.hall", "off")
+
+        with patch("homeassistant.core.json_bytes", wraps=json_bytes) as encode:
+            for outbox in outboxes:
+                outbox.async_add("climate.hall", old_state, new_state)
+        assert encode.call_count == 2  # old_state and new_state, once each
+
+        payloads = [send.call_args[0][0]["event"]["changes"]["climate.hall"] for send in sends]
+        assert all(p["new_state"] is payloads[0]["new_state"] for p in payloads)
+        assert all(p["old_state"] is payloads[0]["old_state"] for p in payloads)
+        assert decode(sends[0].call_args[0][0])["event"]["changes"]["climate.hall"][
+            "new_state"
+        ]["state"] == "off"
+
+
+class TestDeltaWireMode:
+    """Test suite for the delta wire mode."""
+
+    @pytest.fixture
+    def outbox(self, call_later):
+        """Create an unbatched outbox negotiated to delta mode."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 0, subscription_id=1)
+        outbox.wire_mode = WIRE_MODE_DELTA
+        return outbox
+
+    def test_first_send_is_full_then_attribute_delta(self, outbox):
+        """Only the new state string and changed attributes follow the first send."""
+        first = State("media_player.tv", "playing", {"volume": 0.2, "title": "A", "art": "x"})
+        second = State("media_player.tv", "playing", {"volume": 0.3, "title": "A"})
+
+        outbox.async_add("media_player.tv", None, first)
+        added = decode(outbox.send_message.call_args[0][0])["event"]["a"]
+        assert added["media_player.tv"]["a"]["title"] == "A"
+
+        outbox.async_add("media_player.tv", first, second)
+        event = decode(outbox.send_message.call_args[0][0])["event"]
+        diff = event["c"]["media_player.tv"]
+        assert diff["+"]["s"] == "playing"
+        assert diff["+"]["a"] == {"volume": 0.3}
+        assert diff["-"] == {"a": ["art"]}
+        assert "a" not in event
+
+    def test_delta_is_against_last_sent_state(self, outbox):
+        """Coalesced changes are diffed against what the client actually holds."""
+        base = State("climate.hall", "heat", {"temperature": 20, "mode": "eco"})
+        middle = State("climate.hall", "heat", {"temperature": 21, "mode": "eco"})
+        latest = State("climate.hall", "heat", {"temperature": 21, "mode": "comfort"})
+        outbox.async_add("climate.hall", None, base)
+
+        outbox.flush_interval_ms = 100
+        outbox.async_add("climate.hall", base, middle)
+        outbox.async_add("climate.hall", middle, latest)
+        outbox.async_flush()
+
+        diff = decode(outbox.send_message.call_args[0][0])["event"]["c"]["climate.hall"]
+        assert diff["+"]["a"] == {"temperature": 21, "mode": "comfort"}
+
+    def test_delta_shared_between_connections(self, call_later):
+        """Connections with the same baseline reuse one encoded delta."""
+        cache = StateDeltaCache()
+        outboxes = [
+            ConnectionOutbox(MagicMock(), Mock(), 0, cache, subscription_id=1) for _ in range(3)
+        ]
+        old_state = State("light.kitchen", "on", {"brightness": 100})
+        new_state = State("light.kitchen", "on", {"brightness": 180})
+        for outbox in outboxes:
+            outbox.wire_mode = WIRE_MODE_DELTA
+            outbox.async_add("light.kitchen", None, old_state)
+
+        for outbox in outboxes:
+            outbox.async_add("light.kitchen", old_state, new_state)
+
+        diffs = [o.send_message.call_args[0][0]["event"]["c"]["light.kitchen"] for o in outboxes]
+        assert all(diff is diffs[0] for diff in diffs)
+
+    def test_resync_resends_full_state(self, outbox):
+        """A resync sends the full state and resets the baseline."""
+        state = State("light.kitchen", "on", {"brightness": 100})
+        outbox.async_add("light.kitchen", None, state)
+
+        outbox.async_resync([state])
+
+        event = decode(outbox.send_message.call_args[0][0])["event"]
+        assert event["a"]["light.kitchen"]["s"] == "on"
+
+    def test_removed_entity(self, outbox):
+        """A removed entity is reported and forgotten."""
+        state = State("light.kitchen", "on")
+        outbox.async_add("light.kitchen", None, state)
+
+        outbox.async_add("light.kitchen", state, None)
+
+        assert decode(outbox.send_message.call_args[0][0])["event"]["r"] == ["light.kitchen"]
+
+
+class TestBackpressure:
+    """Test suite for bounded queues and slow-client eviction."""
+
+    def test_queue_bounded_and_oldest_dropped(self, call_later):
+        """A full queue drops the oldest buffered entity."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, max_pending=3, subscription_id=1)
+        for i in range(5):
+            outbox.async_add(f"sensor.s{i}", None, make_state(f"sensor.s{i}", "1"))
+
+        assert outbox.pending_count == 3
+        assert outbox.updates_dropped == 2
+
+        outbox.async_flush()
+        changes = outbox.send_message.call_args_list[0][0][0]["event"]["changes"]
+        assert list(changes) == ["sensor.s2", "sensor.s3", "sensor.s4"]
+
+    def test_dropped_entity_reaches_client(self, call_later):
+        """An entity dropped to make room is announced and delivered by the resync."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, max_pending=2, subscription_id=1)
+        for i in range(3):
+            outbox.async_add(f"sensor.s{i}", None, make_state(f"sensor.s{i}", "1"))
+
+        outbox.async_flush()
+        batch, notice = [call[0][0]["event"] for call in outbox.send_message.call_args_list]
+        assert set(batch["changes"]) == {"sensor.s1", "sensor.s2"}
+        assert notice["event_type"] == EVENT_RESYNC_REQUIRED
+        assert notice["entity_ids"] == ["sensor.s0"]
+
+        # Clean flushes do not forget it either
+        outbox.async_add("sensor.s1", None, make_state("sensor.s1", "2"))
+        outbox.async_flush()
+        assert outbox.get_stats()["dropped_awaiting_resync"] == 1
+
+        outbox.async_resync([make_state("sensor.s0", "1")])
+        event = decode(outbox.send_message.call_args[0][0])["event"]
+        assert event["changes"]["sensor.s0"]["new_state"]["state"] == "1"
+        assert outbox.get_stats()["dropped_awaiting_resync"] == 0
+
+    def test_newer_change_supersedes_drop(self, call_later):
+        """A dropped entity whose next change gets through needs no resync."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, max_pending=1, subscription_id=1)
+        outbox.async_add("sensor.a", None, make_state("sensor.a", "1"))
+        outbox.async_add("sensor.b", None, make_state("sensor.b", "1"))
+        outbox.async_add("sensor.b", None, make_state("sensor.b", "2"))
+        outbox.async_flush()
+        outbox.send_message.reset_mock()
+
+        outbox.async_add("sensor.a", None, make_state("sensor.a", "2"))
+        outbox.async_flush()
+
+        outbox.send_message.assert_called_once()
+        assert outbox.get_stats()["dropped_awaiting_resync"] == 0
+
+    def test_stalled_client_evicted_until_resync(self, call_later):
+        """Repeatedly overflowing clients stop being buffered and are told to resync."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, max_pending=2, subscription_id=1)
+        for _ in range(STALL_THRESHOLD):
+            for i in range(4):
+                outbox.async_add(f"sensor.s{i}", None, make_state(f"sensor.s{i}", "1"))
+            outbox.async_flush()
+
+        assert outbox.needs_resync
+        assert outbox.evictions == 1
+        event = outbox.send_message.call_args[0][0]["event"]
+        assert event["event_type"] == EVENT_RESYNC_REQUIRED
+
+        outbox.async_add("sensor.s0", None, make_state("sensor.s0", "2"))
+        assert outbox.pending_count == 0
+
+        outbox.async_resync([make_state("sensor.s0", "2")])
+        assert not outbox.needs_resync
+        assert outbox.get_stats()["queue_depth"] == 0
+
+    def test_failing_sends_evict(self, call_later):
+        """A connection whose sends keep failing is marked as needing resync."""
+        send = Mock(side_effect=ConnectionError("gone"))
+        outbox = ConnectionOutbox(MagicMock(), send, 0, subscription_id=1)
+        for i in range(STALL_THRESHOLD):
+            outbox.async_add("light.kitchen", None, make_state("light.kitchen", str(i)))
+
+        assert outbox.needs_resync
+        assert outbox.get_stats()["evictions"] == 1
+
+
+class TestUpdatePolicies:
+    """Test suite for per-category rate limiting and deadband filtering."""
+
+    @pytest.fixture
+    def clock(self):
+        """Patch the monotonic clock the outbox filters with."""
+        with patch("custom_components.dashview_v2.backend.api.outbox.time") as mock_time:
+            mock_time.monotonic.return_value = 100.0
+            yield mock_time
+
+    @pytest.fixture
+    def outbox(self, call_later, clock):
+        """Create an outbox that sends every admitted change immediately."""
+        return ConnectionOutbox(MagicMock(), Mock(), 0, subscription_id=1)
+
+    def sent_values(self, outbox):
+        """Return the new state values sent so far."""
+        return [
+            change["new_state"]["state"]
+            for call in outbox.send_message.call_args_list
+            for change in decode(call[0][0])["event"]["changes"].values()
+        ]
+
+    def test_energy_deadband_drops_small_moves(self, outbox):
+        """Moves within the percent deadband of the last sent value are dropped."""
+        outbox.update_filter.set_overrides({"energy": {"min_interval_ms": 0}})
+
+        for value in ("100", "100.5", "100.9", "101.2", "101.5"):
+            outbox.async_add("sensor.power", None, make_state("sensor.power", value), category="energy")
+
+        assert self.sent_values(outbox) == ["100", "101.2"]
+        assert outbox.get_stats()["updates_passed"] == 2
+        assert outbox.get_stats()["updates_dropped_deadband"] == 3
+
+    def test_interval_holds_and_releases_latest(self, outbox, call_later, clock):
+        """Changes inside the minimum interval are held and the latest sent afterwards."""
+        for offset, value in ((0.0, "1"), (0.2, "2"), (0.4, "3")):
+            clock.monotonic.return_value = 100.0 + offset
+            outbox.async_add("sensor.lux", None, make_state("sensor.lux", value), category="sensor")
+
+        assert self.sent_values(outbox) == ["1"]
+        assert call_later.call_count == 1
+        assert call_later.call_args[0][1] == pytest.approx(0.8)
+
+        clock.monotonic.return_value = 101.0
+        call_later.call_args[0][2](None)
+
+        assert self.sent_values(outbox) == ["1", "3"]
+        assert outbox.get_stats()["updates_dropped_interval"] == 1
+        assert outbox.get_stats()["held"] == 0
+
+    def test_non_numeric_and_unfiltered_changes_pass(self, outbox):
+        """Unavailable states and categories without a policy are never dropped."""
+        outbox.update_filter.set_overrides({"energy": {"min_interval_ms": 0}})
+
+        for value in ("100", "100.1", "unavailable", "100.2"):
+            outbox.async_add("sensor.power", None, make_state("sensor.power", value), category="energy")
+        for value in ("on", "off", "on"):
+            outbox.async_add("light.hall", None, make_state("light.hall", value), category="lighting")
+
+        assert self.sent_values(outbox) == ["100", "unavailable", "100.2", "on", "off", "on"]
+
+    def test_nearby_tier_is_rate_limited_until_promoted(self, outbox, call_later, clock):
+        """Near-visible entities are slowed down; promotion sends the held change at once."""
+        outbox.async_set_tier(["light.hall"], TIER_NEARBY)
+
+        for offset, value in ((0.0, "on"), (0.1, "off"), (0.2, "on")):
+            clock.monotonic.return_value = 100.0 + offset
+            outbox.async_add("light.hall", None, make_state("light.hall", value), category="lighting")
+
+        assert self.sent_values(outbox) == ["on"]
+        assert call_later.call_args[0][1] == pytest.approx(0.9)
+
+        outbox.async_set_tier(["light.hall"], TIER_VISIBLE)
+        assert self.sent_values(outbox) == ["on", "on"]
+
+        clock.monotonic.return_value = 100.3
+        outbox.async_add("light.hall", None, make_state("light.hall", "off"), category="lighting")
+        assert self.sent_values(outbox) == ["on", "on", "off"]
+
+
+class TestPriorityLanes:
+    """Test suite for priority-lane scheduling."""
+
+    def lane_of(self, entity_id):
+        """Return the lane EntityMapper's priority puts an entity in."""
+        return lane_for_priority(EntityMapper(MagicMock()).calculate_entity_priority(entity_id))
+
+    def test_critical_stays_fast_under_sensor_flood(self, call_later):
+        """Lock changes go out at once while a sensor flood waits for its batch."""
+        send = Mock()
+        outbox = ConnectionOutbox(MagicMock(), send, 100, subscription_id=1)
+        sensor_lane = self.lane_of("sensor.power_0")
+        lock_lane = self.lane_of("lock.front_door")
+        assert (sensor_lane, lock_lane) == (LANE_BULK, LANE_CRITICAL)
+
+        for i in range(20000):
+            entity_id = f"sensor.power_{i % 800}"
+            outbox.async_add(entity_id, None, make_state(entity_id, str(i)), lane=sensor_lane)
+            if i % 500 == 499:
+                outbox.async_add(
+                    "lock.front_door", None, make_state("lock.front_door", str(i)), lane=lock_lane
+                )
+
+        # Only the lock changes triggered sends; the bulk timer never fired
+        assert send.call_count == 40
+        for call in send.call_args_list:
+            assert "lock.front_door" in call[0][0]["event"]["changes"]
+        lanes = outbox.get_stats()["lanes"]
+        assert lanes["critical"]["count"] == 40
+        assert lanes["critical"]["p99_ms"] < CRITICAL_TARGET_P99_MS
+        assert outbox.evictions == 0
+
+    def test_interactive_pulls_flush_forward(self, call_later):
+        """A light change shortens the window a sensor batch already scheduled."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, subscription_id=1)
+
+        outbox.async_add("sensor.lux", None, make_state("sensor.lux", "1"), lane=LANE_BULK)
+        bulk_timer = call_later.return_value
+        call_later.return_value = Mock()
+        outbox.async_add("light.hall", None, make_state("light.hall", "on"), lane=LANE_INTERACTIVE)
+        outbox.async_add("sensor.lux", None, make_state("sensor.lux", "2"), lane=LANE_BULK)
+
+        assert [call[0][1] for call in call_later.call_args_list] == [0.1, 0.025]
+        bulk_timer.assert_called_once()
+
+    def test_overflow_drops_least_urgent_lane(self, call_later):
+        """A full queue sheds bulk changes before interactive ones."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, max_pending=2, subscription_id=1)
+
+        outbox.async_add("light.hall", None, make_state("light.hall", "on"), lane=LANE_INTERACTIVE)
+        outbox.async_add("sensor.a", None, make_state("sensor.a", "1"), lane=LANE_BULK)
+        outbox.async_add("sensor.b", None, make_state("sensor.b", "1"), lane=LANE_BULK)
+        outbox.async_flush()
+
+        changes = outbox.send_message.call_args_list[0][0][0]["event"]["changes"]
+        assert set(changes) == {"light.hall", "sensor.b"}
+
+    def test_urgent_batch_seq_stays_behind_buffered_changes(self, call_later):
+        """A lock sent ahead of buffered sensors does not claim their sequence numbers."""
+        outbox = ConnectionOutbox(MagicMock(), Mock(), 100, subscription_id=1)
+
+        outbox.async_add("sensor.a", None, make_state("sensor.a", "1"), seq=5, lane=LANE_BULK)
+        outbox.async_add("lock.door", None, make_state("lock.door", "locked"), seq=6, lane=LANE_CRITICAL)
+        assert outbox.send_message.call_args[0][0]["event"]["seq"] == 4
+
+        outbox.async_flush()
+        assert outbox.send_message.call_args[0][0]["event"]["seq"] == 6
@@ -0,0 +1,216 @@
+"""
+Tests for selector subscriptions in SubscriptionManager.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+
+from custom_components.dashview_v2.backend.api.selectors import selector_key
+from custom_components.dashview_v2.backend.api.subscriptions import (
+    EVENT_SELECTOR_CHANGED,
+    SubscriptionManager,
+)
+from custom_components.dashview_v2.backend.intelligence.registry_index import RegistryIndex
+
+SELECTORS_PATH = "custom_components.dashview_v2.backend.api.selectors"
+INDEX_PATH = "custom_components.dashview_v2.backend.intelligence.registry_index"
+TRACK_PATH = (
+    "custom_components.dashview_v2.backend.api.subscriptions."
+    "async_track_state_change_event"
+)
+
+ENTITIES = {
+    "light.kitchen": "d1",
+    "light.hall": "d2",
+    "lock.front_door": "d2",
+}
+
+
+@pytest.fixture
+def devices():
+    """Device areas, mutable to simulate registry changes."""
+    return {"d1": "kitchen", "d2": "hall"}
+
+
+@pytest.fixture
+def hass():
+    """Create a mock Home Assistant instance with a few entities."""
+    hass = MagicMock()
+    hass.states.async_entity_ids = Mock(return_value=list(ENTITIES))
+    hass.states.get = Mock(
+        side_effect=lambda entity_id: Mock(entity_id=entity_id) if entity_id in ENTITIES else None
+    )
+    return hass
+
+
+@pytest.fixture
+def registries(devices):
+    """Serve the entities and device areas through the registry helpers."""
+    area_reg = SimpleNamespace(areas={}, async_get_area=lambda area_id: None)
+    device_reg = SimpleNamespace(
+        devices=SimpleNamespace(items=lambda: [
+            (device_id, SimpleNamespace(area_id=area_id)) for device_id, area_id in devices.items()
+        ]),
+        async_get=lambda device_id: SimpleNamespace(area_id=devices[device_id]),
+    )
+    entity_reg = SimpleNamespace(entities={
+        entity_id: SimpleNamespace(entity_id=entity_id, area_id=None, device_id=device_id)
+        for entity_id, device_id in ENTITIES.items()
+    })
+    entity_reg.async_get = entity_reg.entities.get
+
+    with patch(f"{INDEX_PATH}.area_registry.async_get", return_value=area_reg), \
+         patch(f"{INDEX_PATH}.device_registry.async_get", return_value=device_reg), \
+         patch(f"{INDEX_PATH}.entity_registry.async_get", return_value=entity_reg), \
+         patch(f"{INDEX_PATH}.async_call_later") as call_later, \
+         patch(f"{SELECTORS_PATH}.async_track_state_added_domain"), \
+         patch(f"{SELECTORS_PATH}.async_track_state_removed_domain"):
+        yield call_later
+
+
+@pytest.fixture
+def registry_index(hass, registries):
+    """Create the shared registry index."""
+    index = RegistryIndex(hass)
+    index.async_start()
+    return index
+
+
+@pytest.fixture
+def track():
+    """Patch the HA state tracker and record registrations."""
+    with patch(TRACK_PATH) as mock_track:
+        mock_track.tracked = {}
+
+        def _track(hass, entity_ids, action):
+            unsubscribe = Mock()
+            mock_track.tracked[entity_ids[0]] = unsubscribe
+            return unsubscribe
+
+        mock_track.side_effect = _track
+        yield mock_track
+
+
+@pytest.fixture
+def manager(hass, registry_index, track):
+    """Create subscription manager instance sharing the registry index."""
+    return SubscriptionManager(hass, registry_index=registry_index)
+
+
+def move_device(registry_index, registries, devices, device_id, area_id):
+    """Move a device to another area and let the debounced registry batch run."""
+    devices[device_id] = area_id
+    registry_index._async_registry_updated(Mock(data={"action": "update", "device_id": device_id}))
+    registries.call_args[0][2](None)
+
+
+class TestSelectorSubscriptions:
+    """Test suite for area, domain and category selectors."""
+
+    @pytest.mark.asyncio
+    async def test_subscribe_resolves_members(self, manager, track):
+        """Selectors resolve to the matching entities and track them."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+
+        area = await manager.subscribe_to_selector("a", {"area_id": "hall"})
+        lights = await manager.subscribe_to_selector("a", {"domain": "light", "area_id": "hall"})
+
+        assert area == {"selector": "area_id=hall", "entities": ["light.hall", "lock.front_door"]}
+        assert lights == {"selector": "area_id=hall&domain=light", "entities": ["light.hall"]}
+        assert set(track.tracked) == {"light.hall", "lock.front_door"}
+
+    @pytest.mark.asyncio
+    async def test_membership_follows_device_area(
+        self, manager, registry_index, registries, devices, track
+    ):
+        """Moving a device to another area moves its entities between selectors."""
+        handler = Mock()
+        await manager.register_connection("a", handler, subscription_id=1)
+        await manager.subscribe_to_selector("a", {"area_id": "kitchen"})
+
+        move_device(registry_index, registries, devices, "d2", "kitchen")
+
+        members = manager._selector_members["a"]["area_id=kitchen"]
+        assert members == {"light.kitchen", "light.hall", "lock.front_door"}
+        assert set(track.tracked) == {"light.kitchen", "light.hall", "lock.front_door"}
+        events = [call.args[0]["event"] for call in handler.call_args_list]
+        assert {"event_type": EVENT_SELECTOR_CHANGED, "selector": "area_id=kitchen",
+                "added": ["light.hall"], "removed": []} in events
+
+        move_device(registry_index, registries, devices, "d2", "hall")
+
+        assert manager._selector_members["a"]["area_id=kitchen"] == {"light.kitchen"}
+        track.tracked["light.hall"].assert_called_once()
+        track.tracked["light.kitchen"].assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_registry_burst_applied_once(
+        self, manager, registry_index, registries, devices, hass
+    ):
+        """Selectors follow the shared index's debounced batches, not raw registry events."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_selector("a", {"area_id": "kitchen"})
+        # Only the shared index listens to the three registries
+        assert hass.bus.async_listen.call_count == 3
+
+        devices["d1"] = devices["d2"] = "hall"
+        for device_id in ("d1", "d2"):
+            registry_index._async_registry_updated(Mock(data={"action": "update", "device_id": device_id}))
+
+        assert manager._selector_members["a"]["area_id=kitchen"] == {"light.kitchen"}
+        registries.assert_called_once()
+
+        registries.call_args[0][2](None)
+
+        assert manager._selector_members["a"]["area_id=kitchen"] == set()
+        assert manager._selector_index.resolve({"area_id": "hall"}) == set(ENTITIES)
+
+    @pytest.mark.asyncio
+    async def test_device_move_reindexes_only_its_entities(
+        self, manager, registry_index, registries, devices
+    ):
+        """A registry batch re-resolves the entities it moved and no others."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_selector("a", {"area_id": "kitchen"})
+        selector_index = manager._selector_index
+
+        with patch.object(selector_index, "_index_entity", wraps=selector_index._index_entity) as index_entity:
+            move_device(registry_index, registries, devices, "d1", "hall")
+
+        assert [args[0] for args, _ in index_entity.call_args_list] == ["light.kitchen"]
+        assert manager._selector_members["a"]["area_id=kitchen"] == set()
+
+    @pytest.mark.asyncio
+    async def test_explicit_subscription_outlives_selector(self, manager, track):
+        """Dropping a selector keeps entities the client subscribed to directly."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.hall"])
+        await manager.subscribe_to_selector("a", {"area_id": "hall"})
+
+        assert await manager.unsubscribe_from_selector("a", {"area_id": "hall"})
+        assert not await manager.unsubscribe_from_selector("a", {"area_id": "hall"})
+
+        track.tracked["light.hall"].assert_not_called()
+        track.tracked["lock.front_door"].assert_called_once()
+        assert await manager.get_entity_listeners("light.hall") == {"a"}
+
+    @pytest.mark.asyncio
+    async def test_unregister_releases_selector_entities(self, manager, track):
+        """Closing a connection drops its selectors and their trackers."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_selector("a", {"category": "security"})
+        assert set(track.tracked) == {"lock.front_door"}
+
+        await manager.unregister_connection("a")
+
+        assert manager.get_subscription_stats()["selector_subscriptions"] == 0
+        for unsubscribe in track.tracked.values():
+            unsubscribe.assert_called_once()
+
+    def test_selector_key_is_canonical(self):
+        """Key order does not depend on the order the client sent."""
+        assert selector_key({"domain": "light", "area_id": "hall"}) == selector_key(
+            {"area_id": "hall", "domain": "light"}
+        )
@@ -0,0 +1,448 @@
+"""
+Tests for the shared state-change dispatcher in SubscriptionManager.
+"""
+
+import asyncio
+import time
+
+import pytest
+from unittest.mock import MagicMock, Mock, patch
+
+from homeassistant.core import State
+from homeassistant.helpers.json import json_bytes
+
+from custom_components.dashview_v2.backend.api.subscriptions import SubscriptionManager
+
+TRACK_PATH = (
+    "custom_components.dashview_v2.backend.api.subscriptions."
+    "async_track_state_change_event"
+)
+
+
+@pytest.fixture
+def hass():
+    """Create a mock Home Assistant instance where every entity exists."""
+    hass = MagicMock()
+    hass.states.get = Mock(side_effect=lambda entity_id: Mock(entity_id=entity_id))
+    return hass
+
+
+@pytest.fixture
+def track():
+    """Patch the HA state tracker and record registrations."""
+    with patch(TRACK_PATH) as mock_track:
+        mock_track.created = []
+
+        def _track(hass, entity_ids, action):
+            unsubscribe = Mock()
+            mock_track.created.append(unsubscribe)
+            return unsubscribe
+
+        mock_track.side_effect = _track
+        yield mock_track
+
+
+def make_event(entity_id, state="on"):
+    """Build a minimal state_changed event."""
+    new_state = Mock(entity_id=entity_id, state=state)
+    new_state.as_dict = Mock(return_value={"entity_id": entity_id, "state": state})
+    return Mock(data={"entity_id": entity_id, "old_state": None, "new_state": new_state})
+
+
+class TestSharedDispatcher:
+    """Test suite for the per-entity shared tracker."""
+
+    @pytest.fixture
+    def manager(self, hass, track):
+        """Create subscription manager instance."""
+        return SubscriptionManager(hass)
+
+    @pytest.mark.asyncio
+    async def test_one_tracker_per_entity(self, manager, track):
+        """Repeated subscribe calls never register a second tracker."""
+        for conn_id in ("a", "b", "c"):
+            await manager.register_connection(conn_id, Mock(), subscription_id=1)
+            await manager.subscribe_to_entities(conn_id, ["light.kitchen", "light.hall"])
+            await manager.subscribe_to_entities(conn_id, ["light.kitchen"])
+
+        assert track.call_count == 2
+        assert manager.get_subscription_stats()["active_trackers"] == 2
+
+    @pytest.mark.asyncio
+    async def test_dispatch_fans_out_to_listeners(self, manager, hass):
+        """One state change reaches every subscribed connection."""
+        handler_a, handler_b, handler_c = Mock(), Mock(), Mock()
+        await manager.register_connection("a", handler_a, subscription_id=1)
+        await manager.register_connection("b", handler_b, subscription_id=1)
+        await manager.register_connection("c", handler_c, subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.kitchen"])
+        await manager.subscribe_to_entities("b", ["light.kitchen"])
+        await manager.subscribe_to_entities("c", ["light.hall"])
+
+        manager._async_state_changed(make_event("light.kitchen"))
+        for outbox in manager._outboxes.values():
+            outbox.async_flush()
+
+        assert handler_a.call_count == 1
+        assert handler_b.call_count == 1
+        assert handler_c.call_count == 0
+
+    @pytest.mark.asyncio
+    async def test_last_connection_releases_tracker(self, manager, track):
+        """The HA tracker is removed when the last listening connection leaves."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.register_connection("b", Mock(), subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.kitchen"])
+        await manager.subscribe_to_entities("b", ["light.kitchen"])
+        unsubscribe = manager._entity_trackers["light.kitchen"]
+
+        await manager.unregister_connection("a")
+        unsubscribe.assert_not_called()
+
+        await manager.unregister_connection("b")
+        unsubscribe.assert_called_once()
+        assert manager.get_subscription_stats()["active_trackers"] == 0
+
+    @pytest.mark.asyncio
+    async def test_unsubscribe_releases_tracker(self, manager):
+        """Unsubscribing the last listener stops event processing for the entity."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.kitchen", "light.hall"])
+        unsubscribe = manager._entity_trackers["light.kitchen"]
+
+        await manager.unsubscribe_from_entities("a", ["light.kitchen"])
+
+        unsubscribe.assert_called_once()
+        assert "light.kitchen" not in manager._entity_trackers
+        assert "light.hall" in manager._entity_trackers
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_tracker_count_bounded_under_scroll_soak(self, manager, track):
+        """Trackers stay bounded by the visible window after many scroll cycles."""
+        window = 20
+        entity_ids = [f"sensor.scroll_{i}" for i in range(500)]
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.register_connection("b", Mock(), subscription_id=1)
+
+        for cycle in range(10_000):
+            start = cycle % (len(entity_ids) - window)
+            await manager.update_subscriptions("a", entity_ids[start:start + window])
+            await manager.update_subscriptions("b", entity_ids[-start - window:len(entity_ids) - start])
+            assert len(manager._entity_trackers) <= 2 * window
+
+        live = {id(unsub) for unsub in manager._entity_trackers.values()}
+        for unsub in track.created:
+            if id(unsub) in live:
+                unsub.assert_not_called()
+            else:
+                unsub.assert_called_once()
+
+
+class TestSequencedResync:
+    """Test suite for sequence numbers and delta resyncs."""
+
+    @pytest.fixture
+    def states(self):
+        """Current states by entity_id."""
+        return {
+            entity_id: State(entity_id, "off")
+            for entity_id in ("light.a", "light.b", "light.c")
+        }
+
+    @pytest.fixture
+    def manager(self, track, states):
+        """Create an unbatched manager backed by the states fixture."""
+        hass = MagicMock()
+        hass.states.get = Mock(side_effect=states.get)
+        return SubscriptionManager(hass, flush_interval_ms=0)
+
+    def change(self, manager, states, entity_id, value):
+        """Apply a state change and dispatch it."""
+        old_state = states[entity_id]
+        states[entity_id] = State(entity_id, value)
+        manager._async_state_changed(Mock(data={
+            "entity_id": entity_id, "old_state": old_state, "new_state": states[entity_id]
+        }))
+
+    @pytest.mark.asyncio
+    async def test_events_carry_increasing_seq(self, manager, states):
+        """Every pushed batch carries a higher sequence number."""
+        send = Mock()
+        await manager.register_connection("a", send, subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.a", "light.b"])
+
+        self.change(manager, states, "light.a", "on")
+        self.change(manager, states, "light.b", "on")
+
+        seqs = [call[0][0]["event"]["seq"] for call in send.call_args_list]
+        assert seqs == sorted(seqs)
+        assert len(set(seqs)) == 2
+
+    @pytest.mark.asyncio
+    async def test_reconnect_gets_only_changed_entities(self, manager, states):
+        """A reconnecting client with its last seq only receives newer changes."""
+        entities = ["light.a", "light.b", "light.c"]
+        first = Mock()
+        await manager.register_connection("old", first, subscription_id=1)
+        await manager.subscribe_to_entities("old", entities)
+        self.change(manager, states, "light.a", "on")
+        last_seq = first.call_args[0][0]["event"]["seq"]
+
+        # Connection drops; light.b changes while untracked, light.c after reconnect
+        await manager.unregister_connection("old")
+        states["light.b"] = State("light.b", "on")
+        second = Mock()
+        await manager.register_connection("new", second, subscription_id=1)
+        await manager.subscribe_to_entities("new", entities)
+        self.change(manager, states, "light.c", "on")
+        second.reset_mock()
+
+        result = await manager.resync_entities("new", since=last_seq, epoch=manager.epoch)
+
+        assert not result["full"]
+        assert sorted(result["resynced"]) == ["light.b", "light.c"]
+        assert result["seq"] == manager.seq
+
+    @pytest.mark.asyncio
+    async def test_resync_after_overflow_returns_dropped_entity(self, track, states):
+        """The seq of a batch stays below a dropped change, so resyncing from it recovers that change."""
+        hass = MagicMock()
+        hass.states.get = Mock(side_effect=states.get)
+        manager = SubscriptionManager(hass, flush_interval_ms=100, max_pending_updates=2)
+        send = Mock()
+        with patch("custom_components.dashview_v2.backend.api.outbox.async_call_later"):
+            await manager.register_connection("a", send, subscription_id=1)
+            await manager.subscribe_to_entities("a", ["light.a", "light.b", "light.c"])
+            for entity_id in ("light.a", "light.b", "light.c"):
+                self.change(manager, states, entity_id, "on")
+            manager._outboxes["a"].async_flush()
+
+            batch = send.call_args_list[0][0][0]["event"]
+            assert "light.a" not in batch["changes"]
+            assert batch["seq"] < manager.seq
+
+            result = await manager.resync_entities("a", since=batch["seq"], epoch=manager.epoch)
+
+        assert not result["full"]
+        assert "light.a" in result["resynced"]
+        resent = send.call_args[0][0]["event"]
+        assert resent["changes"]["light.a"]["new_state"] is not None
+        assert resent["seq"] == manager.seq
+
+    @pytest.mark.asyncio
+    async def test_unknown_epoch_forces_full_resync(self, manager, states):
+        """Sequence numbers from another epoch cannot be trusted."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.a", "light.b"])
+
+        result = await manager.resync_entities("a", since=10**6, epoch="previous-run")
+
+        assert result["full"]
+        assert sorted(result["resynced"]) == ["light.a", "light.b"]
+
+
+class TestUpdatePolicyCategories:
+    """Test suite for which entities the update policies apply to."""
+
+    @pytest.mark.asyncio
+    async def test_edges_and_toggles_are_never_delayed(self, track):
+        """Door edges and fan or switch toggles go out at once; sensors are rate-limited."""
+        states = {
+            entity_id: State(entity_id, "off")
+            for entity_id in (
+                "binary_sensor.hallway", "binary_sensor.front_door", "sensor.lux",
+                "fan.bedroom", "switch.bathroom_fan", "climate.hall"
+            )
+        }
+        hass = MagicMock()
+        hass.states.get = Mock(side_effect=states.get)
+        manager = SubscriptionManager(hass, flush_interval_ms=0)
+        send = Mock()
+        await manager.register_connection("a", send, subscription_id=1)
+        await manager.subscribe_to_entities("a", list(states))
+
+        with patch("custom_components.dashview_v2.backend.api.outbox.async_call_later"):
+            for value in ("on", "off", "on"):
+                for entity_id in states:
+                    manager._async_state_changed(Mock(data={
+                        "entity_id": entity_id,
+                        "old_state": None,
+                        "new_state": State(entity_id, value)
+                    }))
+
+        pushed = [
+            entity_id
+            for call in send.call_args_list
+            for entity_id in call[0][0]["event"]["changes"]
+        ]
+        assert pushed.count("binary_sensor.hallway") == 3
+        assert pushed.count("binary_sensor.front_door") == 3
+        assert pushed.count("sensor.lux") == 1
+        # Fans and switches fall under climate, yet their toggles are not held back
+        assert pushed.count("fan.bedroom") == 3
+        assert pushed.count("switch.bathroom_fan") == 3
+        assert pushed.count("climate.hall") == 1
+
+
+class TestViewGroups:
+    """Test suite for shared view groups."""
+
+    @pytest.fixture
+    def states(self):
+        """Current states by entity_id."""
+        return {
+            entity_id: State(entity_id, "off")
+            for entity_id in ("light.a", "light.b", "light.c")
+        }
+
+    @pytest.fixture
+    def manager(self, track, states):
+        """Create an unbatched manager backed by the states fixture."""
+        hass = MagicMock()
+        hass.states.get = Mock(side_effect=states.get)
+        return SubscriptionManager(hass, flush_interval_ms=0)
+
+    def change(self, manager, states, entity_id, value):
+        """Apply a state change and dispatch it."""
+        old_state = states[entity_id]
+        states[entity_id] = State(entity_id, value)
+        manager._async_state_changed(Mock(data={
+            "entity_id": entity_id, "old_state": old_state, "new_state": states[entity_id]
+        }))
+
+    @pytest.mark.asyncio
+    async def test_identical_views_share_one_encoded_payload(self, manager, states, track):
+        """Fifty tablets on the same view cost one tracker and one encode per change."""
+        handlers = [Mock() for _ in range(50)]
+        for index, handler in enumerate(handlers):
+            await manager.register_connection(f"tablet-{index}", handler, subscription_id=index)
+            result = await manager.join_view(f"tablet-{index}", ["light.b", "light.a"])
+
+        assert result["members"] == 50
+        assert track.call_count == 2
+
+        with patch(
+            "custom_components.dashview_v2.backend.api.groups.json_bytes",
+            side_effect=json_bytes
+        ) as encode:
+            self.change(manager, states, "light.a", "on")
+
+        assert encode.call_count == 1
+        payload = handlers[0].call_args[0][0]["event"]
+        assert b'"light.a"' in json_bytes(payload)
+        for index, handler in enumerate(handlers):
+            # Same encoded event, sent on each tablet's own subscription
+            assert handler.call_args[0][0]["id"] == index
+            assert handler.call_args[0][0]["event"] is payload
+
+    @pytest.mark.asyncio
+    async def test_last_member_leaving_releases_trackers(self, manager, track):
+        """Groups live as long as they have members."""
+        await manager.register_connection("a", Mock(), subscription_id=1)
+        await manager.register_connection("b", Mock(), subscription_id=1)
+        first = await manager.join_view("a", ["light.a", "light.b"])
+        second = await manager.join_view("b", ["light.a", "light.c"])
+        assert first["view"] != second["view"]
+        assert manager.get_subscription_stats()["view_groups"] == 2
+
+        # Switching views leaves the old group
+        await manager.join_view("a", ["light.c", "light.a"])
+        assert manager.get_subscription_stats()["view_groups"] == 1
+        assert set(manager._entity_trackers) == {"light.a", "light.c"}
+        assert sum(unsub.call_count for unsub in track.created) == 1
+
+        await manager.unregister_connection("a")
+        assert await manager.leave_view("b")
+        assert manager.get_subscription_stats()["view_groups"] == 0
+        assert all(unsub.call_count == 1 for unsub in track.created)
+
+    @pytest.mark.asyncio
+    async def test_failing_member_does_not_block_others(self, manager, states):
+        """A member whose send fails is dropped from the broadcast."""
+        broken, healthy = Mock(side_effect=RuntimeError("closed")), Mock()
+        await manager.register_connection("broken", broken, subscription_id=1)
+        await manager.register_connection("healthy", healthy, subscription_id=1)
+        await manager.join_view("broken", ["light.a"])
+        await manager.join_view("healthy", ["light.a"])
+
+        self.change(manager, states, "light.a", "on")
+        self.change(manager, states, "light.a", "off")
+
+        assert broken.call_count == 1
+        assert healthy.call_count == 2
+
+
+class TestLockFreeDispatch:
+    """Test suite for dispatch running against copy-on-write listener sets."""
+
+    @pytest.fixture
+    def manager(self, hass):
+        """Create a manager that flushes every change immediately."""
+        # Plain callables: mocks would dominate the benchmark below
+        with patch(TRACK_PATH, side_effect=lambda *args: lambda: None):
+            yield SubscriptionManager(hass, flush_interval_ms=0)
+
+    def assert_consistent(self, manager):
+        """Check the listener index is exactly the inverse of the subscriptions."""
+        expected = {}
+        for conn_id, entity_ids in manager._subscriptions.items():
+            for entity_id in entity_ids:
+                expected.setdefault(entity_id, set()).add(conn_id)
+        assert {k: set(v) for k, v in manager._entity_listeners.items()} == expected
+        assert set(manager._entity_trackers) == set(expected)
+
+    @pytest.mark.asyncio
+    async def test_connection_closing_during_fan_out(self, manager):
+        """Listeners removed while a change is fanned out do not break the dispatch."""
+        handler_b = Mock()
+        handler_a = Mock(side_effect=lambda message: manager._remove_connection("b"))
+        await manager.register_connection("a", handler_a, subscription_id=1)
+        await manager.register_connection("b", handler_b, subscription_id=1)
+        await manager.subscribe_to_entities("a", ["light.kitchen"])
+        await manager.subscribe_to_entities("b", ["light.kitchen"])
+        listeners = manager._entity_listeners["light.kitchen"]
+
+        manager._async_state_changed(make_event("light.kitchen"))
+
+        assert handler_a.call_count == 1
+        assert listeners == {"a", "b"}
+        assert manager._entity_listeners["light.kitchen"] == {"a"}
+        self.assert_consistent(manager)
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_concurrent_viewport_churn(self, manager):
+        """100 clients scrolling while changes are dispatched keep the index consistent."""
+        clients, cycles, window = 100, 50, 20
+        entity_ids = [f"sensor.churn_{i}" for i in range(400)]
+        states = {entity_id: State(entity_id, "0") for entity_id in entity_ids}
+        manager.hass.states.get = states.get
+        for client in range(clients):
+            await manager.register_connection(f"c{client}", lambda message: None, subscription_id=1)
+
+        async def scroll(client):
+            for cycle in range(cycles):
+                start = (client * 7 + cycle * 3) % (len(entity_ids) - window)
+                await manager.update_subscriptions(f"c{client}", entity_ids[start:start + window])
+                await asyncio.sleep(0)
+
+        async def churn_states():
+            for change in range(clients * cycles):
+                entity_id = entity_ids[change % len(entity_ids)]
+                new_state = State(entity_id, str(change))
+                manager._async_state_changed(Mock(data={
+                    "entity_id": entity_id, "old_state": states[entity_id], "new_state": new_state
+                }))
+                states[entity_id] = new_state
+                if change % clients == 0:
+                    await asyncio.sleep(0)
+
+        started = time.perf_counter()
+        await asyncio.gather(churn_states(), *(scroll(client) for client in range(clients)))
+        elapsed = time.perf_counter() - started
+
+        # Loose floor: catches the manager serializing on anything but the loop itself
+        assert clients * cycles / elapsed > 1000
+        assert len(manager._outboxes) == clients
+        self.assert_consistent(manager)
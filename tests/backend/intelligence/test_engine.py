@@ -0,0 +1,221 @@
+"""
+Tests for the single-pass home analysis engine.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from custom_components.dashview_v2.backend.intelligence.analyzer import HomeComplexityAnalyzer
+from custom_components.dashview_v2.backend.intelligence.engine import (
+    UNASSIGNED_AREA, AnalysisCancelled, RegistrySnapshot, analyze_home
+)
+from custom_components.dashview_v2.backend.intelligence.entity_mapper import EntityMapper
+from custom_components.dashview_v2.backend.intelligence.registry_index import RegistryIndex
+
+INDEX_PATH = "custom_components.dashview_v2.backend.intelligence.registry_index"
+MAPPER_PATH = "custom_components.dashview_v2.backend.intelligence.entity_mapper"
+DOMAINS = ["light", "switch", "sensor", "binary_sensor", "climate", "media_player", "lock", "cover", "fan"]
+
+
+def synthetic_home(entity_count, seed=1):
+    """Return area names, device areas and entity assignments of a made-up home."""
+    rng = random.Random(seed)
+    area_names = {f"area_{a}": f"Area {a}" for a in range(max(4, entity_count // 150))}
+    area_ids = [*area_names, None]
+    device_areas = {f"device_{d}": rng.choice(area_ids) for d in range(entity_count // 7)}
+    device_ids = [*device_areas, None]
+    entities = {
+        f"{rng.choice(DOMAINS)}.entity_{e}": (
+            rng.choice(area_ids) if rng.random() < 0.2 else None,
+            rng.choice(device_ids),
+        )
+        for e in range(entity_count)
+    }
+    return area_names, device_areas, entities
+
+
+def make_registries(area_names, device_areas, entities):
+    """Build fake area, device and entity registries holding the given home."""
+    area_reg = SimpleNamespace(areas={
+        area_id: SimpleNamespace(name=name) for area_id, name in area_names.items()
+    })
+    device_reg = SimpleNamespace(devices={
+        device_id: SimpleNamespace(area_id=area_id) for device_id, area_id in device_areas.items()
+    })
+    entity_reg = SimpleNamespace(entities={
+        entity_id: SimpleNamespace(entity_id=entity_id, area_id=area_id, device_id=device_id)
+        for entity_id, (area_id, device_id) in entities.items()
+    })
+    return area_reg, device_reg, entity_reg
+
+
+def build_index(hass, area_names, device_areas, entities):
+    """Build an index over the given home."""
+    area_reg, device_reg, entity_reg = make_registries(area_names, device_areas, entities)
+    with patch(f"{INDEX_PATH}.area_registry.async_get", return_value=area_reg), \
+         patch(f"{INDEX_PATH}.device_registry.async_get", return_value=device_reg), \
+         patch(f"{INDEX_PATH}.entity_registry.async_get", return_value=entity_reg):
+        index = RegistryIndex(hass)
+        index.async_build()
+    return index
+
+
+async def separate_sweeps(analyzer):
+    """Run the analysis the way get_home_complexity used to, one sweep per breakdown."""
+    return (
+        await analyzer.calculate_complexity_score(),
+        await analyzer.analyze_areas(),
+        await analyzer.group_entities_by_area(),
+        await analyzer.categorize_entities(),
+    )
+
+
+class TestAnalyzeHome:
+    """Test suite for analyze_home."""
+
+    def test_small_home(self):
+        """Areas, unassigned entities and categories come out of one snapshot."""
+        analysis = analyze_home(RegistrySnapshot.create(
+            "v1",
+            {"kitchen": "Kitchen", "hall": "Hall"},
+            {
+                "kitchen": {"sensor.fridge", "light.counter"},
+                "hall": set(),
+                UNASSIGNED_AREA: {"sun.sun"},
+            },
+            {"kitchen": 1, UNASSIGNED_AREA: 0},
+            {"sensor": 1, "light": 1, "sun": 1},
+            3,
+            1,
+        ))
+
+        assert analysis.areas["kitchen"].entities == ["light.counter", "sensor.fridge"]
+        assert analysis.areas["kitchen"].device_count == 1
+        assert analysis.areas["hall"].entities == []
+        assert analysis.areas[UNASSIGNED_AREA].entities == ["sun.sun"]
+        assert analysis.unassigned_count == 1
+        assert analysis.domains == {"sensor", "light", "sun"}
+        assert analysis.category_counts["lights"] == 1
+        assert analysis.category_counts["other"] == 1
+        assert analysis.complexity_score == 4
+
+    def test_area_hashes_follow_content(self):
+        """An area's hash changes with its name, devices or entities, not with the version."""
+        def analyze(version, kitchen_name, kitchen_devices):
+            return analyze_home(RegistrySnapshot.create(
+                version,
+                {"kitchen": kitchen_name, "hall": "Hall"},
+                {"kitchen": {"light.counter"}, "hall": {"light.hall"}},
+                {"kitchen": kitchen_devices},
+                {"light": 2},
+                2,
+                kitchen_devices,
+            )).area_hashes
+
+        first = analyze("v1", "Kitchen", 1)
+        assert analyze("v2", "Kitchen", 1) == first
+        assert analyze("v3", "Cuisine", 1)["kitchen"] != first["kitchen"]
+        assert analyze("v4", "Kitchen", 2)["kitchen"] != first["kitchen"]
+        assert analyze("v4", "Kitchen", 2)["hall"] == first["hall"]
+
+    def test_cancelled(self):
+        """A set cancel flag stops the pass before it publishes anything."""
+        cancel = threading.Event()
+        cancel.set()
+        snapshot = RegistrySnapshot.create("v1", {"hall": "Hall"}, {}, {}, {}, 0, 0)
+
+        with pytest.raises(AnalysisCancelled):
+            analyze_home(snapshot, cancel)
+
+    @pytest.mark.asyncio
+    async def test_matches_separate_sweeps(self):
+        """The fused pass agrees with every separate breakdown."""
+        index = build_index(MagicMock(), *synthetic_home(2000))
+        score, areas, groups, categories = await separate_sweeps(
+            HomeComplexityAnalyzer(MagicMock(), index)
+        )
+
+        analysis = analyze_home(index.snapshot())
+
+        assert analysis.version == index.version
+        assert analysis.complexity_score == score
+        assert analysis.areas == areas
+        assert analysis.unassigned_count == len(groups.get(UNASSIGNED_AREA, []))
+        assert analysis.category_counts == {
+            category: len(entities) for category, entities in categories.items()
+        }
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("entity_count", [1_000, 10_000, 50_000])
+    async def test_benchmark_against_separate_sweeps(self, entity_count):
+        """Snapshot plus fused pass beats one sweep per breakdown at every size."""
+        index = build_index(MagicMock(), *synthetic_home(entity_count))
+        analyzer = HomeComplexityAnalyzer(MagicMock(), index)
+
+        separate = fused = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            await separate_sweeps(analyzer)
+            separate = min(separate, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            analyze_home(index.snapshot())
+            fused = min(fused, time.perf_counter() - started)
+
+        assert fused < separate, (
+            f"{entity_count} entities: separate {separate * 1000:.1f} ms, fused {fused * 1000:.1f} ms"
+        )
+
+
+class TestOffLoopAnalysis:
+    """Test suite for keeping the event loop responsive during analysis."""
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_loop_lag_large_home(self):
+        """Analyzing a 20k entity home never holds the loop for 10 ms."""
+        hass = MagicMock()
+        hass.async_add_executor_job = lambda target, *args: (
+            asyncio.get_running_loop().run_in_executor(None, target, *args)
+        )
+        home = synthetic_home(20_000)
+        _, device_reg, entity_reg = make_registries(*home)
+        index = build_index(hass, *home)
+        with patch(f"{MAPPER_PATH}.device_registry.async_get", return_value=device_reg), \
+             patch(f"{MAPPER_PATH}.entity_registry.async_get", return_value=entity_reg):
+            mapper = EntityMapper(hass)
+
+        async def worst_lag_during(work):
+            """Return the longest the loop was held while work ran, and its result."""
+            done = asyncio.Event()
+            worst_lag = 0.0
+
+            async def probe():
+                nonlocal worst_lag
+                while not done.is_set():
+                    started = time.perf_counter()
+                    await asyncio.sleep(0.001)
+                    worst_lag = max(worst_lag, time.perf_counter() - started - 0.001)
+
+            probing = asyncio.ensure_future(probe())
+            await asyncio.sleep(0.01)
+            result = await work()
+            done.set()
+            await probing
+            return worst_lag, result
+
+        for run in range(3):
+            worst_lag, (complexity, groups) = await worst_lag_during(lambda: asyncio.gather(
+                HomeComplexityAnalyzer(hass, index).get_home_complexity(),
+                mapper.get_entity_groups_by_function(),
+            ))
+            assert complexity["total_entities"] == 20_000
+            assert sum(len(entity_ids) for entity_ids in groups.values()) == 20_000
+            assert worst_lag < 0.010, f"Run {run + 1}: worst event loop lag {worst_lag * 1000:.1f} ms"
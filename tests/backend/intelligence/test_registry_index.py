@@ -0,0 +1,320 @@
+"""
+Tests for the registry index behind the home analysis.
+"""
+
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+import pytest
+from unittest.mock import MagicMock, Mock, call, patch
+
+from custom_components.dashview_v2.backend.intelligence.analyzer import HomeComplexityAnalyzer
+from custom_components.dashview_v2.backend.intelligence.registry_index import (
+    UNASSIGNED_AREA, RegistryIndex
+)
+
+INDEX_PATH = "custom_components.dashview_v2.backend.intelligence.registry_index"
+
+
+def make_registries(areas, devices, entities):
+    """Build fake area, device and entity registries."""
+    area_reg = SimpleNamespace(areas={
+        area_id: SimpleNamespace(id=area_id, name=name) for area_id, name in areas.items()
+    })
+    area_reg.async_get_area = area_reg.areas.get
+    device_reg = SimpleNamespace(devices={
+        device_id: SimpleNamespace(id=device_id, area_id=area_id)
+        for device_id, area_id in devices.items()
+    })
+    device_reg.async_get = device_reg.devices.get
+    entity_reg = SimpleNamespace(entities={
+        entity_id: SimpleNamespace(entity_id=entity_id, area_id=area_id, device_id=device_id)
+        for entity_id, (area_id, device_id) in entities.items()
+    })
+    entity_reg.async_get = entity_reg.entities.get
+    return area_reg, device_reg, entity_reg
+
+
+@pytest.fixture
+def hass():
+    """Create a mock Home Assistant instance recording bus listeners."""
+    hass = MagicMock()
+    hass.listeners = {}
+
+    def _listen(event_type, listener):
+        hass.listeners[event_type] = listener
+        return Mock()
+
+    hass.bus.async_listen = Mock(side_effect=_listen)
+    hass.async_add_executor_job = Mock(
+        side_effect=lambda target, *args: asyncio.get_running_loop().run_in_executor(None, target, *args)
+    )
+    return hass
+
+
+@pytest.fixture
+def call_later():
+    """Patch the debounce timer and record scheduled callbacks."""
+    with patch(f"{INDEX_PATH}.async_call_later") as mock_call_later:
+        mock_call_later.return_value = Mock()
+        yield mock_call_later
+
+
+@pytest.fixture
+def registries():
+    """Serve a small home through the registry helpers."""
+    area_reg, device_reg, entity_reg = make_registries(
+        {"kitchen": "Kitchen", "bedroom": "Bedroom", "attic": "Attic"},
+        {"fridge": "kitchen", "lamp": "bedroom", "hub": None},
+        {
+            "sensor.fridge_temp": (None, "fridge"),
+            "switch.fridge": (None, "fridge"),
+            "light.bedside": (None, "lamp"),
+            # Entity area wins over the area of its device
+            "light.moved": ("kitchen", "lamp"),
+            "light.ceiling": ("bedroom", None),
+            "sensor.hub_signal": (None, "hub"),
+            "sun.sun": (None, None),
+        },
+    )
+    with patch(f"{INDEX_PATH}.area_registry.async_get", return_value=area_reg), \
+         patch(f"{INDEX_PATH}.device_registry.async_get", return_value=device_reg), \
+         patch(f"{INDEX_PATH}.entity_registry.async_get", return_value=entity_reg):
+        yield area_reg, device_reg, entity_reg
+
+
+class TestRegistryIndex:
+    """Test suite for RegistryIndex lookups."""
+
+    def test_lookups(self, hass, registries):
+        """Every mapping is answered from the single build pass."""
+        index = RegistryIndex(hass)
+        index.async_build()
+
+        assert index.area_entities("kitchen") == ["light.moved", "sensor.fridge_temp", "switch.fridge"]
+        assert index.area_entities("bedroom") == ["light.bedside", "light.ceiling"]
+        assert index.area_entities("attic") == []
+        assert index.area_entities(UNASSIGNED_AREA) == ["sensor.hub_signal", "sun.sun"]
+        assert index.area_device_count("kitchen") == 1
+        assert index.area_device_count(UNASSIGNED_AREA) == 1
+        assert index.device_entities("lamp") == ["light.bedside", "light.moved"]
+        assert index.device_area("fridge") == "kitchen"
+        assert index.domain_entities("light") == ["light.bedside", "light.ceiling", "light.moved"]
+        assert index.entity_area("light.moved") == "kitchen"
+
+    @pytest.mark.asyncio
+    async def test_analyzer_uses_index(self, hass, registries):
+        """Area analysis lists each entity once, in its effective area."""
+        index = RegistryIndex(hass)
+        index.async_build()
+        analyzer = HomeComplexityAnalyzer(hass, index)
+
+        areas = await analyzer.analyze_areas()
+
+        assert set(areas) == {"kitchen", "bedroom", "attic", UNASSIGNED_AREA}
+        assert areas["bedroom"].entities == ["light.bedside", "light.ceiling"]
+        assert areas["bedroom"].device_count == 1
+        assert areas[UNASSIGNED_AREA].device_count == 1
+        assert (await analyzer.get_home_complexity())["unassigned_entity_count"] == 2
+
+    @pytest.mark.asyncio
+    async def test_home_complexity_memoized_per_version(self, hass, registries, call_later):
+        """The analysis is recomputed only after a registry change that matters."""
+        _, _, entity_reg = registries
+        index = RegistryIndex(hass)
+        index.async_start()
+        analyzer = HomeComplexityAnalyzer(hass, index)
+
+        first = await analyzer.get_home_complexity()
+        assert first["version"] == index.version
+        assert await analyzer.get_home_complexity() is first
+
+        # A registry update that moves nothing keeps the version
+        hass.listeners["entity_registry_updated"](Mock(data={"action": "update", "entity_id": "sun.sun"}))
+        assert await analyzer.get_home_complexity() is first
+
+        entity_reg.entities["sun.sun"].area_id = "attic"
+        hass.listeners["entity_registry_updated"](Mock(data={"action": "update", "entity_id": "sun.sun"}))
+        second = await analyzer.get_home_complexity()
+        assert second["version"] != first["version"]
+        assert second["areas"]["attic"]["entities"] == ["sun.sun"]
+
+        # Only the areas the move touched get a new content hash
+        changed = {
+            area_id for area_id, area in second["areas"].items()
+            if area["hash"] != first["areas"][area_id]["hash"]
+        }
+        assert changed == {"attic", UNASSIGNED_AREA}
+
+    @pytest.mark.asyncio
+    async def test_stale_analysis_cancelled(self, hass, registries, call_later):
+        """A newer registry version cancels the running analysis; waiters get the newer one."""
+        _, _, entity_reg = registries
+        jobs = []
+
+        def _add_executor_job(target, *args):
+            jobs.append((asyncio.get_running_loop().create_future(), target, args))
+            return jobs[-1][0]
+
+        hass.async_add_executor_job = Mock(side_effect=_add_executor_job)
+        index = RegistryIndex(hass)
+        index.async_start()
+        analyzer = HomeComplexityAnalyzer(hass, index)
+
+        waiter = asyncio.ensure_future(analyzer.get_home_complexity())
+        await asyncio.sleep(0)
+        assert len(jobs) == 1
+
+        entity_reg.entities["sun.sun"].area_id = "attic"
+        hass.listeners["entity_registry_updated"](Mock(data={"action": "update", "entity_id": "sun.sun"}))
+        call_later.call_args[0][2](None)
+        # The waiter sees the cancellation through the shield, then starts over
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+        stale, _, (_, cancel) = jobs[0]
+        assert stale.cancelled() and cancel.is_set()
+        assert len(jobs) == 2 and not waiter.done()
+
+        # Published in one go once the analysis of the newer version finishes
+        future, target, args = jobs[1]
+        future.set_result(target(*args))
+        result = await waiter
+        assert result["version"] == index.version
+        assert result["areas"]["attic"]["entities"] == ["sun.sun"]
+        assert await analyzer.get_home_complexity() is result
+        assert len(jobs) == 2
+
+
+class TestIncrementalUpdates:
+    """Test suite for applying registry updates as deltas."""
+
+    @pytest.fixture
+    def index(self, hass, registries, call_later):
+        """Create a started index."""
+        index = RegistryIndex(hass)
+        index.async_start()
+        return index
+
+    def entity_updated(self, hass, entity_id, action="update", **data):
+        """Fire an entity registry update."""
+        hass.listeners["entity_registry_updated"](
+            Mock(data={"action": action, "entity_id": entity_id, **data})
+        )
+
+    def test_moves_renames_and_removals(self, hass, registries, index):
+        """Single-item updates leave the index equal to a rebuild."""
+        area_reg, device_reg, entity_reg = registries
+
+        device_reg.devices["hub"].area_id = "attic"
+        hass.listeners["device_registry_updated"](Mock(data={"action": "update", "device_id": "hub"}))
+        assert index.area_entities("attic") == ["sensor.hub_signal"]
+        assert index.area_entities(UNASSIGNED_AREA) == ["sun.sun"]
+
+        entity_reg.entities["light.moved"].area_id = None
+        self.entity_updated(hass, "light.moved")
+        area_reg.areas["attic"].name = "Loft"
+        hass.listeners["area_registry_updated"](Mock(data={"action": "update", "area_id": "attic"}))
+        entity_reg.entities["light.bed"] = entity_reg.entities.pop("light.bedside")
+        entity_reg.entities["light.bed"].entity_id = "light.bed"
+        self.entity_updated(hass, "light.bed", old_entity_id="light.bedside")
+        del device_reg.devices["fridge"]
+        hass.listeners["device_registry_updated"](Mock(data={"action": "remove", "device_id": "fridge"}))
+
+        assert index.areas["attic"] == "Loft"
+        assert index.area_entities("bedroom") == ["light.bed", "light.ceiling", "light.moved"]
+        assert index.device_entities("lamp") == ["light.bed", "light.moved"]
+        assert index.area_entities("kitchen") == []
+        assert index.async_verify() == []
+
+    def test_listeners_receive_moved_entities(self, hass, registries, index, call_later):
+        """Listeners learn which entities changed area, not just that something did."""
+        area_reg, device_reg, _ = registries
+        listener = Mock()
+        index.async_add_listener(listener)
+
+        # light.moved keeps its own area when its device moves
+        device_reg.devices["lamp"].area_id = "attic"
+        hass.listeners["device_registry_updated"](Mock(data={"action": "update", "device_id": "lamp"}))
+        call_later.call_args[0][2](None)
+        area_reg.areas["attic"].name = "Loft"
+        hass.listeners["area_registry_updated"](Mock(data={"action": "update", "area_id": "attic"}))
+        call_later.call_args[0][2](None)
+
+        assert listener.call_args_list == [call({"light.bedside"}), call(set())]
+
+    def test_burst_applied_as_one_batch(self, hass, registries, index, call_later):
+        """An integration reload creating 500 entities is one debounced batch."""
+        _, _, entity_reg = registries
+        for number in range(500):
+            entity_id = f"sensor.reloaded_{number}"
+            entity_reg.entities[entity_id] = SimpleNamespace(
+                entity_id=entity_id, area_id=None, device_id="fridge"
+            )
+            self.entity_updated(hass, entity_id, action="create")
+
+        assert call_later.call_count == 1
+        call_later.call_args[0][2](None)
+
+        assert index.batches_applied == 1
+        assert index.deltas_applied == 500
+        assert len(index.area_entities("kitchen")) == 503
+        assert index.async_verify() == []
+
+    def test_random_updates_match_rebuild(self, hass, registries, index):
+        """Any sequence of updates converges on the from-scratch result."""
+        area_reg, device_reg, entity_reg = registries
+        rng = random.Random(7)
+        area_ids = [*area_reg.areas, None]
+        listeners = hass.listeners
+
+        for step in range(300):
+            choice = rng.random()
+            if choice < 0.4:
+                entity_id = f"{rng.choice(['light', 'sensor'])}.random_{rng.randrange(40)}"
+                entity_reg.entities[entity_id] = SimpleNamespace(
+                    entity_id=entity_id,
+                    area_id=rng.choice(area_ids),
+                    device_id=rng.choice([*device_reg.devices, None]),
+                )
+                self.entity_updated(hass, entity_id)
+            elif choice < 0.6 and entity_reg.entities:
+                entity_id = rng.choice(sorted(entity_reg.entities))
+                del entity_reg.entities[entity_id]
+                self.entity_updated(hass, entity_id, action="remove")
+            elif choice < 0.9:
+                device_id = f"device_{rng.randrange(8)}"
+                device_reg.devices[device_id] = SimpleNamespace(id=device_id, area_id=rng.choice(area_ids))
+                listeners["device_registry_updated"](Mock(data={"action": "update", "device_id": device_id}))
+            else:
+                area_id = f"area_{rng.randrange(4)}"
+                area_reg.areas[area_id] = SimpleNamespace(id=area_id, name=f"Area {step}")
+                listeners["area_registry_updated"](Mock(data={"action": "create", "area_id": area_id}))
+            if step % 25 == 0:
+                assert index.async_verify() == []
+
+        assert index.async_verify() == []
+
+    @pytest.mark.slow
+    @pytest.mark.asyncio
+    async def test_large_home_analysis(self, hass):
+        """A 6,000 entity, 900 device, 40 area home is analyzed in well under a second."""
+        areas = {f"area_{a}": f"Area {a}" for a in range(40)}
+        devices = {f"device_{d}": f"area_{d % 40}" if d % 10 else None for d in range(900)}
+        entities = {
+            f"sensor.entity_{e}": (f"area_{e % 40}" if e % 7 == 0 else None, f"device_{e % 900}")
+            for e in range(6000)
+        }
+        area_reg, device_reg, entity_reg = make_registries(areas, devices, entities)
+
+        with patch(f"{INDEX_PATH}.area_registry.async_get", return_value=area_reg), \
+             patch(f"{INDEX_PATH}.device_registry.async_get", return_value=device_reg), \
+             patch(f"{INDEX_PATH}.entity_registry.async_get", return_value=entity_reg):
+            started = time.perf_counter()
+            result = await HomeComplexityAnalyzer(hass).get_home_complexity()
+            elapsed = time.perf_counter() - started
+
+        assert sum(area["entity_count"] for area in result["areas"].values()) == 6000
+        assert elapsed < 0.5
@@ -0,0 +1,54 @@
+"""Test the Dashview V2 options flow."""
+import pytest
+from unittest.mock import MagicMock, Mock
+
+from homeassistant.data_entry_flow import FlowResultType
+
+from custom_components.dashview_v2.backend.config import (
+    CONF_FLUSH_INTERVAL_MS,
+    CONF_MAX_ENTITIES_PER_CONNECTION,
+    DEFAULT_MAX_PENDING_UPDATES,
+)
+from custom_components.dashview_v2.config_flow import OptionsFlowHandler
+
+
+@pytest.fixture
+def flow():
+    """Create an options flow for an entry with one stored option."""
+    flow = OptionsFlowHandler()
+    flow.hass = MagicMock()
+    flow.hass.config_entries.async_get_entry = Mock(
+        return_value=Mock(options={CONF_FLUSH_INTERVAL_MS: 250})
+    )
+    flow.handler = "entry_id"
+    return flow
+
+
+@pytest.mark.asyncio
+async def test_form_prefilled_from_options(flow):
+    """The form shows stored options and the defaults for the rest."""
+    result = await flow.async_step_init()
+
+    assert result["type"] == FlowResultType.FORM
+    defaults = {str(key): key.default() for key in result["data_schema"].schema}
+    assert defaults[CONF_FLUSH_INTERVAL_MS] == 250
+    assert defaults["max_pending_updates"] == DEFAULT_MAX_PENDING_UPDATES
+
+
+@pytest.mark.asyncio
+async def test_options_validated_by_config_schema(flow):
+    """Submitted options are validated and completed with defaults."""
+    result = await flow.async_step_init({CONF_MAX_ENTITIES_PER_CONNECTION: "300"})
+
+    assert result["type"] == FlowResultType.CREATE_ENTRY
+    assert result["data"][CONF_MAX_ENTITIES_PER_CONNECTION] == 300
+    assert result["data"]["max_pending_updates"] == DEFAULT_MAX_PENDING_UPDATES
+
+
+@pytest.mark.asyncio
+async def test_out_of_range_option_rejected(flow):
+    """Values outside the schema's range show an error instead of being stored."""
+    result = await flow.async_step_init({CONF_FLUSH_INTERVAL_MS: 10**6})
+
+    assert result["type"] == FlowResultType.FORM
+    assert result["errors"] == {"base": "invalid_options"}
@@ -105,14 +105,14 @@ def test_home_complexity_analyzer_init(mock_hass, mock_registries):
     """Test HomeComplexityAnalyzer initialization."""
     area_reg, entity_reg = mock_registries
     
-    with patch("custom_components.dashview_v2.backend.intelligence.analyzer.area_registry.async_get", return_value=area_reg), \
-         patch("custom_components.dashview_v2.backend.intelligence.analyzer.entity_registry.async_get", return_value=entity_reg), \
-         patch("custom_components.dashview_v2.backend.intelligence.analyzer.device_registry.async_get"):
+    with patch("custom_components.dashview_v2.backend.intelligence.registry_index.area_registry.async_get", return_value=area_reg), \
+         patch("custom_components.dashview_v2.backend.intelligence.registry_index.entity_registry.async_get", return_value=entity_reg), \
+         patch("custom_components.dashview_v2.backend.intelligence.registry_index.device_registry.async_get"):
         
         analyzer = HomeComplexityAnalyzer(mock_hass)
         assert analyzer.hass == mock_hass
-        assert analyzer._area_reg == area_reg
-        assert analyzer._entity_reg == entity_reg
+        assert set(analyzer._index.areas) == set(area_reg.areas)
+        assert analyzer._index.entity_count == len(entity_reg.entities)
 
 
 @pytest.mark.asyncio
@@ -124,16 +124,15 @@ async def test_complexity_score_calculation(mock_hass, mock_registries):
     device_reg = MagicMock()
     device_reg.devices = {f"device{i}": MagicMock() for i in range(15)}
     
-    with patch("custom_components.dashview_v2.backend.intelligence.analyzer.area_registry.async_get", return_value=area_reg), \
-         patch("custom_components.dashview_v2.backend.intelligence.analyzer.entity_registry.async_get", return_value=entity_reg), \
-         patch("custom_components.dashview_v2.backend.intelligence.analyzer.device_registry.async_get", return_value=device_reg):
+    with patch("custom_components.dashview_v2.backend.intelligence.registry_index.area_registry.async_get", return_value=area_reg), \
+         patch("custom_components.dashview_v2.backend.intelligence.registry_index.entity_registry.async_get", return_value=entity_reg), \
+         patch("custom_components.dashview_v2.backend.intelligence.registry_index.device_registry.async_get", return_value=device_reg):
         
         analyzer = HomeComplexityAnalyzer(mock_hass)
+        assert analyzer._index.domains == {"light", "switch", "sensor"}
         
-        # Mock entity domains
-        with patch.object(analyzer, "_get_entity_domains", return_value={"light", "switch", "sensor"}):
-            score = await analyzer.calculate_complexity_score()
-            
-            # With 3 entities, 3 areas, 15 devices, and 3 domains
-            # Expected: 1 (entities) + 1 (areas) + 1 (devices) + 1 (domains) = 4
-            assert score == 4
\ No newline at end of file
+        score = await analyzer.calculate_complexity_score()
+        
+        # With 3 entities, 3 areas, 15 devices, and 3 domains
+        # Expected: 1 (entities) + 1 (areas) + 1 (devices) + 1 (domains) = 4
+        assert score == 4
\ No newline at end of file